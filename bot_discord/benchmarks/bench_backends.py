@@ -0,0 +1,97 @@
+# bench_backends.py
+# Distribuição de carga do BackendPool entre vários servidores falsos
+#
+# Uso: python benchmarks/bench_backends.py [requisições] [servidores]
+
+import os
+import sys
+import time
+import asyncio
+
+# Adiciona o diretório raiz ao path para importações relativas
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.ai_handler import AIHandler
+from modules.llm_backends import BackendPool, BackendRequestError, BackendUnavailableError, BACKEND_OK, BACKEND_UNKNOWN
+from stub_llm_server import start_servers
+
+
+async def check_errors(port):
+    """Um 4xx é erro da requisição: não afasta o backend; um 5xx afasta"""
+    payload = {"model": "default", "messages": [{"role": "user", "content": "oi"}]}
+    for status, expected, healthy in ((400, BackendRequestError, True), (500, BackendUnavailableError, False)):
+        runners, urls, _ = await start_servers(port, 1, latency=0, fail_rate=1, error_status=status)
+        pool = BackendPool(urls)
+        try:
+            await pool.post("/chat/completions", payload, timeout=5)
+            raise AssertionError(f"status {status} não gerou erro")
+        except expected:
+            pass
+        backend = pool.backends[0]
+        assert (backend.status == BACKEND_UNKNOWN and backend.available) == healthy, (status, backend)
+        await pool.close()
+        for runner in runners:
+            await runner.cleanup()
+
+
+class _FakeConfig:
+    def get_config_value(self, key, default=None):
+        return {"ai_model": "meu-modelo"}.get(key, default)
+
+
+async def check_health(port):
+    """Servidor com outro id de modelo carregado continua utilizável; servidor fora do ar é distinguido"""
+    runners, urls, _ = await start_servers(port, 1, latency=0)
+    os.environ["LM_STUDIO_API_URLS"] = urls[0]
+    handler = AIHandler(_FakeConfig())
+    assert await handler.check_health() == BACKEND_OK
+    assert not handler.is_degraded() and not handler.is_offline()
+    await handler.close()
+    for runner in runners:
+        await runner.cleanup()
+
+    # A mesma porta, agora sem servidor
+    handler = AIHandler(_FakeConfig())
+    await handler.check_health()
+    assert handler.is_degraded() and handler.is_offline()
+    await handler.close()
+    del os.environ["LM_STUDIO_API_URLS"]
+
+
+async def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    await check_errors(11234)
+    await check_health(11234)
+
+    # O último servidor falha em 1 de cada 3 requisições para exercitar o failover
+    runners, urls, states = await start_servers(11234, count - 1, latency=0.1)
+    failing, failing_urls, failing_states = await start_servers(11234 + count - 1, 1, latency=0.1, fail_rate=1 / 3)
+    runners += failing
+    urls += failing_urls
+    states += failing_states
+
+    pool = BackendPool(urls, max_concurrency=2)
+    payload = {"model": "default", "messages": [{"role": "user", "content": "oi"}]}
+
+    async def request(i):
+        # 10 canais diferentes, cada um preso ao seu backend
+        return await pool.post("/chat/completions", payload, sticky_key=i % 10, timeout=5)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(request(i) for i in range(total)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+
+    errors = sum(1 for r in results if isinstance(r, Exception))
+    print(f"{total} requisições em {elapsed:.2f} s ({errors} erros)")
+    for url, state in zip(urls, states):
+        print(f"{url}: {state['requests']} requisições, pico de {state['max_in_flight']} simultâneas")
+
+    await pool.close()
+    for runner in runners:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+# bench_dedup.py
+# Busca de informações quase repetidas: comparação com todas as informações x índice LSH
+#
+# Uso: python benchmarks/bench_dedup.py [informações] [repetições]
+
+import os
+import sys
+import random
+import timeit
+
+# Adiciona o diretório raiz ao path para importações relativas
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import dedup
+from modules.memory import Memory
+from modules.time_handler import TimeHandler
+
+SUBJECTS = ("gosto de", "moro em", "trabalho com", "meu time é", "estudo", "tenho um gato chamado", "prefiro")
+OBJECTS = (
+    "café", "salvador", "programação", "bahia", "engenharia", "mingau", "pizza", "chá verde",
+    "futebol", "são paulo", "design", "física", "música", "cinema", "violão", "python"
+)
+
+
+def facts(count):
+    """Informações distintas de um mesmo usuário"""
+    rng = random.Random(7)
+    return [f"{rng.choice(SUBJECTS)} {rng.choice(OBJECTS)} número {i}" for i in range(count)]
+
+
+class _FakeConfig:
+    """Configuração mínima, sem persistência"""
+
+    def get_memory_limit(self):
+        return 50
+
+    def get_config_value(self, key, default=None):
+        return {"memory_persistence": False}.get(key, default)
+
+
+def check_date_events():
+    """Datas especiais que só diferem pela data não são tratadas como repetidas"""
+    memory = Memory(_FakeConfig())
+    time_handler = TimeHandler(_FakeConfig())
+    time_handler._persist_special_date = lambda *args: None
+    for message in ("compromisso dia 5/4", "compromisso dia 12/4", "aniversário Maria dia 3/11",
+                    "aniversário Mário dia 3/11"):
+        assert time_handler.detect_date_triggers(message, memory, trigger="dia")
+    values = sorted(info["value"] for info in memory.long_term.values())
+    assert values == [
+        "Compromisso na data 12/4", "Compromisso na data 5/4",
+        "aniversário Maria na data 3/11", "aniversário Mário na data 3/11"
+    ], values
+
+    # Cada data fica restrita ao autor e ao servidor; o mesmo evento em outro servidor não a sobrescreve
+    for guild_id in (1, 2):
+        time_handler.detect_date_triggers("prova dia 20/5", memory, trigger="dia", guild_id=guild_id, user_id=7)
+    scopes = sorted(
+        (info["guild_id"], info["user_id"]) for info in memory.long_term.values() if info["value"].endswith("20/5")
+    )
+    assert scopes == [(1, 7), (2, 7)], scopes
+
+    # Informações comuns parecidas continuam sendo substituídas
+    memory.ingest_permanent_info("a", "eu gosto muito de café com leite")
+    assert memory.ingest_permanent_info("b", "eu gosto muito de café com leite!") == ["a"]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    check_date_events()
+
+    texts = facts(count)
+    signatures = [dedup.signature(text) for text in texts]
+    index = dedup.MemoryDeduplicator()
+    for i, (text, sig) in enumerate(zip(texts, signatures)):
+        index.add(f"k{i}", text, None, sig)
+
+    query = f"Eu {texts[count // 2]}!"
+
+    def brute_force():
+        sig = dedup.signature(query)
+        return [i for i, other in enumerate(signatures) if dedup.similarity(sig, other) >= dedup.DEFAULT_THRESHOLD]
+
+    def lsh():
+        return index.find_similar(query)
+
+    found = {key for key, _ in lsh()}
+    assert found == {f"k{i}" for i in brute_force()}
+
+    signature_time = timeit.timeit(lambda: dedup.signature(query), number=repeat) / repeat
+    brute_time = timeit.timeit(brute_force, number=repeat) / repeat
+    lsh_time = timeit.timeit(lsh, number=repeat) / repeat
+
+    print(f"{count} informações, assinatura de {dedup.NUM_PERM} valores ({dedup.BANDS} faixas x {dedup.ROWS})")
+    print(f"assinatura:                 {signature_time * 1000:.2f} ms")
+    print(f"comparação com todas:       {brute_time * 1000:.2f} ms")
+    print(f"índice LSH:                 {lsh_time * 1000:.2f} ms ({brute_time / lsh_time:.0f}x)")
+    print(f"informações parecidas:      {len(found)}")
+
+
+if __name__ == "__main__":
+    main()
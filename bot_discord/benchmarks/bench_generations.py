@@ -0,0 +1,159 @@
+# bench_generations.py
+# Regras de cancelamento das respostas em geração e custo de contar as mensagens novas dos canais
+#
+# Uso: python benchmarks/bench_generations.py [mensagens] [gerações em andamento]
+
+import os
+import sys
+import asyncio
+import time
+
+# Adiciona o diretório raiz ao path para importações relativas
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.bot import DiscordBot
+from core.debounce import MessageDebouncer, PendingMessage
+from core.rate_limit import RateLimiter
+from core.generations import GenerationTracker, CANCEL_DELETED, CANCEL_EDITED, CANCEL_CHANNEL, CANCEL_TIMEOUT
+
+
+class _Author:
+    id = 7
+
+
+class _Channel:
+    id = 1
+
+
+class _Message:
+    author = _Author()
+    channel = _Channel()
+    guild = None
+
+    def __init__(self, message_id, content):
+        self.id = message_id
+        self.content = content
+
+
+class _FakeConfig:
+    version = 0
+
+    def get_config_value(self, key, default=None):
+        return {"rate_limit_user": "1/3600"}.get(key, default)
+
+
+class _Responder:
+    """O suficiente do DiscordBot para _collect_batch"""
+
+    def __init__(self):
+        self.generations = GenerationTracker()
+        self.rate_limiter = RateLimiter(_FakeConfig())
+        self.debouncer = MessageDebouncer()
+        self.limited = []
+
+    def _debounce_window(self, channel_id):
+        return 0.01
+
+    async def _notify_rate_limited(self, message, limited):
+        self.limited.append(message.id)
+
+
+def _batch(message_id, content="bot oi"):
+    return [PendingMessage(_Message(message_id, content), content, None)]
+
+
+async def _never():
+    await asyncio.sleep(3600)
+
+
+async def _settle(generation):
+    try:
+        await generation.task
+    except asyncio.CancelledError:
+        pass
+
+
+async def check_rules():
+    """Confere os cancelamentos antes de medir"""
+    tracker = GenerationTracker()
+
+    # Mensagem apagada
+    generation = tracker.start((1, 1), _never(), _batch(10), 1)
+    assert tracker.cancel_message(10, CANCEL_DELETED)
+    await _settle(generation)
+    assert generation.reason == CANCEL_DELETED and len(tracker) == 0
+
+    # Atualização só de embed (prévia de link, texto igual) não cancela; edição do texto cancela
+    generation = tracker.start((1, 2), _never(), _batch(11, "bot olha https://example.com"), 1)
+    assert not tracker.cancel_edited(11, "bot olha https://example.com")
+    assert not tracker.cancel_edited(11, None)  # Atualização parcial, sem o campo "content"
+    assert not generation.task.done()
+    assert tracker.cancel_edited(11, "bot olha https://example.org")
+    await _settle(generation)
+    assert generation.reason == CANCEL_EDITED
+
+    # Conversa que seguiu em frente
+    generation = tracker.start((1, 3), _never(), _batch(12), 1, stale_messages=3)
+    tracker.note_channel_message(2)
+    for _ in range(2):
+        tracker.note_channel_message(1)
+    assert not generation.task.done()
+    tracker.note_channel_message(1)
+    await _settle(generation)
+    assert generation.reason == CANCEL_CHANNEL
+
+    # Tempo máximo
+    generation = tracker.start((1, 4), _never(), _batch(13), 1, timeout=0.01)
+    await _settle(generation)
+    assert generation.reason == CANCEL_TIMEOUT
+    assert len(tracker) == 0
+
+
+async def check_rate_limited_follow_up():
+    """Uma mensagem seguinte barrada pelo limite não cancela a resposta em andamento (já paga)"""
+    bot = _Responder()
+    assert bot.rate_limiter.acquire(7, 1) is None  # A ficha da resposta em andamento
+    generation = bot.generations.start((1, 7), _never(), _batch(20), 1)
+    assert (1, 7) in bot.generations
+
+    batch = await DiscordBot._collect_batch(bot, PendingMessage(_Message(21, "bot e mais"), "bot e mais", None))
+    assert batch is None and bot.limited == [21]
+    assert not generation.task.done() and generation.reason is None
+
+    # Com ficha disponível, a resposta é refeita com as duas mensagens
+    bot.rate_limiter = RateLimiter(_FakeConfig())
+    batch = await DiscordBot._collect_batch(bot, PendingMessage(_Message(22, "bot e mais"), "bot e mais", None))
+    await _settle(generation)
+    assert [pending.message.id for pending in batch] == [20, 22]
+
+
+async def run(count, in_flight):
+    tracker = GenerationTracker()
+    generations = [
+        tracker.start((channel, channel), _never(), _batch(channel), channel % 50, stale_messages=10 ** 9)
+        for channel in range(in_flight)
+    ]
+    start = time.perf_counter()
+    for i in range(count):
+        tracker.note_channel_message(i % 100)
+    elapsed = time.perf_counter() - start
+    for generation in generations:
+        generation.task.cancel()
+    await asyncio.gather(*(generation.task for generation in generations), return_exceptions=True)
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    in_flight = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    asyncio.run(check_rules())
+    asyncio.run(check_rate_limited_follow_up())
+    elapsed = asyncio.run(run(count, in_flight))
+
+    print(f"{count} mensagens em 100 canais, {in_flight} gerações em andamento em 50 deles")
+    print(f"por mensagem: {elapsed / count * 1e6:.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
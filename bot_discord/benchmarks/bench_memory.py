@@ -0,0 +1,148 @@
+# bench_memory.py
+# Memória ocupada pela memória de curto prazo com muitos canais (dicts x MemoryRecord)
+# e limite de mensagens por canal no SQLite
+#
+# Uso: python benchmarks/bench_memory.py [canais] [mensagens por canal]
+
+import os
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from collections import deque
+from datetime import datetime
+
+# Adiciona o diretório raiz ao path para importações relativas
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import database
+from core.migrate_sqlite import migrate_memory
+from modules.memory import Memory
+
+USERNAMES = ["ana", "pedro", "joao", "maria", "lucas", "bia", "rafa", "carol"]
+
+
+class _FakeConfig:
+    """Configuração mínima para o benchmark"""
+
+    def __init__(self, limit, storage_engine=None):
+        self.limit = limit
+        self.storage_engine = storage_engine
+
+    def get_memory_limit(self):
+        return self.limit
+
+    def get_config_value(self, key, default=None):
+        values = {"memory_persistence": self.storage_engine is not None, "storage_engine": self.storage_engine}
+        return values.get(key, default)
+
+
+def check_sqlite():
+    """O banco guarda só as últimas mensagens de cada canal, e as migradas sem servidor o recebem depois"""
+    with tempfile.TemporaryDirectory() as directory:
+        database.DEFAULT_DB_PATH = os.path.join(directory, "bot.db")
+        config = _FakeConfig(5, database.ENGINE_SQLITE)
+        db = database.get_database(config)
+
+        # memory.json antigo (sem "partition_guilds") e um novo: o servidor só é conhecido no segundo
+        partitions = {"7": [{"user_id": 1, "username": "ana", "content": f"antiga {i}", "timestamp": i} for i in range(3)]}
+        migrate_memory(db, {"partitions": partitions})
+        migrate_memory(db, {"partitions": {"8": partitions["7"]}, "partition_guilds": {"8": 42}})
+        db.flush()
+        assert db.query("SELECT DISTINCT guild_id, channel_id FROM messages ORDER BY channel_id") == [(None, "7"), (42, "8")]
+
+        memory = Memory(config)
+        for i in range(12):
+            memory.add_message(1, "ana", f"nova {i}", partition=7, guild_id=99)
+        db.flush()
+        rows = db.query("SELECT guild_id, content FROM messages WHERE channel_id = '7' ORDER BY timestamp")
+        assert rows == [(99, f"nova {i}") for i in range(7, 12)], rows
+        assert db.query("SELECT COUNT(*) FROM messages WHERE channel_id = '8'") == [(3,)]
+
+        reloaded = Memory(config)
+        assert [msg.content for msg in reloaded.get_short_term_memory(7)] == [f"nova {i}" for i in range(7, 12)]
+        database.close_all()
+
+
+def _username(i):
+    # Nomes chegam do Discord como strings novas a cada mensagem
+    return "".join(list(USERNAMES[i % len(USERNAMES)]))
+
+
+def fill_dicts(channels, per_channel):
+    """Formato antigo: um dict de 5 chaves com timestamp ISO por mensagem"""
+    partitions = {}
+    for channel in range(channels):
+        messages = deque(maxlen=per_channel)
+        for i in range(per_channel):
+            messages.append({
+                "user_id": 1000 + i % 8,
+                "username": _username(i),
+                "content": f"mensagem {i}",
+                "timestamp": datetime.now().isoformat(),
+                "is_bot": False
+            })
+        partitions[str(channel)] = messages
+    return partitions
+
+
+def fill_records(channels, per_channel):
+    """Formato novo: Memory com registros MemoryRecord"""
+    memory = Memory(_FakeConfig(per_channel))
+    for channel in range(channels):
+        for i in range(per_channel):
+            memory.add_message(1000 + i % 8, _username(i), f"mensagem {i}", partition=channel)
+    return memory
+
+
+def legacy_combined(memory, partition):
+    """Comportamento antigo: copia a deque e cria um dict novo por memória de longo prazo"""
+    short_term = list(memory._get_partition(partition))
+    long_term_info = [{
+        "user_id": "system",
+        "username": "system",
+        "content": f"Informação importante: {info['value']}",
+        "timestamp": info['timestamp'],
+        "is_bot": False,
+        "is_memory": True
+    } for info in memory.long_term.values()]
+    return long_term_info + short_term
+
+
+def measure(fill, channels, per_channel):
+    """Bytes alocados (e mantidos) por mensagem"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    data = fill(channels, per_channel)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del data
+    return size / (channels * per_channel)
+
+
+def main():
+    channels = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    per_channel = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+
+    check_sqlite()
+
+    dict_bytes = measure(fill_dicts, channels, per_channel)
+    record_bytes = measure(fill_records, channels, per_channel)
+    print(f"{channels} canais x {per_channel} mensagens")
+    print(f"dict:         {dict_bytes:.0f} bytes por mensagem")
+    print(f"MemoryRecord: {record_bytes:.0f} bytes por mensagem ({1 - record_bytes / dict_bytes:.0%} a menos)")
+
+    # Custo de montar o contexto de uma resposta
+    memory = fill_records(1, per_channel)
+    for i in range(10):
+        memory.store_permanent_info(f"info_{i}", f"informação importante número {i}")
+    repeat = 20000
+    legacy_time = timeit.timeit(lambda: [msg for msg in legacy_combined(memory, 0)], number=repeat)
+    iter_time = timeit.timeit(lambda: [msg for msg in memory.iter_combined_memory(0)], number=repeat)
+    print(f"contexto antigo (cópias):  {legacy_time / repeat * 1e6:.2f} µs por resposta")
+    print(f"iter_combined_memory:      {iter_time / repeat * 1e6:.2f} µs por resposta")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# bench_moderation.py
+# Custo da moderação automática por mensagem (anti-flood, anti-spam e filtro de palavras)
+#
+# Uso: python benchmarks/bench_moderation.py [mensagens] [usuários] [palavras proibidas]
+
+import os
+import sys
+import random
+import time
+
+# Adiciona o diretório raiz ao path para importações relativas
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.moderation import Moderator, REASON_FLOOD, REASON_SPAM, REASON_WORD
+
+WORDS = (
+    "oi", "pessoal", "alguém", "sabe", "como", "configurar", "o", "bot", "hoje", "amanhã",
+    "jogo", "partida", "servidor", "música", "filme", "valeu", "obrigado", "kkkk", "sim", "não"
+)
+
+
+class _FakeConfig:
+    def __init__(self, banned_words):
+        self.version = 0
+        self.values = {
+            "moderation_enabled": True,
+            "mod_antiflood": True,
+            "mod_antispam": True,
+            "mod_wordfilter": True,
+            "banned_words": banned_words
+        }
+
+    def get_config_value(self, key, default=None):
+        return self.values.get(key, default)
+
+
+class _Permissions:
+    manage_messages = False
+
+
+class _Author:
+    guild_permissions = _Permissions()
+
+    def __init__(self, user_id):
+        self.id = user_id
+
+
+class _Guild:
+    id = 1
+
+
+class _Message:
+    guild = _Guild()
+    mentions = ()
+    role_mentions = ()
+
+    def __init__(self, author, content):
+        self.author = author
+        self.content = content
+
+
+def check_rules(banned_words):
+    """Confere as regras antes de medir"""
+    moderator = Moderator(_FakeConfig(banned_words))
+    author = _Author(1)
+    now = 1000.0
+
+    # 5 mensagens em 5 s passam; a sexta é flood
+    verdicts = [moderator.check(_Message(author, f"mensagem {i}"), now + i * 0.5) for i in range(6)]
+    assert verdicts[:5] == [None] * 5 and verdicts[5].reason == REASON_FLOOD, verdicts
+
+    # A terceira repetição em 30 s é spam (espaçadas para não contar como flood)
+    author = _Author(2)
+    verdicts = [moderator.check(_Message(author, "Compre  AGORA"), now + i * 10) for i in range(3)]
+    assert verdicts[:2] == [None, None] and verdicts[2].reason == REASON_SPAM, verdicts
+
+    # Palavras inteiras, sem diferenciar maiúsculas
+    author = _Author(3)
+    assert moderator.check(_Message(author, f"isso é {banned_words[0].upper()}!"), now).reason == REASON_WORD
+    assert moderator.check(_Message(author, f"x{banned_words[0]}x"), now + 10) is None
+
+    # Usuários inativos são descartados
+    moderator.check(_Message(_Author(4), "oi"), now + 10000)
+    assert len(moderator) == 1
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    banned = int(sys.argv[3]) if len(sys.argv) > 3 else 500
+
+    rng = random.Random(11)
+    banned_words = [f"proibida{i}" for i in range(banned)]
+    check_rules(banned_words)
+
+    authors = [_Author(user_id) for user_id in range(users)]
+    messages = [
+        _Message(rng.choice(authors), " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 30))))
+        for _ in range(count)
+    ]
+
+    moderator = Moderator(_FakeConfig(banned_words))
+    # Mensagens espalhadas em 1 hora
+    step = 3600.0 / count
+    start = time.perf_counter()
+    for i, message in enumerate(messages):
+        moderator.check(message, 1000.0 + i * step)
+    elapsed = time.perf_counter() - start
+
+    print(f"{count} mensagens de {users} usuários, {banned} palavras proibidas")
+    print(f"por mensagem:          {elapsed / count * 1e6:.1f} µs")
+    print(f"usuários acompanhados: {len(moderator)}")
+
+
+if __name__ == "__main__":
+    main()
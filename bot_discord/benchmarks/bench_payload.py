@@ -0,0 +1,66 @@
+# bench_payload.py
+# Custo de montar a lista de mensagens enviada ao modelo para contextos grandes
+#
+# Uso: python benchmarks/bench_payload.py [mensagens no contexto] [memórias de longo prazo]
+
+import os
+import sys
+import timeit
+
+# Adiciona o diretório raiz ao path para importações relativas
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.ai_handler import AIHandler
+from modules.memory import Memory
+
+
+class _FakeConfig:
+    """Configuração mínima para o benchmark"""
+
+    def __init__(self, limit):
+        self.limit = limit
+
+    def get_memory_limit(self):
+        return self.limit
+
+    def get_config_value(self, key, default=None):
+        return {"memory_persistence": False, "prompt_layout": "stable", "ai_model": "default"}.get(key, default)
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    memories = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    repeat = 2000
+
+    config = _FakeConfig(size)
+    memory = Memory(config)
+    handler = AIHandler(config)
+    for i in range(memories):
+        memory.store_permanent_info(f"info_{i}", f"informação importante número {i}")
+    for i in range(size):
+        memory.add_message(i % 5, f"usuario{i % 5}", f"mensagem número {i} da conversa", is_bot=i % 2 == 1, partition=1)
+
+    def rebuild():
+        # Converte todo o contexto a cada resposta (comportamento antigo)
+        return handler._build_stable_messages("oi", memory.get_combined_memory(1), "personalidade")
+
+    def incremental():
+        # Nova mensagem + histórico já convertido mantido pela Memory
+        memory.add_message(1, "usuario1", "oi", partition=1)
+        return handler._build_stable_messages("oi", memory.get_llm_context(1), "personalidade")
+
+    def append_only():
+        # Apenas o custo de acrescentar a mensagem (base de comparação para `incremental`)
+        memory.add_message(1, "usuario1", "oi", partition=1)
+
+    # Os dois caminhos devem produzir o mesmo payload
+    assert incremental() == rebuild()
+
+    print(f"Contexto com {size} mensagens e {memories} memórias de longo prazo")
+    for name, func in (("conversão completa", rebuild), ("cache incremental", incremental), ("só add_message", append_only)):
+        elapsed = timeit.timeit(func, number=repeat)
+        print(f"{name:>18}: {elapsed / repeat * 1e6:.1f} µs por resposta")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# bench_prompt_layout.py
+# Compara quanto do prompt se repete entre mensagens seguidas nos formatos stable e legacy
+#
+# O servidor só reaproveita o cache de prompt (KV cache) até o primeiro token
+# diferente, então o prefixo comum entre duas requisições seguidas é o que
+# deixa de ser reprocessado. Com uma URL, as conversas também são enviadas ao
+# servidor e o tempo de processamento do prompt de cada formato é comparado.
+#
+# Uso: python benchmarks/bench_prompt_layout.py [turnos] [url do LM Studio]
+
+import os
+import sys
+import json
+import asyncio
+from datetime import datetime, timedelta
+
+# Adiciona o diretório raiz ao path para importações relativas
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.metrics import metrics
+from modules.ai_handler import AIHandler, PROMPT_LAYOUTS
+from modules.llm_backends import BackendPool
+
+PERSONALITY = "Você é um assistente simpático e direto, que responde em português."
+
+QUESTIONS = [
+    "qual é a capital da Austrália?",
+    "e a população de lá?",
+    "me explica rapidinho o que é um buraco negro",
+    "quanto é 17 vezes 23?",
+    "me dá uma ideia de nome pra um gato",
+    "qual o melhor jeito de aprender python?",
+]
+
+
+class _FakeConfig:
+    """Configuração mínima para o benchmark"""
+
+    def __init__(self, layout):
+        self.values = {"prompt_layout": layout, "ai_model": "default"}
+
+    def get_config_value(self, key, default=None):
+        return self.values.get(key, default)
+
+
+def _memories():
+    """Memórias de longo prazo como o Memory.get_combined_memory as retorna"""
+    base = datetime(2025, 1, 1)
+    return [
+        {"user_id": "system", "username": "system", "content": f"Informação importante: {text}",
+         "timestamp": (base + timedelta(days=i)).isoformat(), "is_bot": False, "is_memory": True}
+        for i, text in enumerate(["o time favorito do Pedro é o Bahia", "a Ana prefere respostas curtas"])
+    ]
+
+
+def _common_prefix(a, b):
+    """Tamanho do prefixo comum entre dois textos"""
+    size = min(len(a), len(b))
+    for i in range(size):
+        if a[i] != b[i]:
+            return i
+    return size
+
+
+def build_turns(handler, turns):
+    """Simula uma conversa e retorna as listas de mensagens enviadas a cada turno"""
+    history = []
+    requests = []
+    stable = handler.uses_stable_layout()
+    for i in range(turns):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        history.append({"user_id": 1, "username": "pedro", "content": question, "is_bot": False})
+        context = _memories() + history
+        if stable:
+            messages = handler._build_stable_messages(question, context, PERSONALITY)
+        else:
+            messages = handler._build_legacy_messages(handler.format_prompt(question, PERSONALITY), context)
+        requests.append(messages)
+        history.append({"user_id": 2, "username": "bot", "content": f"resposta {i}", "is_bot": True})
+    return requests
+
+
+async def send_turns(handler, turns, layout):
+    """Envia uma conversa ao servidor, turno a turno, mantendo o histórico real"""
+    history = []
+    for i in range(turns):
+        question = QUESTIONS[i % len(QUESTIONS)]
+        history.append({"user_id": 1, "username": "pedro", "content": question, "is_bot": False})
+        prompt = question if handler.uses_stable_layout() else handler.format_prompt(question, PERSONALITY)
+        response = await handler.generate_response(prompt, _memories() + history, channel_id=layout, system_prompt=PERSONALITY)
+        history.append({"user_id": 2, "username": "bot", "content": response, "is_bot": True})
+
+
+async def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    url = sys.argv[2] if len(sys.argv) > 2 else None
+
+    for layout in PROMPT_LAYOUTS:
+        handler = AIHandler(_FakeConfig(layout))
+        requests = [json.dumps(messages, ensure_ascii=False) for messages in build_turns(handler, turns)]
+        reused = sum(_common_prefix(prev, cur) for prev, cur in zip(requests, requests[1:]))
+        total = sum(len(cur) for cur in requests[1:])
+        print(f"{layout:>6}: {reused / max(total, 1):.0%} do prompt reaproveitável entre turnos "
+              f"({reused} de {total} caracteres)")
+
+        if url:
+            handler.pool = BackendPool([url])
+            handler.cache_enabled = False
+            await send_turns(handler, turns, layout)
+            await handler.close()
+
+    if url:
+        snapshot = metrics.snapshot("llm.")
+        for name, (count, avg, maximum, last) in sorted(snapshot["timings"].items()):
+            print(f"{name}: {count}x, média {avg * 1000:.0f} ms, máx {maximum * 1000:.0f} ms")
+        for name, value in sorted(snapshot["counters"].items()):
+            print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
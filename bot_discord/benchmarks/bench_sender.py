@@ -0,0 +1,170 @@
+# bench_sender.py
+# Divisão de respostas longas e fila de envio por canal, com um canal falso no lugar do Discord
+#
+# Uso: python benchmarks/bench_sender.py [canais] [respostas por canal] [latência da API em ms]
+
+import os
+import sys
+import asyncio
+import random
+import time
+
+import discord
+
+# Adiciona o diretório raiz ao path para importações relativas
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import progress
+from core.metrics import metrics
+from core.sender import MessageSender, split_message, DISCORD_MESSAGE_LIMIT
+
+PARAGRAPH = ("Esta é uma frase de exemplo para compor parágrafos longos de resposta. " * 6).strip()
+CODE = "```python\n" + "".join(f"print('linha {i} do exemplo')\n" for i in range(120)) + "```"
+
+
+class _FakeChannel:
+    """Canal que registra os envios e recusa quem passar do limite do Discord (5 mensagens em 5 s)"""
+
+    def __init__(self, channel_id, latency, burst, period):
+        self.id = channel_id
+        self.latency = latency
+        self.burst = burst
+        self.period = period
+        self.sent = []
+        self.stamps = []
+
+    async def send(self, content, **kwargs):
+        now = time.monotonic()
+        recent = [stamp for stamp in self.stamps if now - stamp < self.period]
+        if len(recent) >= self.burst:
+            raise RuntimeError("429 Too Many Requests")
+        assert len(content) <= DISCORD_MESSAGE_LIMIT, len(content)
+        await asyncio.sleep(self.latency)
+        self.stamps.append(time.monotonic())
+        self.sent.append(content)
+        return content
+
+
+def check_split():
+    """Confere a divisão antes de medir"""
+    assert split_message("curta") == ["curta"]
+    assert split_message("   ") == []
+
+    # Parágrafos inteiros por parte
+    text = "\n\n".join(f"{i} " + PARAGRAPH for i in range(12))
+    chunks = split_message(text)
+    assert all(len(chunk) <= DISCORD_MESSAGE_LIMIT for chunk in chunks)
+    assert all(chunk[0].isdigit() and chunk.endswith(".") for chunk in chunks), chunks
+    assert "\n\n".join(chunks) == text.strip()
+
+    # Bloco de código longo: fechado no fim de cada parte e reaberto com a linguagem na seguinte
+    chunks = split_message("Veja o código:\n\n" + CODE + "\n\nPronto.")
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert len(chunk) <= DISCORD_MESSAGE_LIMIT
+        assert chunk.count("```") % 2 == 0, chunk
+    assert all(chunk.startswith("```python\n") for chunk in chunks[1:-1])
+    assert chunks[-1].endswith("Pronto.")
+    # Nenhuma linha de código se perde nem é cortada ao meio
+    lines = [line for chunk in chunks for line in chunk.splitlines() if line.startswith("print")]
+    assert lines == CODE.splitlines()[1:-1]
+
+    # Texto sem espaços: corte seco no limite
+    chunks = split_message("x" * 4500)
+    assert "".join(chunks) == "x" * 4500 and all(len(chunk) <= DISCORD_MESSAGE_LIMIT for chunk in chunks)
+
+
+async def check_status_merge():
+    """Avisos na fila do canal viram uma única mensagem"""
+    sender = MessageSender()
+    channel = _FakeChannel(1, 0.01, 5, 5.0)
+    first = asyncio.ensure_future(sender.send(channel, "resposta"))
+    statuses = [asyncio.ensure_future(sender.send_status(channel, text)) for text in ("⏳ a", "⏳ b", "⏳ a")]
+    await asyncio.gather(first, *statuses)
+    assert channel.sent == ["resposta", "⏳ a\n⏳ b"], channel.sent
+
+
+class _FakeResponse:
+    status = 404
+    reason = "Not Found"
+
+
+class _DeletedPlaceholder:
+    """Aviso de fila que o usuário apagou antes da resposta ficar pronta"""
+
+    async def edit(self, **kwargs):
+        raise discord.NotFound(_FakeResponse(), "Unknown Message")
+
+
+async def check_placeholder_fallback():
+    """Se o aviso sumiu, a primeira parte da resposta é enviada como mensagem nova"""
+    sender = MessageSender()
+    channel = _FakeChannel(2, 0.0, 5, 5.0)
+    metrics.reset()
+    sent = await sender.send(channel, "resposta", placeholder=_DeletedPlaceholder())
+    assert sent == ["resposta"] and channel.sent == ["resposta"], (sent, channel.sent)
+    assert metrics.get_counter("sender.placeholder_errors") == 1
+
+
+class _BrokenSender:
+    """Fila de envio que falha com um erro que não é do Discord"""
+
+    async def send(self, channel, text, **kwargs):
+        raise RuntimeError("falha inesperada")
+
+
+async def check_progress_failure():
+    """Um erro no aviso de fila não escapa de stop(): a resposta já gerada ainda é enviada"""
+    progress.PLACEHOLDER_DELAY = 0.01
+    reply_progress = progress.ReplyProgress(_FakeChannel(3, 0.0, 5, 5.0), _BrokenSender())
+    reply_progress.start()
+    reply_progress.queued(1)
+    await asyncio.sleep(0.05)
+    await reply_progress.stop()
+    assert reply_progress.placeholder is None
+
+
+async def run(channels, replies, latency, burst, period):
+    sender = MessageSender(burst=burst, period=period)
+    rng = random.Random(5)
+    fakes = [_FakeChannel(channel_id, latency, burst, period) for channel_id in range(channels)]
+
+    async def reply(channel):
+        text = "\n\n".join(PARAGRAPH for _ in range(rng.randint(1, 8)))
+        return await sender.send(channel, text)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(reply(channel) for channel in fakes for _ in range(replies)))
+    return time.perf_counter() - start, sum(len(channel.sent) for channel in fakes)
+
+
+def main():
+    channels = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    replies = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    latency = (float(sys.argv[3]) if len(sys.argv) > 3 else 50) / 1000
+
+    check_split()
+    asyncio.run(check_status_merge())
+    asyncio.run(check_placeholder_fallback())
+    asyncio.run(check_progress_failure())
+
+    text = "\n\n".join(PARAGRAPH for _ in range(40)) + "\n\n" + CODE
+    count = 2000
+    start = time.perf_counter()
+    for _ in range(count):
+        split_message(text)
+    split_time = (time.perf_counter() - start) / count
+
+    # Limite reduzido (5 mensagens por 0,5 s) para a medição não demorar
+    metrics.reset()
+    elapsed, sent = asyncio.run(run(channels, replies, latency, 5, 0.5))
+
+    print(f"divisão de {len(text)} caracteres: {split_time * 1e6:.1f} µs ({len(split_message(text))} partes)")
+    print(f"{channels} canais x {replies} respostas: {sent} mensagens em {elapsed:.2f} s, sem erro 429")
+    print(f"esperas pelo limite:   {metrics.get_counter('sender.throttled')}")
+    _, mean, maximum, _ = metrics.get_timing("sender.latency")
+    print(f"latência na fila:      média {mean * 1000:.0f} ms, máxima {maximum * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# bench_serialization.py
+# Serialização dos arquivos de memória e cache: json indentado x core.serialization
+#
+# Uso: python benchmarks/bench_serialization.py [canais] [repetições]
+
+import os
+import sys
+import json
+import timeit
+from datetime import datetime, timedelta
+
+# Adiciona o diretório raiz ao path para importações relativas
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import serialization
+
+
+def memory_file(channels):
+    """Conteúdo típico do memory.json com vários canais"""
+    base = datetime(2025, 1, 1)
+    partitions = {
+        str(900000000000000000 + channel): [
+            {
+                "user_id": 100000000000000000 + i % 7,
+                "username": f"usuario{i % 7}",
+                "content": f"mensagem {i} do canal {channel}, com acentuação e emoji 😄",
+                "timestamp": (base + timedelta(minutes=i)).isoformat(),
+                "is_bot": i % 2 == 1
+            }
+            for i in range(25)
+        ]
+        for channel in range(channels)
+    }
+    long_term = {
+        f"user_info_{i:08x}": {"value": f"informação importante número {i}", "timestamp": base.isoformat()}
+        for i in range(200)
+    }
+    return {"short_term": [], "partitions": partitions, "summaries": {}, "long_term": long_term}
+
+
+def search_cache_file():
+    """Conteúdo típico de um arquivo do cache de buscas"""
+    return {
+        "query": "previsão do tempo em salvador",
+        "search_type": "web",
+        "timestamp": datetime.now().timestamp(),
+        "results": [
+            {
+                "title": f"Resultado {i} - previsão do tempo",
+                "link": f"https://exemplo.com.br/previsao/{i}",
+                "snippet": "Previsão do tempo para os próximos dias, com temperatura, chuva e umidade. " * 3
+            }
+            for i in range(10)
+        ]
+    }
+
+
+def compare(name, data, repeat):
+    """Compara o json padrão indentado (formato antigo) com core.serialization"""
+    legacy_text = json.dumps(data, indent=4)
+    new_bytes = serialization.dumps(data)
+
+    legacy_dump = timeit.timeit(lambda: json.dumps(data, indent=4), number=repeat) / repeat
+    new_dump = timeit.timeit(lambda: serialization.dumps(data), number=repeat) / repeat
+    legacy_load = timeit.timeit(lambda: json.loads(legacy_text), number=repeat) / repeat
+    new_load = timeit.timeit(lambda: serialization.loads(new_bytes), number=repeat) / repeat
+
+    assert serialization.loads(new_bytes) == data
+
+    print(f"{name}")
+    print(f"  tamanho:  {len(legacy_text.encode('utf-8')) / 1024:.0f} KiB -> {len(new_bytes) / 1024:.0f} KiB")
+    print(f"  gravação: {legacy_dump * 1000:.2f} ms -> {new_dump * 1000:.2f} ms ({legacy_dump / new_dump:.1f}x)")
+    print(f"  leitura:  {legacy_load * 1000:.2f} ms -> {new_load * 1000:.2f} ms ({legacy_load / new_load:.1f}x)")
+
+
+def main():
+    channels = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    print(f"Backend de serialização: {serialization.BACKEND}")
+    compare(f"memory.json ({channels} canais)", memory_file(channels), repeat)
+    compare("cache de busca", search_cache_file(), repeat * 50)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# bench_special_dates.py
+# Próximas datas especiais: varredura e ordenação a cada chamada x índice ordenado
+# (antes de medir, confere que cada servidor só vê as próprias datas)
+#
+# Uso: python benchmarks/bench_special_dates.py [datas] [repetições]
+
+import os
+import sys
+import asyncio
+import json
+import random
+import tempfile
+import timeit
+from datetime import datetime, timedelta
+
+# Adiciona o diretório raiz ao path para importações relativas
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.config import Config
+from modules.memory import Memory
+from modules.reminders import ReminderScheduler
+from modules.time_handler import TimeHandler
+
+
+class _FakeConfig:
+    def __init__(self, **values):
+        self.values = values
+
+    def get_config_value(self, key, default=None):
+        return self.values.get(key, default)
+
+    def get_memory_limit(self):
+        return 10
+
+
+def check_guild_scope():
+    """As datas registradas em um servidor não aparecem no contexto de outro"""
+    handler = TimeHandler(_FakeConfig())
+    handler.special_dates = {}
+    handler._date_index_stale = True
+    handler._persist_special_date = lambda *args: None
+    memory = Memory(_FakeConfig())
+
+    # O contexto do outro servidor já em cache (mesmo fuso) não pode ser reaproveitado
+    assert "Datas especiais" not in handler.get_time_context_block(222).date_block
+    assert handler.detect_date_triggers("o aniversário da Ana é amanhã", memory, guild_id=111, user_id=5)
+    assert "aniversário Ana amanhã" in handler.get_time_context_block(111).date_block
+    assert "Datas especiais" not in handler.get_time_context_block(222).date_block
+    assert handler.get_upcoming_special_dates(2, guild_id=222) == []
+    assert handler.get_upcoming_special_dates(2) == []
+
+    # O mesmo evento em outro servidor é outra data
+    assert handler.detect_date_triggers("o aniversário da Ana é amanhã", memory, guild_id=222, user_id=6)
+    assert sorted(info["guild_id"] for info in handler.special_dates.values()) == [111, 222]
+    assert handler.get_upcoming_special_dates(2, guild_id=222) == [("aniversário Ana", 1)]
+
+
+class _Guild:
+    def __init__(self, guild_id):
+        self.id = guild_id
+
+
+class _Channel:
+    def __init__(self, channel_id, guild_id):
+        self.id = channel_id
+        self.guild = _Guild(guild_id)
+        self.sent = []
+
+    async def send(self, text):
+        self.sent.append(text)
+
+
+class _Bot:
+    def __init__(self, channels):
+        self.channels = {channel.id: channel for channel in channels}
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+
+def check_timezone_config():
+    """Um config.json só com timezone_offset continua com ele; o fuso IANA vale quando definido"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "config.json")
+        for values, expected in (({"timezone_offset": 2}, timedelta(hours=2)),
+                                 ({"timezone_offset": 2, "timezone": "Asia/Tokyo"}, timedelta(hours=9))):
+            with open(path, "w") as file:
+                json.dump(values, file)
+            handler = TimeHandler(Config(path))
+            assert handler.get_timezone().utcoffset(datetime(2025, 1, 1)) == expected, values
+
+
+def check_reminder_routing():
+    """Os lembretes de uma data vão só para os canais do servidor que a registrou"""
+    channels = [_Channel(1, 111), _Channel(2, 222), _Channel(3, 111)]
+    config = _FakeConfig(reminder_channels=[1, 2, 3, 4], notifications_enabled=True, webhook_url="http://x",
+                         notification_guilds=[222])
+    time_handler = TimeHandler(_FakeConfig())
+    scheduler = ReminderScheduler(_Bot(channels), config, time_handler)
+    posted = []
+
+    async def post_webhook(text):
+        posted.append(text)
+
+    scheduler._post_webhook = post_webhook
+
+    asyncio.run(scheduler.deliver("do 111", 111))
+    asyncio.run(scheduler.deliver("do 222", 222))
+    asyncio.run(scheduler.deliver("sem servidor", None))
+    assert [channel.sent for channel in channels] == [["do 111"], ["do 222"], ["do 111"]]
+    assert posted == ["do 222", "sem servidor"], posted
+
+
+def special_dates(count):
+    """Datas especiais recorrentes espalhadas pelo ano (sem 29/02, que quebrava a versão antiga)"""
+    rng = random.Random(3)
+    return {
+        f"date_{i:08x}": {
+            "name": f"Evento {i}",
+            "day": rng.randint(1, 28),
+            "month": rng.randint(1, 12),
+            "year": None,
+            "recurring": True
+        }
+        for i in range(count)
+    }
+
+
+def legacy_upcoming(handler, limit):
+    """Réplica da implementação anterior (percorre e ordena todas as datas)"""
+    now = handler.get_current_time()
+    upcoming_dates = []
+    for date_info in handler.special_dates.values():
+        day, month = date_info["day"], date_info["month"]
+        if month < now.month or (month == now.month and day < now.day):
+            target_year = now.year + 1
+        else:
+            target_year = now.year
+        upcoming_dates.append((date_info["name"], (datetime(target_year, month, day) - now).days))
+    upcoming_dates.sort(key=lambda x: x[1])
+    return upcoming_dates[:limit]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    check_guild_scope()
+    check_reminder_routing()
+    check_timezone_config()
+
+    handler = TimeHandler(_FakeConfig())
+    handler.special_dates = special_dates(count)
+    handler._date_index_stale = True
+
+    build = timeit.timeit(lambda: handler.get_upcoming_special_dates(2), number=1)
+    legacy = timeit.timeit(lambda: legacy_upcoming(handler, 2), number=repeat) / repeat
+    indexed = timeit.timeit(lambda: handler.get_upcoming_special_dates(2), number=repeat * 100) / (repeat * 100)
+
+    print(f"{count} datas especiais, 2 próximas por chamada")
+    print(f"construção do índice:  {build * 1000:.1f} ms (uma vez)")
+    print(f"varredura completa:    {legacy * 1000:.2f} ms por chamada")
+    print(f"índice ordenado:       {indexed * 1e6:.1f} µs por chamada ({legacy / indexed:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
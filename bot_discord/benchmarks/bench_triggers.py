@@ -0,0 +1,218 @@
+# bench_triggers.py
+# Microbenchmark da detecção de gatilhos em mensagens
+#
+# Uso: python benchmarks/bench_triggers.py [repetições]
+
+import asyncio
+import os
+import sys
+import timeit
+
+# Adiciona o diretório raiz ao path para importações relativas
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.bot import DiscordBot
+from core.message_filter import MessageFilter
+from modules.triggers import TriggerMatcher, MEMORY_TRIGGERS, DATE_TRIGGERS, CATEGORY_MEMORY, CATEGORY_DATE
+
+# Corpus de mensagens típicas de um servidor (maioria sem gatilhos)
+CORPUS = [
+    "bom dia pessoal",
+    "alguém vai jogar hoje à noite?",
+    "kkkkkkkkk",
+    "mano, esse patch novo quebrou tudo",
+    "bro, você sabe qual é a capital da Austrália?",
+    "lembre-se que eu prefiro respostas curtas",
+    "amanhã tem reunião às 10h, não esqueça",
+    "o aniversário da Ana é dia 12/08",
+    "vou sair aqui, até mais",
+    "alguém tem o link daquele vídeo que o João mandou ontem? não estou achando de jeito nenhum no histórico",
+    "guarde essa data: 25/12/2025 encontro da turma",
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "-oi",
+    "sério que o servidor caiu de novo?",
+    "Anote que meu time favorito é o Bahia",
+    "isso é muito estranho, já tentei reiniciar três vezes e continua dando erro de conexão no jogo",
+    "👍",
+    "tem evento no sábado?",
+    "bora",
+    "eu acho que a resposta é 42, mas posso estar enganado",
+]
+
+
+class _FakeConfig:
+    """Configuração mínima para o benchmark"""
+
+    version = 0
+
+    def get_config_value(self, key, default=None):
+        return {"bot_keyword": "bro"}.get(key, default)
+
+    def get_prefix(self):
+        return "-"
+
+
+class _FakeCommands:
+    """Comandos personalizados mínimos para o benchmark"""
+
+    custom_commands = {"oi": {}, "regras": {}, "discord": {}}
+    custom_commands_version = 0
+
+
+class _OverlapCommands:
+    """Comando cujo nome também começa um gatilho ("-anote" e "anote a data")"""
+
+    custom_commands = {"anote": {}}
+    custom_commands_version = 0
+
+
+class _User:
+    def __init__(self, user_id, bot=False):
+        self.id = user_id
+        self.bot = bot
+
+    def __eq__(self, other):
+        return isinstance(other, _User) and other.id == self.id
+
+    __hash__ = None
+
+
+BOT_USER = _User(1, bot=True)
+
+
+class _Channel:
+    id = 10
+
+
+class _Reference:
+    def __init__(self, replied):
+        self.resolved = replied
+        self.cached_message = None
+
+
+class _Message:
+    channel = _Channel()
+
+    def __init__(self, content, author=None, reference=None, mentions=()):
+        self.content = content
+        self.author = author or _User(2)
+        self.reference = reference
+        self.mentions = list(mentions)
+
+
+def reference_hits(matcher, text):
+    """Todas as ocorrências de cada gatilho, por busca direta (sobrepostas ou não)"""
+    text = text.lower()
+    memory, date = [], []
+    for pattern, entries in matcher._categories.items():
+        position = text.find(pattern)
+        while position >= 0:
+            for category, trigger in entries:
+                if category == CATEGORY_MEMORY:
+                    memory.append((trigger, position))
+                elif category == CATEGORY_DATE:
+                    date.append((trigger, position))
+            position = text.find(pattern, position + 1)
+    return sorted(memory), sorted(date)
+
+
+def check_scan():
+    """Confere a varredura contra a busca direta, inclusive com gatilhos sobrepostos"""
+    matcher = TriggerMatcher(_FakeConfig(), _OverlapCommands())
+    hits = matcher.scan("-anote a data: reunião 10/05")
+    assert hits.command == ["anote"], hits
+    assert hits.memory == [("anote", 1)], hits
+    assert hits.date == [("anote a data", 1), ("reunião", 15)], hits
+
+    for text in CORPUS + ["-anote a data", "salve essa data do evento", "lembre-se da data, bro", "anotanote"]:
+        hits = matcher.scan(text)
+        assert (sorted(hits.memory), sorted(hits.date)) == reference_hits(matcher, text), (text, hits)
+        assert hits.keyword == ("bro" in text.lower()), (text, hits)
+
+
+def check_filter(matcher):
+    """Respostas só acionam o bot quando citam uma mensagem dele (ou o mencionam)"""
+    message_filter = MessageFilter(_FakeConfig(), matcher)
+    other = _User(3)
+
+    def passes(message):
+        return message_filter.check(message, BOT_USER, "-") is not None
+
+    assert passes(_Message("oi", reference=_Reference(_Message("olá", author=BOT_USER))))
+    assert passes(_Message("oi", reference=_Reference(_Message("olá", author=other)), mentions=[BOT_USER]))
+    # Conversa entre usuários, mensagem citada apagada ou fora do cache: descartadas
+    assert not passes(_Message("concordo", reference=_Reference(_Message("olá", author=other))))
+    assert not passes(_Message("concordo", reference=_Reference(object())))
+    assert not passes(_Message("concordo", reference=_Reference(None)))
+    # Menção, palavra-chave e comando continuam passando
+    assert passes(_Message("<@1> oi")) and passes(_Message("e aí bro")) and passes(_Message("-oi"))
+    return message_filter
+
+
+class _Responder:
+    """O suficiente do DiscordBot para _handle_message_response"""
+
+    def __init__(self, matcher):
+        self.bot = _Bot()
+        self.trigger_matcher = matcher
+        self.collected = []
+
+    async def _collect_batch(self, pending):
+        self.collected.append(pending.text)
+        return None
+
+
+class _Bot:
+    user = BOT_USER
+
+
+async def check_response(matcher):
+    """Toda mensagem que passa pelo filtro como gatilho recebe resposta, inclusive respostas ao bot"""
+    bot = _Responder(matcher)
+    replies = [
+        _Message("e o outro?", reference=_Reference(_Message("olá", author=BOT_USER))),
+        _Message("<@1> e o outro?", reference=_Reference(_Message("olá", author=_User(3))), mentions=[BOT_USER]),
+        _Message("e aí bro"),
+        _Message("concordo", reference=_Reference(_Message("olá", author=_User(3)))),
+    ]
+    for message in replies:
+        await DiscordBot._handle_message_response(bot, message)
+    assert bot.collected == ["e o outro?", "e o outro?", "e aí bro"], bot.collected
+
+
+def legacy_scan(text, keyword="bro"):
+    """Reproduz a detecção anterior: várias chamadas a lower() e laços com `in`"""
+    contains_keyword = keyword and keyword.lower() in text.lower()
+    message_lower = text.lower()
+    memory = [t for t in MEMORY_TRIGGERS if t in message_lower][:1]
+    message_lower = text.lower()
+    date = [t for t in DATE_TRIGGERS if t in message_lower][:1]
+    return contains_keyword, memory, date
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    matcher = TriggerMatcher(_FakeConfig(), _FakeCommands())
+    matcher.scan("")  # Compila o autômato fora da medição
+    check_scan()
+    message_filter = check_filter(matcher)
+    asyncio.run(check_response(matcher))
+    messages = [_Message(text) for text in CORPUS]
+
+    total = len(CORPUS) * repeat
+    legacy = timeit.timeit(lambda: [legacy_scan(m) for m in CORPUS], number=repeat)
+    scan = timeit.timeit(lambda: [matcher.scan(m) for m in CORPUS], number=repeat)
+    keyword = timeit.timeit(lambda: [matcher.matches_keyword(m) for m in CORPUS], number=repeat)
+    filtered = timeit.timeit(lambda: [message_filter.check(m, BOT_USER, "-") for m in messages], number=repeat)
+
+    # A detecção anterior só encontrava o primeiro gatilho de memória e de data (sem comandos nem posições);
+    # o scan encontra todos na mesma passada, com custo parecido
+    print(f"Mensagens processadas: {total}")
+    print(f"Detecção anterior (lower + laços, só o primeiro gatilho): {legacy / total * 1e6:.2f} µs/mensagem")
+    print(f"TriggerMatcher.scan (todos os gatilhos, com posições): {scan / total * 1e6:.2f} µs/mensagem")
+    print(f"TriggerMatcher.matches_keyword: {keyword / total * 1e6:.2f} µs/mensagem")
+    print(f"MessageFilter.check: {filtered / total * 1e6:.2f} µs/mensagem")
+
+
+if __name__ == "__main__":
+    main()
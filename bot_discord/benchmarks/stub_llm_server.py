@@ -0,0 +1,74 @@
+# stub_llm_server.py
+# Servidores falsos compatíveis com a API da OpenAI para testar o pool de backends
+#
+# Uso: python benchmarks/stub_llm_server.py [porta_inicial] [quantidade] [latência_ms]
+
+import sys
+import asyncio
+
+from aiohttp import web
+
+
+def create_app(name, latency=0.2, fail_rate=0.0, model="default", error_status=500):
+    """Cria um servidor falso que responde a /v1/models e /v1/chat/completions (falhas com `error_status`)"""
+    state = {"requests": 0, "in_flight": 0, "max_in_flight": 0}
+
+    async def models(request):
+        return web.json_response({"data": [{"id": model}]})
+
+    async def chat(request):
+        payload = await request.json()
+        state["requests"] += 1
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        try:
+            await asyncio.sleep(latency)
+            # Falhas determinísticas: a cada 1/fail_rate requisições
+            if fail_rate and state["requests"] % max(1, round(1 / fail_rate)) == 0:
+                return web.json_response({"error": "falha simulada"}, status=error_status)
+            prompt_tokens = sum(len(m.get("content", "").split()) for m in payload.get("messages", []))
+            return web.json_response({
+                "choices": [{"message": {"role": "assistant", "content": f"resposta de {name}"}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 3}
+            })
+        finally:
+            state["in_flight"] -= 1
+
+    app = web.Application()
+    app["state"] = state
+    app.router.add_get("/v1/models", models)
+    app.router.add_post("/v1/chat/completions", chat)
+    return app
+
+
+async def start_servers(first_port, count, latency=0.2, fail_rate=0.0, error_status=500):
+    """Inicia `count` servidores em portas consecutivas e retorna (runners, urls, estados)"""
+    runners, urls, states = [], [], []
+    for i in range(count):
+        port = first_port + i
+        app = create_app(f"stub-{port}", latency=latency, fail_rate=fail_rate, error_status=error_status)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        runners.append(runner)
+        urls.append(f"http://127.0.0.1:{port}/v1")
+        states.append(app["state"])
+    return runners, urls, states
+
+
+async def main():
+    first_port = int(sys.argv[1]) if len(sys.argv) > 1 else 11234
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    latency = int(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.2
+
+    _, urls, _ = await start_servers(first_port, count, latency)
+    print("Servidores falsos em execução. Use no .env:")
+    print(f"LM_STUDIO_API_URLS={','.join(urls)}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
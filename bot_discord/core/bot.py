@@ -5,18 +5,35 @@ import discord
 from discord.ext import commands
 import os
 import sys
+import time
+import signal
+import asyncio
 import logging
 
 # Adiciona o diretório raiz ao path para importações relativas
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from core import database, persistence
 from core.config import Config
+from core.debounce import MessageDebouncer, PendingMessage
+from core.generations import GenerationTracker, CANCEL_DELETED, CANCEL_TIMEOUT
 from core.logger import setup_logger
+from core.message_filter import MessageFilter
+from core.metrics import metrics
+from core.moderation import Moderator, WARNINGS
+from core.progress import ReplyProgress
+from core.rate_limit import RateLimiter
+from core.sender import MessageSender
+from modules.triggers import TriggerMatcher
 
 # Configuração do logger
 logger = setup_logger(__name__)
 
 class DiscordBot:
+    # Módulos na ordem de dependência (os últimos dependem dos anteriores)
+    MODULE_NAMES = ('memory', 'ai_handler', 'search_engine', 'time_handler', 'summarizer', 'reminders', 'command_handler')
+    DEPENDENT_MODULES = ('summarizer', 'reminders', 'command_handler')
+    
     def __init__(self):
         self.config = Config()
         self.token = self.config.get_token()
@@ -29,8 +46,31 @@ class DiscordBot:
         # Inicialização do bot com prefixo de comando
         self.bot = commands.Bot(command_prefix=self.config.get_prefix(), intents=intents)
         
-        # Módulos do bot (serão inicializados sob demanda)
+        # Módulos do bot (inicializados em paralelo no setup_hook)
         self._modules = {}
+        self._warm_up_task = None
+        self.bot.setup_hook = self._setup_hook
+        # O encerramento (Ctrl+C, SIGTERM ou fim de run) passa pelo close do DiscordBot
+        self.bot.close = self.close
+        
+        # Detector de gatilhos (palavra-chave, memória, datas e comandos) em uma única varredura
+        self.trigger_matcher = TriggerMatcher(self.config)
+        
+        # Pré-filtro que descarta conversas que não envolvem o bot antes de qualquer processamento
+        self.message_filter = MessageFilter(self.config, self.trigger_matcher)
+        
+        # Moderação automática (anti-flood, anti-spam e filtro de palavras), aplicada a todas as mensagens
+        self.moderator = Moderator(self.config)
+        
+        # Limite de respostas da IA por usuário, canal e servidor
+        self.rate_limiter = RateLimiter(self.config)
+        
+        # Agrupamento de mensagens seguidas e respostas em geração por (canal, usuário)
+        self.debouncer = MessageDebouncer()
+        self.generations = GenerationTracker()
+        
+        # Fila de envio por canal: divide respostas longas e respeita o limite de envio do Discord
+        self.sender = MessageSender()
         
         # Registrar eventos
         self.register_events()
@@ -44,129 +84,406 @@ class DiscordBot:
             
         @self.bot.event
         async def on_message(message):
-            # Ignora mensagens do próprio bot
-            if message.author == self.bot.user:
+            # Moderação antes de tudo: vale também para as conversas que não envolvem o bot
+            if not message.author.bot:
+                # Uma conversa que seguiu em frente torna obsoletas as respostas ainda em geração no canal
+                self.generations.note_channel_message(message.channel.id)
+                
+                verdict = self.moderator.check(message)
+                if verdict is not None:
+                    await self._moderate(message, verdict)
+                    return
+            
+            # Descarta mensagens de bots, de canais ignorados e sem prefixo, menção ou palavra-chave
+            decision = self.message_filter.check(message, self.bot.user, self.bot.command_prefix)
+            if decision is None:
                 return
                 
             # Processa comandos
-            await self.bot.process_commands(message)
+            if decision.command:
+                await self.bot.process_commands(message)
             
             # Lógica para responder a menções ou palavras-chave
-            await self._handle_message_response(message)
+            if decision.trigger:
+                await self._handle_message_response(message)
+        
+        @self.bot.event
+        async def on_raw_message_delete(payload):
+            # Eventos "raw" chegam mesmo para mensagens fora do cache do discord.py
+            self.generations.cancel_message(payload.message_id, CANCEL_DELETED)
+        
+        @self.bot.event
+        async def on_raw_message_edit(payload):
+            # Só edições do texto: o Discord também envia atualizações ao gerar prévias de links e embeds.
+            # payload.data existe em todo o discord.py 2.x (payload.message só a partir do 2.5)
+            self.generations.cancel_edited(payload.message_id, payload.data.get("content"))
+    
+    async def _moderate(self, message, verdict):
+        """Remove uma mensagem barrada pela moderação e avisa o autor (no máximo uma vez por janela)"""
+        logger.info(f"Mensagem de {message.author.name} barrada pela moderação ({verdict.reason})")
+        try:
+            await message.delete()
+        except discord.Forbidden:
+            logger.warning(f"Sem permissão para apagar mensagens no canal {message.channel.id}")
+        except discord.HTTPException as e:
+            logger.warning(f"Erro ao apagar mensagem barrada pela moderação: {e}")
+        
+        if verdict.warn:
+            try:
+                await self.sender.send_status(
+                    message.channel, f"⚠️ {message.author.mention}, {WARNINGS[verdict.reason]}", delete_after=10
+                )
+            except discord.HTTPException as e:
+                logger.warning(f"Erro ao enviar aviso de moderação: {e}")
     
     async def _handle_message_response(self, message):
-        """Processa mensagens para responder a menções ou palavras-chave"""
+        """Processa mensagens para responder a menções, respostas ao bot ou palavras-chave"""
         # Verifica se o bot foi mencionado
         was_mentioned = self.bot.user in message.mentions
         
-        # Verifica se a mensagem contém a palavra-chave configurada
-        keyword = self.config.get_config_value('bot_keyword', '')
-        contains_keyword = keyword and keyword.lower() in message.content.lower()
+        # Varre a mensagem uma única vez em busca de todos os gatilhos
+        hits = self.trigger_matcher.scan(message.content)
         
-        # Se o bot foi mencionado ou a palavra-chave foi detectada
-        if was_mentioned or contains_keyword:
-            # Inicializa os módulos necessários sob demanda
-            if 'memory' not in self._modules:
-                from modules.memory import Memory
-                self._modules['memory'] = Memory(self.config)
-            
-            if 'ai_handler' not in self._modules:
-                from modules.ai_handler import AIHandler
-                self._modules['ai_handler'] = AIHandler(self.config)
-            
-            if 'search_engine' not in self._modules:
-                from modules.search import SearchEngine
-                self._modules['search_engine'] = SearchEngine(self.config)
-            
-            if 'time_handler' not in self._modules:
-                from modules.time_handler import TimeHandler
-                self._modules['time_handler'] = TimeHandler(self.config)
-            
-            if 'command_handler' not in self._modules:
-                from modules.commands import CommandHandler
-                self._modules['command_handler'] = CommandHandler(
-                    self.bot,
-                    self.config,
-                    self._modules['memory'],
-                    self._modules['ai_handler'],
-                    self._modules['search_engine']
-                )
-            
-            # Adiciona a mensagem à memória
-            self._modules['memory'].add_message(message.author.id, message.author.name, message.content)
+        # Só responde se o bot foi mencionado, respondido (reply a uma mensagem dele) ou a palavra-chave foi detectada
+        if not (was_mentioned or hits.keyword or MessageFilter.is_reply_to_bot(message, self.bot.user)):
+            return
+        
+        # Remove a menção do bot da mensagem, se presente
+        user_message = message.content
+        if was_mentioned:
+            user_message = user_message.replace(f'<@{self.bot.user.id}>', '').replace(f'<@!{self.bot.user.id}>', '').strip()
+        
+        # Mensagens seguidas do mesmo usuário no canal viram uma única resposta (se debounce_ms estiver ativo)
+        batch = await self._collect_batch(PendingMessage(message, user_message, hits))
+        if batch is not None:
+            await self._respond(batch)
+    
+    def _debounce_window(self, channel_id):
+        """Janela (s) de agrupamento do canal: channel_debounce_ms[canal] ou debounce_ms"""
+        overrides = self.config.get_config_value('channel_debounce_ms') or {}
+        milliseconds = overrides.get(str(channel_id), self.config.get_config_value('debounce_ms', 0))
+        return max(0.0, float(milliseconds or 0) / 1000)
+    
+    async def _collect_batch(self, pending):
+        """Espera a janela de agrupamento e retorna as mensagens a responder juntas (None se outra assumiu o lote)"""
+        message = pending.message
+        window = self._debounce_window(message.channel.id)
+        if window <= 0:
+            return [pending]
+        
+        # Uma resposta ainda sendo gerada para o mesmo usuário é cancelada e refeita com a nova mensagem
+        key = (message.channel.id, message.author.id)
+        if key in self.generations:
+            # ...mas só se a nova resposta passar pelo limite: senão, a resposta em andamento (já paga) continua
+            limited = self.rate_limiter.check(
+                message.author.id, message.channel.id, message.guild.id if message.guild else None
+            )
+            if limited is not None:
+                await self._notify_rate_limited(message, limited)
+                return None
+        carried = self.generations.cancel_key(key) or ()
+        
+        batch = await self.debouncer.submit(key, pending, window, carried)
+        if batch is not None and len(batch) > 1:
+            metrics.incr("replies.merged", len(batch) - 1)
+        return batch
+    
+    async def _notify_rate_limited(self, message, limited):
+        """Registra uma mensagem barrada pelo limite de respostas e marca que ela foi vista"""
+        logger.info(
+            f"Mensagem de {message.author.name} ignorada pelo limite de respostas "
+            f"({limited.scope}, nova ficha em {limited.retry_after:.0f} s)"
+        )
+        try:
+            await message.add_reaction('⏳')  # Indica que o bot viu a mensagem, mas não vai responder agora
+        except discord.HTTPException:
+            pass
+    
+    async def _respond(self, batch):
+        """Gera e envia uma única resposta para um lote de mensagens do mesmo usuário no mesmo canal"""
+        message = batch[-1].message
+        channel_id = message.channel.id
+        guild_id = message.guild.id if message.guild else None
+        
+        # Limite de respostas, antes de qualquer trabalho de memória ou IA
+        limited = self.rate_limiter.acquire(message.author.id, channel_id, guild_id)
+        if limited is not None:
+            await self._notify_rate_limited(message, limited)
+            return
+        
+        # Garante que os módulos existam (normalmente já foram carregados no setup_hook)
+        self.load_commands()
+        
+        for pending in batch:
+            if pending.ingested:
+                continue
+            pending.ingested = True
             
-            # Remove a menção do bot da mensagem, se presente
-            user_message = message.content
-            if was_mentioned:
-                user_message = user_message.replace(f'<@{self.bot.user.id}>', '').strip()
-                
             # Verifica se a mensagem contém gatilhos para armazenar na memória de longo prazo
-            memory_triggered = self._modules['ai_handler'].detect_memory_triggers(user_message, self._modules['memory'])
-            if memory_triggered:
-                await message.add_reaction('💾')  # Adiciona uma reação para indicar que a informação foi armazenada
-            
-            # Obtém o contexto da conversa da memória (combinando memória de curto e longo prazo)
-            context = self._modules['memory'].get_combined_memory()
-            
-            # Obtém a personalidade configurada do bot
-            bot_personality = self.config.get_config_value('bot_personality', '')
-            
-            # Formata o prompt com a personalidade do bot
-            formatted_prompt = self._modules['ai_handler'].format_prompt(user_message, bot_personality)
-            
-            # Gera a resposta usando o LM Studio (método assíncrono)
-            response = await self._modules['ai_handler'].generate_response(formatted_prompt, context)
-            
-            # Processa a resposta para melhorar a inteligibilidade
-            processed_response = self._modules['ai_handler'].process_response(response)
-            
-            # Adiciona a resposta do bot à memória
-            self._modules['memory'].add_message(self.bot.user.id, self.bot.user.name, processed_response, is_bot=True)
+            if pending.hits.memory:
+                memory_triggered = self._modules['ai_handler'].detect_memory_triggers(
+                    pending.text, self._modules['memory'], trigger=pending.hits.first_memory_trigger(),
+                    user_id=message.author.id, guild_id=guild_id
+                )
+                if memory_triggered:
+                    await pending.message.add_reaction('💾')  # Adiciona uma reação para indicar que a informação foi armazenada
             
-            # Envia a resposta
-            await message.channel.send(processed_response)
-            logger.info(f"Respondeu a uma mensagem de {message.author.name}")
+            # Verifica se a mensagem contém gatilhos para registrar datas especiais
+            if pending.hits.date:
+                date_triggered = self._modules['time_handler'].detect_date_triggers(
+                    pending.text, self._modules['memory'], trigger=pending.hits.first_date_trigger(),
+                    guild_id=guild_id, user_id=message.author.id
+                )
+                if date_triggered:
+                    await pending.message.add_reaction('📅')  # Adiciona uma reação para indicar que a data foi registrada
+        
+        # As mensagens do lote formam um único turno do usuário
+        user_message = "\n".join(pending.text for pending in batch if pending.text)
+        
+        # Se o modelo está sendo carregado ou o servidor está fora do ar, responde rapidamente em vez de esperar pelo timeout
+        ai_handler = self._modules['ai_handler']
+        if ai_handler.is_degraded():
+            self._modules['memory'].add_message(
+                message.author.id, message.author.name, user_message, partition=channel_id, guild_id=guild_id
+            )
+            if ai_handler.is_offline():
+                # O monitoramento de saúde volta a usar o servidor quando ele responder
+                metrics.incr("ai.offline_replies")
+                await self.sender.send_status(message.channel, "⚠️ O servidor de IA está fora do ar no momento. Tente novamente mais tarde.")
+            else:
+                ai_handler.request_warm_up()
+                metrics.incr("ai.degraded_replies")
+                await self.sender.send_status(message.channel, "⏳ O modelo de IA está sendo carregado. Tente novamente em alguns instantes.")
+            return
+        
+        # "Digitando..." durante a geração; na fila de backends, um aviso com a posição (editado com a resposta)
+        progress = ReplyProgress(message.channel, self.sender)
+        progress.start()
+        
+        # A geração roda em uma tarefa própria, cancelada (junto com a requisição ao LM Studio) se uma
+        # mensagem mais nova do usuário a substituir, se a mensagem for apagada ou editada, ou se ficar obsoleta
+        generation = self.generations.start(
+            (channel_id, message.author.id), self._generate(message, user_message, guild_id, progress),
+            batch, channel_id,
+            timeout=self.config.get_config_value('generation_stale_seconds', 120) or None,
+            stale_messages=self.config.get_config_value('generation_stale_messages', 15) or None
+        )
+        try:
+            response = await generation.task
+        except asyncio.CancelledError:
+            if generation.reason is None:
+                # O próprio handler foi cancelado (ex: desligamento do bot)
+                generation.task.cancel()
+                asyncio.ensure_future(progress.discard())
+                raise
+            logger.info(f"Resposta para {message.author.name} cancelada ({generation.reason})")
+            await progress.discard()
+            if generation.reason == CANCEL_TIMEOUT:
+                await self.sender.send_status(message.channel, "Desculpe, a resposta demorou demais e foi cancelada. Tente novamente.")
+            return
+        except Exception:
+            await progress.discard()
+            raise
+        
+        # Processa a resposta para melhorar a inteligibilidade
+        processed_response = self._modules['ai_handler'].process_response(response)
+        
+        # Adiciona a mensagem e a resposta do bot à memória do canal
+        self._modules['memory'].add_message(
+            message.author.id, message.author.name, user_message, partition=channel_id, guild_id=guild_id
+        )
+        self._modules['memory'].add_message(
+            self.bot.user.id, self.bot.user.name, processed_response, is_bot=True,
+            partition=channel_id, guild_id=guild_id
+        )
+        
+        # Condensa as mensagens antigas do canal em segundo plano, se a conversa ficou longa
+        self._modules['summarizer'].maybe_summarize(channel_id)
+        
+        # Envia a resposta (dividida em partes de até 2000 caracteres, se necessário), no lugar do aviso de fila
+        await progress.stop()
+        await self.sender.send(message.channel, processed_response, placeholder=progress.placeholder)
+        logger.info(f"Respondeu a {len(batch)} mensagem(ns) de {message.author.name}")
     
-    def load_commands(self):
-        """Carrega os módulos e comandos do bot"""
-        # Inicializa todos os módulos necessários
-        if 'memory' not in self._modules:
-            from modules.memory import Memory
-            self._modules['memory'] = Memory(self.config)
+    async def _generate(self, message, user_message, guild_id, progress=None):
+        """Gera a resposta da IA para a mensagem atual (ainda fora da memória) com o contexto do canal"""
+        # Obtém o contexto da conversa da memória (histórico do canal, memórias compartilhadas e as do autor)
+        context = self._modules['memory'].get_llm_context(
+            message.channel.id, user_id=message.author.id, guild_id=guild_id
+        )
         
-        if 'ai_handler' not in self._modules:
-            from modules.ai_handler import AIHandler
-            self._modules['ai_handler'] = AIHandler(self.config)
+        # Obtém a personalidade configurada do bot
+        bot_personality = self.config.get_config_value('bot_personality', '')
         
-        if 'search_engine' not in self._modules:
-            from modules.search import SearchEngine
-            self._modules['search_engine'] = SearchEngine(self.config)
+        # Data e hora no fuso do servidor (em cache até o minuto ou o dia mudarem)
+        time_context = None
+        if self.config.get_config_value('time_context_enabled', True):
+            time_context = self._modules['time_handler'].get_time_context_block(guild_id)
         
-        if 'time_handler' not in self._modules:
-            from modules.time_handler import TimeHandler
-            self._modules['time_handler'] = TimeHandler(self.config)
+        # Gera a resposta usando o LM Studio (método assíncrono)
+        if self._modules['ai_handler'].uses_stable_layout():
+            # A personalidade fica no prefixo de sistema, que se mantém igual entre as mensagens
+            return await self._modules['ai_handler'].generate_response(
+                user_message, context, channel_id=message.channel.id, system_prompt=bot_personality,
+                time_context=time_context, progress=progress
+            )
         
-        if 'command_handler' not in self._modules:
+        # Formata o prompt com a personalidade do bot
+        formatted_prompt = self._modules['ai_handler'].format_prompt(user_message, bot_personality)
+        return await self._modules['ai_handler'].generate_response(
+            formatted_prompt, context, channel_id=message.channel.id, time_context=time_context, progress=progress
+        )
+    
+    def _create_module(self, name):
+        """Cria a instância de um módulo pelo nome"""
+        if name == 'memory':
+            from modules.memory import Memory
+            return Memory(self.config)
+        if name == 'ai_handler':
+            from modules.ai_handler import AIHandler
+            return AIHandler(self.config)
+        if name == 'search_engine':
+            from modules.search import SearchEngine
+            return SearchEngine(self.config)
+        if name == 'time_handler':
+            from modules.time_handler import TimeHandler
+            return TimeHandler(self.config)
+        if name == 'summarizer':
+            from modules.summarizer import ConversationSummarizer
+            return ConversationSummarizer(self.config, self._modules['memory'], self._modules['ai_handler'])
+        if name == 'reminders':
+            from modules.reminders import ReminderScheduler
+            return ReminderScheduler(self.bot, self.config, self._modules['time_handler'], sender=self.sender)
+        if name == 'command_handler':
             from modules.commands import CommandHandler
-            self._modules['command_handler'] = CommandHandler(
+            return CommandHandler(
                 self.bot,
                 self.config,
                 self._modules['memory'],
                 self._modules['ai_handler'],
                 self._modules['search_engine']
             )
+        raise ValueError(f"Módulo desconhecido: {name}")
+    
+    def _register_module(self, name, module, elapsed):
+        """Registra um módulo inicializado e o tempo gasto na inicialização"""
+        self._modules[name] = module
+        if name == 'command_handler':
+            self.trigger_matcher.set_command_handler(module)
+        metrics.observe(f"startup.{name}", elapsed)
+        logger.info(f"Módulo {name} inicializado em {elapsed * 1000:.0f} ms")
+    
+    def load_commands(self):
+        """Carrega os módulos e comandos do bot de forma síncrona (apenas os que ainda não existem)"""
+        for name in self.MODULE_NAMES:
+            if name not in self._modules:
+                start = time.perf_counter()
+                module = self._create_module(name)
+                self._register_module(name, module, time.perf_counter() - start)
+    
+    async def load_modules(self):
+        """Inicializa os módulos em paralelo, com a E/S de disco executada em threads"""
+        loop = asyncio.get_running_loop()
+        startup_start = time.perf_counter()
+        
+        async def init_in_thread(name):
+            start = time.perf_counter()
+            module = await loop.run_in_executor(None, self._create_module, name)
+            self._register_module(name, module, time.perf_counter() - start)
+        
+        # Módulos independentes são carregados ao mesmo tempo
+        independent = [name for name in self.MODULE_NAMES if name not in self.DEPENDENT_MODULES and name not in self._modules]
+        results = await asyncio.gather(*(init_in_thread(name) for name in independent), return_exceptions=True)
+        failed = [(name, result) for name, result in zip(independent, results) if isinstance(result, Exception)]
+        for name, error in failed:
+            logger.error(f"Erro ao inicializar o módulo {name}: {error}")
+        if failed:
+            # Sem os módulos base o bot não funciona: recriá-los em load_commands só repetiria o erro
+            raise failed[0][1]
+
+        # O resumidor, os lembretes e o CommandHandler (que registra comandos no bot) dependem dos demais módulos
+        self.load_commands()
+        
+        elapsed = time.perf_counter() - startup_start
+        metrics.observe("startup.total", elapsed)
+        logger.info(f"Módulos inicializados em {elapsed * 1000:.0f} ms")
+        
+        # Aquece a conexão com o LM Studio e o modelo sem atrasar a conexão com o Discord
+        self._warm_up_task = asyncio.create_task(self._warm_up_ai())
+        
+        # Monitora o LM Studio e mantém o modelo carregado durante as horas ativas
+        self._modules['ai_handler'].start_health_monitor()
+        
+        # Dorme até o próximo lembrete de data especial
+        self._modules['reminders'].start()
+        
+        # Grava os arquivos em data/ em segundo plano, fora do caminho de cada mensagem
+        persistence.scheduler.configure(
+            interval=self.config.get_config_value('flush_interval', persistence.DEFAULT_FLUSH_INTERVAL),
+            max_pending=self.config.get_config_value('flush_max_pending', persistence.DEFAULT_FLUSH_MAX_PENDING)
+        )
+        persistence.scheduler.start()
+    
+    async def _warm_up_ai(self):
+        """Envia uma requisição mínima ao LM Studio para carregar o modelo antes da primeira mensagem"""
+        start = time.perf_counter()
+        success = await self._modules['ai_handler'].request_warm_up()
+        elapsed = time.perf_counter() - start
+        metrics.observe("startup.ai_warm_up", elapsed)
+        if success:
+            logger.info(f"Modelo de IA aquecido em {elapsed * 1000:.0f} ms")
+        else:
+            logger.warning(f"Não foi possível aquecer o modelo de IA ({elapsed * 1000:.0f} ms)")
+    
+    async def _setup_hook(self):
+        """Executado pelo discord.py antes da conexão com o gateway"""
+        await self.load_modules()
+        
+    async def close(self):
+        """Encerra as tarefas de fundo e as sessões HTTP dos módulos antes de desconectar do Discord"""
+        if self._warm_up_task is not None:
+            self._warm_up_task.cancel()
+            self._warm_up_task = None
+        
+        # Os módulos com tarefas ou conexões próprias: resumos, lembretes e o pool de backends da IA
+        for name in ('summarizer', 'reminders', 'ai_handler'):
+            module = self._modules.get(name)
+            if module is None:
+                continue
+            try:
+                await module.close()
+            except Exception as e:
+                logger.error(f"Erro ao encerrar o módulo {name}: {e}")
+        
+        await commands.Bot.close(self.bot)
+    
+    def _handle_sigterm(self, signum, frame):
+        """Encerra o bot normalmente ao receber SIGTERM (as gravações pendentes são concluídas em run)"""
+        logger.info("SIGTERM recebido. Encerrando o bot...")
+        try:
+            self.bot.loop.call_soon_threadsafe(lambda: asyncio.ensure_future(self.bot.close()))
+        except AttributeError:
+            # O loop ainda não existe (antes do login): interrompe como um Ctrl+C
+            raise KeyboardInterrupt
+        except RuntimeError:
+            # O loop já foi encerrado: o desligamento já está em andamento
+            pass
         
     def run(self):
+        signal.signal(signal.SIGTERM, self._handle_sigterm)
         try:
             logger.info("Iniciando o bot...")
             self.bot.run(self.token)
         except Exception as e:
             logger.error(f"Erro ao iniciar o bot: {e}")
+        finally:
+            # Conclui as gravações pendentes dos arquivos JSON e do SQLite (se usado)
+            persistence.scheduler.flush_sync()
+            database.close_all()
             
 # Função para iniciar o bot
 def start_bot():
     bot = DiscordBot()
-    bot.load_commands()
     bot.run()
     
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 # config.py
 # Configuração de variáveis globais
 
-import json
+from core import serialization, storage
 import os
 import logging
 from dotenv import load_dotenv
@@ -30,29 +30,74 @@ class Config:
             "log_level": "INFO",  # Nível de log padrão
             "bot_keyword": "",  # Palavra-chave para acionar o bot (vazio = apenas menções)
             "bot_personality": "assistente amigável",  # Personalidade padrão do bot
-            "timezone_offset": -3,  # Fuso horário (Brasil: UTC-3)
+            "timezone": None,  # Fuso horário IANA padrão, ex: "America/Sao_Paulo" (vazio = timezone_offset)
+            "guild_timezones": {},  # Fuso horário por servidor: {"id_do_servidor": "America/Manaus"}
+            "timezone_offset": -3,  # Deslocamento (h) em relação ao UTC, usado sem um fuso IANA configurado
+            "time_context_enabled": True,  # Informa data, hora e datas próximas ao modelo
             "locale": "pt_BR",  # Localização para formatação de datas
             "time_awareness": True,  # Habilita consciência temporal nas respostas
             "moderation_enabled": False,  # Moderação automática desativada por padrão
-            "notifications_enabled": False  # Notificações desativadas por padrão
+            "mod_antiflood": False,  # Barra quem envia mensagens rápido demais
+            "mod_antispam": False,  # Barra mensagens repetidas e com menções demais
+            "mod_wordfilter": False,  # Barra mensagens com palavras proibidas
+            "banned_words": [],  # Palavras proibidas (palavras inteiras, sem diferenciar maiúsculas)
+            "mod_flood_messages": 5,  # Mensagens permitidas por usuário na janela do anti-flood
+            "mod_flood_seconds": 5,  # Janela (s) do anti-flood
+            "mod_spam_repeats": 3,  # Repetições da mesma mensagem que contam como spam
+            "mod_spam_seconds": 30,  # Janela (s) do anti-spam
+            "mod_max_mentions": 5,  # Menções (usuários e cargos) permitidas por mensagem
+            "notifications_enabled": False,  # Notificações desativadas por padrão
+            "reminder_channels": [],  # Canais que recebem os lembretes das datas especiais (cada um, só as do seu servidor)
+            "notification_guilds": [],  # Servidores cujos lembretes também vão para o webhook/Telegram
+            "reminder_hour": 9,  # Hora (no fuso padrão) em que os lembretes são enviados
+            "reminder_days_before": [1, 0],  # Dias de antecedência dos lembretes (0 = no próprio dia)
+            "reminder_grace_hours": 12,  # Lembretes perdidos (bot desligado) há menos que isso ainda são enviados
+            "allowed_channels": [],  # Canais onde o bot atua (vazio = todos)
+            "ignored_channels": [],  # Canais ignorados pelo bot
+            "rate_limit_enabled": True,  # Limita as respostas da IA por usuário, canal e servidor
+            "rate_limit_user": "5/60",  # Respostas por usuário: "N/S" = N a cada S segundos ("0" desativa)
+            "rate_limit_channel": "15/60",  # Respostas por canal
+            "rate_limit_guild": "40/60",  # Respostas por servidor
+            "debounce_ms": 0,  # Janela (ms) que junta mensagens seguidas de um usuário em uma resposta (0 = desativado)
+            "channel_debounce_ms": {},  # Janela por canal: {"id_do_canal": 1500}
+            "generation_stale_seconds": 120,  # Cancela respostas em geração há mais tempo que isso (0 = sem limite)
+            "generation_stale_messages": 15,  # Cancela respostas após N mensagens novas no canal (0 = sem limite)
+            "health_check_interval": 60,  # Intervalo (s) entre verificações do LM Studio
+            "keep_warm_interval": 300,  # Inatividade (s) após a qual o modelo é reaquecido
+            "active_hours": "8-23",  # Horas em que o modelo é mantido carregado
+            "backend_max_concurrency": 1,  # Requisições simultâneas por servidor de IA
+            "prompt_layout": "stable",  # stable (prefixo fixo, reaproveita o cache do servidor) ou legacy
+            "summary_enabled": True,  # Resume as mensagens antigas de cada canal
+            "summary_token_threshold": 1500,  # Tokens (estimados) de um canal que disparam o resumo
+            "summary_keep_recent": 8,  # Mensagens recentes que nunca são resumidas
+            "memory_dedup_enabled": True,  # Substitui informações quase repetidas na memória de longo prazo
+            "memory_dedup_threshold": 0.7,  # Similaridade (0-1) a partir da qual duas informações são a mesma
+            "storage_durability": "file",  # none, file (fsync do arquivo) ou full (fsync do arquivo e do diretório)
+            "storage_engine": "json",  # json (arquivos em data/) ou sqlite (data/bot.db, ver core/migrate_sqlite.py)
+            "flush_interval": 5,  # Intervalo (s) entre as gravações em segundo plano dos arquivos JSON
+            "flush_max_pending": 50  # Alterações pendentes que antecipam a gravação
         }
         
         # Carrega ou cria configurações
         self.config = self.load_config()
         
+        # Nível de durabilidade das gravações em data/ (ver core.storage)
+        storage.set_default_durability(self.config.get('storage_durability', storage.DURABILITY_FILE))
+        
+        # Versão das configurações, incrementada a cada alteração (usada para invalidar caches)
+        self.version = 0
+        
     def load_config(self):
         """Carrega configurações do arquivo ou cria um novo se não existir"""
         try:
-            if os.path.exists(self.config_path):
-                with open(self.config_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            if storage.exists(self.config_path):
+                return serialization.load_file(self.config_path)
             else:
                 # Cria o diretório se não existir
                 os.makedirs(os.path.dirname(self.config_path), exist_ok=True)
                 
                 # Cria o arquivo de configuração com valores padrão
-                with open(self.config_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.default_config, f, indent=4)
+                serialization.dump_file(self.config_path, self.default_config, pretty=True)
                     
                 return self.default_config
         except Exception as e:
@@ -62,8 +107,8 @@ class Config:
     def save_config(self):
         """Salva as configurações atuais no arquivo"""
         try:
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=4)
+            # Mantido indentado: o config.json costuma ser editado à mão
+            serialization.dump_file(self.config_path, self.config, pretty=True)
             return True
         except Exception as e:
             self.logger.error(f"Erro ao salvar configurações: {e}")
@@ -83,6 +128,7 @@ class Config:
     def set_prefix(self, prefix):
         """Define um novo prefixo de comando"""
         self.config["prefix"] = prefix
+        self.version += 1
         return self.save_config()
     
     def get_memory_limit(self):
@@ -92,6 +138,7 @@ class Config:
     def set_memory_limit(self, limit):
         """Define um novo limite de memória"""
         self.config["memory_limit"] = limit
+        self.version += 1
         return self.save_config()
     
     def get_config_value(self, key, default=None):
@@ -101,4 +148,5 @@ class Config:
     def set_config_value(self, key, value):
         """Define um valor de configuração específico"""
         self.config[key] = value
+        self.version += 1
         return self.save_config()
\ No newline at end of file
@@ -0,0 +1,263 @@
+# database.py
+# Armazenamento opcional em SQLite (modo WAL) acessado por uma thread dedicada
+
+import os
+import asyncio
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from core import storage
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+
+# Mecanismos de armazenamento disponíveis (config: storage_engine)
+ENGINE_JSON = "json"
+ENGINE_SQLITE = "sqlite"
+
+DEFAULT_DB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'data',
+    'bot.db'
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    guild_id INTEGER,
+    channel_id TEXT NOT NULL,
+    user_id TEXT,
+    username TEXT,
+    content TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    is_bot INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_messages_guild_channel_ts ON messages (guild_id, channel_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_messages_user ON messages (user_id);
+
+CREATE TABLE IF NOT EXISTS summaries (
+    channel_id TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS long_term (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    user_id TEXT,
+    guild_id INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS special_dates (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    year INTEGER,
+    recurring INTEGER NOT NULL DEFAULT 1,
+    user_id TEXT,
+    guild_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_special_dates_month_day ON special_dates (month, day);
+CREATE INDEX IF NOT EXISTS idx_special_dates_user ON special_dates (user_id);
+
+CREATE TABLE IF NOT EXISTS custom_commands (
+    name TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    created_by TEXT,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_custom_commands_user ON custom_commands (created_by);
+"""
+
+# Colunas adicionadas depois da criação das tabelas: (tabela, coluna, definição)
+COLUMNS_ADDED = (
+    ("long_term", "guild_id", "INTEGER"),
+    ("special_dates", "guild_id", "INTEGER"),
+)
+
+# Índices que dependem das colunas adicionadas (criados depois delas)
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_long_term_user_guild ON long_term (user_id, guild_id);
+CREATE INDEX IF NOT EXISTS idx_special_dates_guild ON special_dates (guild_id);
+"""
+
+# Instruções usadas pelos módulos (o sqlite3 mantém as instruções preparadas em cache)
+INSERT_MESSAGE = (
+    "INSERT INTO messages (guild_id, channel_id, user_id, username, content, timestamp, is_bot) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+SELECT_CHANNELS = "SELECT DISTINCT guild_id, channel_id FROM messages"
+SELECT_RECENT_MESSAGES = (
+    "SELECT user_id, username, content, timestamp, is_bot FROM messages "
+    "WHERE guild_id IS ? AND channel_id = ? ORDER BY timestamp DESC LIMIT ?"
+)
+DELETE_MESSAGES_UNTIL = "DELETE FROM messages WHERE guild_id IS ? AND channel_id = ? AND timestamp <= ?"
+# Mantém só as `limit` mensagens mais recentes do canal (parâmetros: servidor, canal, servidor, canal, limit - 1)
+DELETE_MESSAGES_BEYOND_LIMIT = (
+    "DELETE FROM messages WHERE guild_id IS ? AND channel_id = ? AND timestamp < ("
+    "SELECT timestamp FROM messages WHERE guild_id IS ? AND channel_id = ? "
+    "ORDER BY timestamp DESC LIMIT 1 OFFSET ?)"
+)
+# Atribui o servidor às mensagens gravadas sem ele (migradas de um memory.json antigo)
+UPDATE_CHANNEL_GUILD = "UPDATE messages SET guild_id = ? WHERE guild_id IS NULL AND channel_id = ?"
+DELETE_CHANNEL_MESSAGES = "DELETE FROM messages WHERE guild_id IS ? AND channel_id = ?"
+DELETE_ALL_MESSAGES = "DELETE FROM messages"
+
+UPSERT_SUMMARY = "INSERT OR REPLACE INTO summaries (channel_id, content, timestamp) VALUES (?, ?, ?)"
+SELECT_SUMMARIES = "SELECT channel_id, content, timestamp FROM summaries"
+DELETE_SUMMARY = "DELETE FROM summaries WHERE channel_id = ?"
+DELETE_ALL_SUMMARIES = "DELETE FROM summaries"
+
+UPSERT_LONG_TERM = (
+    "INSERT OR REPLACE INTO long_term (key, value, timestamp, user_id, guild_id) VALUES (?, ?, ?, ?, ?)"
+)
+SELECT_LONG_TERM = "SELECT key, value, timestamp, user_id, guild_id FROM long_term"
+DELETE_LONG_TERM = "DELETE FROM long_term WHERE key = ?"
+DELETE_USER_LONG_TERM = "DELETE FROM long_term WHERE user_id = ?"
+DELETE_ALL_LONG_TERM = "DELETE FROM long_term"
+
+UPSERT_SPECIAL_DATE = (
+    "INSERT OR REPLACE INTO special_dates (id, name, day, month, year, recurring, user_id, guild_id) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SELECT_SPECIAL_DATES = "SELECT id, name, day, month, year, recurring, user_id, guild_id FROM special_dates"
+DELETE_SPECIAL_DATE = "DELETE FROM special_dates WHERE id = ?"
+
+UPSERT_CUSTOM_COMMAND = (
+    "INSERT OR REPLACE INTO custom_commands (name, response, created_by, created_at) VALUES (?, ?, ?, ?)"
+)
+SELECT_CUSTOM_COMMANDS = "SELECT name, response, created_by, created_at FROM custom_commands"
+DELETE_CUSTOM_COMMAND = "DELETE FROM custom_commands WHERE name = ?"
+
+# Durabilidade (core.storage) -> PRAGMA synchronous
+_SYNCHRONOUS = {
+    storage.DURABILITY_NONE: "OFF",
+    storage.DURABILITY_FILE: "NORMAL",
+    storage.DURABILITY_FULL: "FULL",
+}
+
+
+class Database:
+    """Conexão SQLite usada por uma única thread dedicada
+
+    Todas as operações são enfileiradas na mesma thread, na ordem em que
+    foram pedidas. Gravações (`execute`) não bloqueiam quem as chama;
+    leituras podem ser feitas de forma síncrona (`query`) ou com `await`
+    (`query_async`), sem bloquear o loop de eventos.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._conn = None
+        self.call(self._connect)
+
+    def _connect(self):
+        """Abre a conexão (na thread dedicada) e cria as tabelas"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, cached_statements=128)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={_SYNCHRONOUS.get(storage.get_default_durability(), 'NORMAL')}")
+        self._conn.executescript(SCHEMA)
+        self._add_missing_columns()
+        self._conn.executescript(INDEXES)
+        self._conn.commit()
+        logger.info(f"Banco de dados SQLite aberto: {self.path}")
+
+    def _add_missing_columns(self):
+        """Atualiza bancos criados por versões anteriores com as colunas novas"""
+        for table, column, definition in COLUMNS_ADDED:
+            columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+                logger.info(f"Coluna {table}.{column} adicionada ao banco de dados")
+
+    def call(self, func, *args):
+        """Executa uma função na thread do banco e aguarda o resultado"""
+        return self._executor.submit(func, *args).result()
+
+    async def run(self, func, *args):
+        """Executa uma função na thread do banco sem bloquear o loop de eventos"""
+        return await asyncio.wrap_future(self._executor.submit(func, *args))
+
+    def _execute(self, sql, params=()):
+        with self._conn:
+            self._conn.execute(sql, params)
+
+    def _executemany(self, sql, rows):
+        with self._conn:
+            self._conn.executemany(sql, rows)
+
+    def _query(self, sql, params=()):
+        return self._conn.execute(sql, params).fetchall()
+
+    def _log_error(self, future):
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Erro ao gravar no banco de dados: {error}")
+
+    def execute(self, sql, params=()):
+        """Enfileira uma gravação (não bloqueia; erros vão para o log)"""
+        future = self._executor.submit(self._execute, sql, params)
+        future.add_done_callback(self._log_error)
+        return future
+
+    def executemany(self, sql, rows):
+        """Enfileira uma gravação em lote (em uma única transação)"""
+        future = self._executor.submit(self._executemany, sql, list(rows))
+        future.add_done_callback(self._log_error)
+        return future
+
+    def query(self, sql, params=()):
+        """Executa uma consulta e retorna as linhas (bloqueia até o resultado)"""
+        return self.call(self._query, sql, params)
+
+    async def query_async(self, sql, params=()):
+        """Executa uma consulta sem bloquear o loop de eventos"""
+        return await self.run(self._query, sql, params)
+
+    def flush(self):
+        """Aguarda todas as gravações enfileiradas"""
+        self.call(lambda: None)
+
+    def close(self):
+        """Conclui as gravações pendentes e fecha a conexão"""
+        if self._conn is None:
+            return
+        self.call(self._conn.close)
+        self._conn = None
+        self._executor.shutdown(wait=True)
+
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(config, path=None):
+    """Retorna o banco compartilhado se o mecanismo configurado for SQLite, ou None
+
+    Os módulos são inicializados em paralelo, então a criação é protegida
+    por um lock para que todos usem a mesma conexão.
+    """
+    if str(config.get_config_value('storage_engine', ENGINE_JSON)).lower() != ENGINE_SQLITE:
+        return None
+
+    path = path or DEFAULT_DB_PATH
+    with _databases_lock:
+        database = _databases.get(path)
+        if database is None:
+            database = Database(path)
+            _databases[path] = database
+        return database
+
+
+def close_all():
+    """Fecha todas as conexões abertas"""
+    with _databases_lock:
+        for database in _databases.values():
+            database.close()
+        _databases.clear()
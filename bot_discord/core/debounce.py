@@ -0,0 +1,82 @@
+# debounce.py
+# Junta mensagens seguidas de um usuário em um único lote (uma única resposta da IA)
+
+import asyncio
+import time
+
+# Máximo de mensagens em um lote (atingido o limite, o lote é liberado sem esperar)
+DEFAULT_MAX_BATCH = 10
+# Espera máxima de um lote, em janelas: mensagens contínuas não adiam a resposta indefinidamente
+MAX_WAIT_WINDOWS = 3
+
+
+class PendingMessage:
+    """Mensagem que aciona o bot, aguardando resposta (possivelmente junto com outras)"""
+
+    __slots__ = ("message", "text", "hits", "ingested")
+
+    def __init__(self, message, text, hits):
+        self.message = message
+        # Conteúdo sem a menção do bot
+        self.text = text
+        # Gatilhos encontrados pelo TriggerMatcher
+        self.hits = hits
+        # Gatilhos de memória e datas já processados (mensagens herdadas de uma resposta cancelada)
+        self.ingested = False
+
+
+class _Batch:
+    __slots__ = ("items", "started")
+
+    def __init__(self, started):
+        self.items = []
+        self.started = started
+
+
+class MessageDebouncer:
+    """Agrupa as mensagens de uma mesma chave (canal, usuário) que chegam dentro de uma janela
+
+    Cada mensagem espera a janela. Se outra mensagem da mesma chave chegar
+    nesse meio tempo, a espera da anterior termina sem resultado e a nova
+    passa a esperar; a última mensagem da sequência recebe o lote inteiro.
+    O lote é liberado antes se atingir `max_batch` mensagens ou se a
+    primeira delas já esperou `MAX_WAIT_WINDOWS` janelas.
+    """
+
+    def __init__(self, max_batch=DEFAULT_MAX_BATCH):
+        self.max_batch = max_batch
+        self._batches = {}
+
+    def __len__(self):
+        return len(self._batches)
+
+    async def submit(self, key, item, window, carried=()):
+        """Acrescenta uma mensagem ao lote da chave e espera a janela (em segundos)
+
+        Args:
+            key: Chave do lote, ex: (canal, usuário)
+            item: Mensagem a acrescentar
+            window: Janela de espera em segundos
+            carried: Mensagens de uma resposta cancelada, colocadas antes das novas
+
+        Returns:
+            A lista de mensagens do lote, ou None se uma mensagem mais nova assumiu o lote
+        """
+        now = time.monotonic()
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = _Batch(now)
+        batch.items.extend(carried)
+        batch.items.append(item)
+        position = len(batch.items)
+
+        if position < self.max_batch:
+            delay = min(window, batch.started + window * MAX_WAIT_WINDOWS - now)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self._batches.get(key) is not batch or len(batch.items) != position:
+                return None
+
+        if self._batches.get(key) is batch:
+            del self._batches[key]
+        return batch.items
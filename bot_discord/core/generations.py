@@ -0,0 +1,148 @@
+# generations.py
+# Respostas da IA em geração, por canal, canceláveis quando a conversa segue em frente
+
+import asyncio
+import logging
+
+from core.metrics import metrics
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+
+# Motivos de cancelamento
+CANCEL_SUPERSEDED = "superseded"  # Mensagem mais nova do mesmo usuário (debounce)
+CANCEL_DELETED = "deleted"        # Mensagem que acionou o bot foi apagada
+CANCEL_EDITED = "edited"          # Mensagem que acionou o bot foi editada
+CANCEL_TIMEOUT = "timeout"        # Geração passou de generation_stale_seconds
+CANCEL_CHANNEL = "channel"        # Chegaram generation_stale_messages mensagens novas no canal
+
+
+class Generation:
+    """Uma resposta em geração: a tarefa, o lote de mensagens e o motivo do cancelamento (se houver)"""
+
+    __slots__ = (
+        "key", "task", "batch", "contents", "channel_id", "stale_messages", "newer_messages", "timer", "reason"
+    )
+
+    def __init__(self, key, task, batch, channel_id, stale_messages=None):
+        self.key = key
+        self.task = task
+        self.batch = batch
+        # Texto de cada mensagem do lote no início da geração, para reconhecer edições de verdade
+        self.contents = {pending.message.id: pending.message.content for pending in batch}
+        self.channel_id = channel_id
+        # Mensagens que chegaram no canal depois do início da geração, e o limite delas (None = sem limite)
+        self.stale_messages = stale_messages
+        self.newer_messages = 0
+        self.timer = None
+        self.reason = None
+
+
+class GenerationTracker:
+    """Acompanha as gerações em andamento por (canal, usuário), por mensagem e por canal
+
+    Cancelar a tarefa interrompe a requisição HTTP em andamento (o aiohttp
+    fecha a conexão), liberando o LM Studio para outras mensagens. Os
+    contadores `generations.completed` e `generations.cancelled.<motivo>`
+    ficam em `core.metrics`.
+    """
+
+    def __init__(self):
+        self._by_key = {}
+        self._by_message = {}
+        self._by_channel = {}
+
+    def __len__(self):
+        return len(self._by_key)
+
+    def __contains__(self, key):
+        """Se há uma geração em andamento para o (canal, usuário)"""
+        return key in self._by_key
+
+    def start(self, key, coro, batch, channel_id, timeout=None, stale_messages=None):
+        """Inicia a geração em uma tarefa própria e a registra
+
+        Args:
+            key: (canal, usuário) da resposta
+            coro: Corrotina que gera a resposta
+            batch: Mensagens (PendingMessage) respondidas por esta geração
+            channel_id: Canal da resposta
+            timeout: Segundos após os quais a geração é cancelada (None = sem limite)
+            stale_messages: Mensagens novas no canal que tornam a geração obsoleta (None = sem limite)
+        """
+        generation = Generation(key, asyncio.ensure_future(coro), batch, channel_id, stale_messages or None)
+
+        # Sem debounce, mensagens seguidas têm respostas próprias: a chave aponta para a mais recente
+        self._by_key[key] = generation
+        for message_id in generation.contents:
+            self._by_message[message_id] = generation
+        self._by_channel.setdefault(channel_id, set()).add(generation)
+
+        if timeout:
+            generation.timer = asyncio.get_running_loop().call_later(timeout, self.cancel, generation, CANCEL_TIMEOUT)
+        generation.task.add_done_callback(lambda task: self._finished(generation))
+        return generation
+
+    def _finished(self, generation):
+        """Remove a geração dos índices quando a tarefa termina (concluída ou cancelada)"""
+        if generation.timer is not None:
+            generation.timer.cancel()
+        if self._by_key.get(generation.key) is generation:
+            del self._by_key[generation.key]
+        for message_id in generation.contents:
+            if self._by_message.get(message_id) is generation:
+                del self._by_message[message_id]
+        channel = self._by_channel.get(generation.channel_id)
+        if channel is not None:
+            channel.discard(generation)
+            if not channel:
+                del self._by_channel[generation.channel_id]
+
+        if not generation.task.cancelled():
+            metrics.incr("generations.completed")
+
+    def cancel(self, generation, reason):
+        """Cancela uma geração em andamento; retorna False se ela já tinha terminado"""
+        if generation.task.done():
+            return False
+        generation.reason = reason
+        generation.task.cancel()
+        metrics.incr(f"generations.cancelled.{reason}")
+        logger.debug(f"Geração cancelada ({reason}) no canal {generation.channel_id}")
+        return True
+
+    def cancel_key(self, key, reason=CANCEL_SUPERSEDED):
+        """Cancela a geração de um (canal, usuário); retorna o lote dela ou None"""
+        generation = self._by_key.get(key)
+        if generation is not None and self.cancel(generation, reason):
+            return generation.batch
+        return None
+
+    def cancel_message(self, message_id, reason):
+        """Cancela a geração que responde a uma mensagem (apagada ou editada)"""
+        generation = self._by_message.get(message_id)
+        return generation is not None and self.cancel(generation, reason)
+
+    def cancel_edited(self, message_id, content):
+        """Cancela a geração que responde a uma mensagem cujo texto mudou
+
+        O Discord também envia MESSAGE_UPDATE quando acrescenta prévias de
+        links ou embeds, com o texto igual ou sem o campo `content` (None):
+        essas atualizações não cancelam.
+        """
+        generation = self._by_message.get(message_id)
+        if generation is None or content is None or generation.contents.get(message_id) == content:
+            return False
+        return self.cancel(generation, CANCEL_EDITED)
+
+    def note_channel_message(self, channel_id):
+        """Conta uma mensagem nova no canal e cancela as gerações que ficaram para trás"""
+        generations = self._by_channel.get(channel_id)
+        if not generations:
+            return
+        for generation in list(generations):
+            if generation.stale_messages is None:
+                continue
+            generation.newer_messages += 1
+            if generation.newer_messages >= generation.stale_messages:
+                self.cancel(generation, CANCEL_CHANNEL)
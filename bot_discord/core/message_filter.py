@@ -0,0 +1,105 @@
+# message_filter.py
+# Pré-filtro barato que descarta mensagens irrelevantes antes de qualquer processamento
+
+import logging
+from collections import namedtuple
+
+from core.metrics import metrics
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+
+# Resultado do filtro: se a mensagem é um comando e/ou pode acionar uma resposta da IA
+FilterDecision = namedtuple("FilterDecision", ["command", "trigger"])
+
+
+class MessageFilter:
+    """Decide, usando apenas a string crua e atributos já carregados, se uma mensagem merece processamento
+
+    As verificações são feitas da mais barata para a mais cara: autor bot,
+    canal permitido/bloqueado, prefixo de comando, menção e resposta ao bot e,
+    por último, a palavra-chave. Contadores de mensagens filtradas e
+    processadas ficam disponíveis em `core.metrics`.
+    """
+
+    def __init__(self, config, trigger_matcher):
+        self.config = config
+        self.trigger_matcher = trigger_matcher
+
+        self._config_version = None
+        self.allowed_channels = frozenset()
+        self.ignored_channels = frozenset()
+
+    def _refresh(self):
+        """Recarrega os conjuntos de canais quando a configuração muda"""
+        version = getattr(self.config, "version", None)
+        if version == self._config_version:
+            return
+
+        self.allowed_channels = self._parse_channels(self.config.get_config_value('allowed_channels', []))
+        self.ignored_channels = self._parse_channels(self.config.get_config_value('ignored_channels', []))
+        self._config_version = version
+
+    @staticmethod
+    def _parse_channels(value):
+        """Converte uma lista (ou string separada por vírgulas) de IDs de canais em um conjunto de inteiros"""
+        if not value:
+            return frozenset()
+        if isinstance(value, str):
+            value = value.split(',')
+        channels = set()
+        for channel_id in value:
+            try:
+                channels.add(int(str(channel_id).strip()))
+            except ValueError:
+                logger.warning(f"ID de canal inválido na configuração: {channel_id}")
+        return frozenset(channels)
+
+    def _reject(self, reason):
+        """Registra uma mensagem descartada"""
+        metrics.incr("messages.filtered")
+        metrics.incr(f"messages.filtered.{reason}")
+        return None
+
+    @staticmethod
+    def is_reply_to_bot(message, bot_user):
+        """Resposta a uma mensagem do bot, pela mensagem citada já carregada ou pela menção da resposta"""
+        reference = message.reference
+        if reference is None:
+            return False
+        if bot_user in message.mentions:
+            return True
+        # `resolved` vem no próprio evento; mensagens citadas apagadas não têm autor
+        replied = reference.resolved or reference.cached_message
+        author = getattr(replied, "author", None)
+        return author is not None and author.id == bot_user.id
+
+    def check(self, message, bot_user, prefix):
+        """Retorna um FilterDecision se a mensagem deve ser processada, ou None para descartá-la"""
+        # Mensagens de bots (inclusive do próprio) nunca são processadas
+        if message.author.bot:
+            return self._reject("bot")
+
+        self._refresh()
+        channel_id = message.channel.id
+        if channel_id in self.ignored_channels:
+            return self._reject("channel")
+        if self.allowed_channels and channel_id not in self.allowed_channels:
+            return self._reject("channel")
+
+        content = message.content
+        is_command = bool(prefix) and content.startswith(prefix)
+
+        # Menção direta na string crua ou resposta a uma mensagem do bot (respostas entre usuários não contam)
+        is_trigger = (
+            f"<@{bot_user.id}>" in content
+            or f"<@!{bot_user.id}>" in content
+            or self.is_reply_to_bot(message, bot_user)
+            or self.trigger_matcher.matches_keyword(content)
+        )
+
+        if not (is_command or is_trigger):
+            return self._reject("no_trigger")
+
+        metrics.incr("messages.processed")
+        return FilterDecision(is_command, is_trigger)
@@ -0,0 +1,75 @@
+# metrics.py
+# Contadores e tempos de execução compartilhados pelos módulos do bot
+
+import time
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class Metrics:
+    """Registro simples de contadores e tempos, seguro para uso entre threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(int)
+        # Nome -> [quantidade, soma, máximo, último] em segundos
+        self.timings = {}
+
+    def incr(self, name, amount=1):
+        """Incrementa um contador"""
+        with self._lock:
+            self.counters[name] += amount
+
+    def observe(self, name, seconds):
+        """Registra uma medição de tempo (em segundos)"""
+        with self._lock:
+            timing = self.timings.get(name)
+            if timing is None:
+                self.timings[name] = [1, seconds, seconds, seconds]
+            else:
+                timing[0] += 1
+                timing[1] += seconds
+                timing[2] = max(timing[2], seconds)
+                timing[3] = seconds
+
+    @contextmanager
+    def timer(self, name):
+        """Mede o tempo de execução de um bloco"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def get_counter(self, name):
+        """Retorna o valor atual de um contador"""
+        return self.counters.get(name, 0)
+
+    def get_timing(self, name):
+        """Retorna (quantidade, média, máximo, último) de uma medição ou None"""
+        timing = self.timings.get(name)
+        if timing is None:
+            return None
+        count, total, maximum, last = timing
+        return count, total / count, maximum, last
+
+    def snapshot(self, prefix=""):
+        """Retorna uma cópia dos contadores e tempos, opcionalmente filtrados por prefixo"""
+        with self._lock:
+            counters = {k: v for k, v in self.counters.items() if k.startswith(prefix)}
+            timings = {
+                k: (v[0], v[1] / v[0], v[2], v[3])
+                for k, v in self.timings.items() if k.startswith(prefix)
+            }
+        return {"counters": counters, "timings": timings}
+
+    def reset(self):
+        """Zera todas as métricas"""
+        with self._lock:
+            self.counters.clear()
+            self.timings.clear()
+
+
+# Instância global compartilhada pelos módulos
+metrics = Metrics()
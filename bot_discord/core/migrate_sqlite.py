@@ -0,0 +1,125 @@
+# migrate_sqlite.py
+# Migração única dos arquivos JSON de data/ para o banco SQLite
+#
+# Uso: python core/migrate_sqlite.py [--data DIRETÓRIO] [--db ARQUIVO] [--force]
+#
+# Depois da migração, defina "storage_engine": "sqlite" no config.json.
+# Os arquivos JSON não são alterados.
+
+import os
+import sys
+import argparse
+import logging
+
+# Adiciona o diretório raiz ao path para importações relativas
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import database, serialization, storage
+from modules.memory import DEFAULT_PARTITION, MemoryRecord
+
+logger = logging.getLogger("migrate_sqlite")
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def _load(path):
+    """Lê um arquivo JSON de data/ (ou sua cópia de segurança), retornando None se não existir"""
+    if not storage.exists(path):
+        logger.info(f"{os.path.basename(path)} não encontrado, ignorado")
+        return None
+    return serialization.load_file(path)
+
+
+def migrate_memory(db, memory_data):
+    """Migra mensagens, resumos e memória de longo prazo
+
+    O servidor de cada canal vem de "partition_guilds". Arquivos gravados
+    por versões anteriores não o têm: essas mensagens ficam sem servidor e
+    o recebem na primeira mensagem nova do canal (Memory.add_message).
+    """
+    partitions = dict(memory_data.get("partitions") or {})
+    if memory_data.get("short_term"):
+        partitions[DEFAULT_PARTITION] = memory_data["short_term"]
+    guilds = memory_data.get("partition_guilds") or {}
+
+    rows = []
+    for channel_id, messages in partitions.items():
+        for msg in messages:
+            record = MemoryRecord.from_dict(msg)
+            rows.append((
+                guilds.get(channel_id), channel_id, str(record.user_id), record.username,
+                record.content, record.timestamp, int(bool(record.is_bot))
+            ))
+    db.executemany(database.INSERT_MESSAGE, rows)
+
+    summaries = memory_data.get("summaries") or {}
+    db.executemany(database.UPSERT_SUMMARY, [
+        (channel_id, summary["content"], summary["timestamp"]) for channel_id, summary in summaries.items()
+    ])
+
+    long_term = memory_data.get("long_term") or {}
+    db.executemany(database.UPSERT_LONG_TERM, [
+        (key, info["value"], info.get("timestamp", ""),
+         None if info.get("user_id") is None else str(info["user_id"]), info.get("guild_id"))
+        for key, info in long_term.items()
+    ])
+    return len(rows), len(summaries), len(long_term)
+
+
+def migrate_special_dates(db, special_dates):
+    """Migra as datas especiais"""
+    db.executemany(database.UPSERT_SPECIAL_DATE, [
+        (date_id, info["name"], info["day"], info["month"], info.get("year"),
+         int(bool(info.get("recurring", True))), info.get("user_id"), info.get("guild_id"))
+        for date_id, info in special_dates.items()
+    ])
+    return len(special_dates)
+
+
+def migrate_custom_commands(db, custom_commands):
+    """Migra os comandos personalizados"""
+    db.executemany(database.UPSERT_CUSTOM_COMMAND, [
+        (name, data["response"], str(data.get("created_by", "")), data.get("created_at"))
+        for name, data in custom_commands.items()
+    ])
+    return len(custom_commands)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migra os arquivos JSON de data/ para o SQLite")
+    parser.add_argument("--data", default=DATA_DIR, help="Diretório com os arquivos JSON")
+    parser.add_argument("--db", default=database.DEFAULT_DB_PATH, help="Arquivo do banco SQLite")
+    parser.add_argument("--force", action="store_true", help="Migra mesmo se o banco já tiver mensagens")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    db = database.Database(args.db)
+    try:
+        if db.query("SELECT COUNT(*) FROM messages")[0][0] and not args.force:
+            logger.error(f"{args.db} já contém mensagens. Use --force para migrar mesmo assim.")
+            return 1
+
+        memory_data = _load(os.path.join(args.data, 'memory.json'))
+        if memory_data:
+            messages, summaries, long_term = migrate_memory(db, memory_data)
+            logger.info(f"Memória: {messages} mensagens, {summaries} resumos, {long_term} memórias de longo prazo")
+
+        special_dates = _load(os.path.join(args.data, 'special_dates.json'))
+        if special_dates:
+            logger.info(f"Datas especiais: {migrate_special_dates(db, special_dates)}")
+
+        custom_commands = _load(os.path.join(args.data, 'custom_commands.json'))
+        if custom_commands:
+            logger.info(f"Comandos personalizados: {migrate_custom_commands(db, custom_commands)}")
+
+        db.flush()
+    finally:
+        db.close()
+
+    logger.info(f"Migração concluída. Defina \"storage_engine\": \"sqlite\" no config.json para usar {args.db}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
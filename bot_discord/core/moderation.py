@@ -0,0 +1,206 @@
+# moderation.py
+# Moderação automática (anti-flood, anti-spam e filtro de palavras) com custo constante por mensagem
+
+import logging
+import re
+import time
+from array import array
+from collections import OrderedDict, namedtuple
+
+from core.metrics import metrics
+from modules.triggers import build_trie_pattern
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+
+# Motivos de moderação
+REASON_FLOOD = "flood"
+REASON_SPAM = "spam"
+REASON_MENTIONS = "mentions"
+REASON_WORD = "word"
+
+# Avisos enviados ao autor (depois da menção)
+WARNINGS = {
+    REASON_FLOOD: "calma! Você está enviando mensagens rápido demais.",
+    REASON_SPAM: "evite repetir a mesma mensagem várias vezes.",
+    REASON_MENTIONS: "evite mencionar tantas pessoas de uma vez.",
+    REASON_WORD: "sua mensagem continha uma palavra proibida e foi removida."
+}
+
+# Usuários sem mensagens há mais que isso (s) deixam de ser acompanhados
+DEFAULT_IDLE_SECONDS = 600
+# Limite de usuários acompanhados ao mesmo tempo (os mais antigos saem primeiro)
+DEFAULT_MAX_TRACKED = 20000
+
+_NEVER = float("-inf")
+
+# Resultado da moderação: motivo e se o autor deve ser avisado (no máximo um aviso por janela)
+ModerationVerdict = namedtuple("ModerationVerdict", ["reason", "warn"])
+
+
+class _UserWindow:
+    """Janelas deslizantes de um usuário em um servidor, em buffers circulares de tamanho fixo"""
+
+    __slots__ = ("stamps", "position", "hashes", "hash_stamps", "hash_position", "last_seen", "warned_at")
+
+    def __init__(self, flood_size, spam_size):
+        # Horário das últimas `flood_size` mensagens (-inf = posição ainda vazia)
+        self.stamps = array("d", [_NEVER]) * flood_size
+        self.position = 0
+        # Hash e horário das últimas `spam_size` mensagens
+        self.hashes = [0] * spam_size
+        self.hash_stamps = array("d", [_NEVER]) * spam_size
+        self.hash_position = 0
+        self.last_seen = 0.0
+        self.warned_at = _NEVER
+
+
+class Moderator:
+    """Aplica as regras de moderação configuradas a cada mensagem de um servidor
+
+    - Anti-flood: mais de `mod_flood_messages` mensagens em
+      `mod_flood_seconds` segundos. O buffer circular guarda o horário das
+      últimas N mensagens; basta comparar a mais antiga com a janela.
+    - Anti-spam: a mesma mensagem (pelo hash do texto normalizado)
+      `mod_spam_repeats` vezes em `mod_spam_seconds` segundos, ou mais de
+      `mod_max_mentions` menções em uma mensagem.
+    - Filtro de palavras: `banned_words` compiladas em uma única expressão
+      em forma de trie (como os gatilhos), só com palavras inteiras.
+
+    O estado de cada (servidor, usuário) fica em um OrderedDict na ordem do
+    último uso; os usuários inativos saem do início a cada mensagem, então a
+    memória fica limitada aos usuários ativos. Membros que podem gerenciar
+    mensagens não são moderados.
+    """
+
+    def __init__(self, config, idle_seconds=DEFAULT_IDLE_SECONDS, max_tracked=DEFAULT_MAX_TRACKED):
+        self.config = config
+        self.idle_seconds = idle_seconds
+        self.max_tracked = max_tracked
+
+        self._config_version = object()
+        self.enabled = False
+        self.antiflood = False
+        self.antispam = False
+        self.wordfilter = False
+        self.flood_messages = 5
+        self.flood_seconds = 5.0
+        self.spam_repeats = 3
+        self.spam_seconds = 30.0
+        self.max_mentions = 5
+        self._word_pattern = None
+
+        # (servidor, usuário) -> _UserWindow, do menos para o mais recente
+        self._windows = OrderedDict()
+
+    def __len__(self):
+        return len(self._windows)
+
+    def _refresh(self):
+        """Relê as regras quando a configuração muda (os buffers são recriados com os novos tamanhos)"""
+        version = getattr(self.config, "version", None)
+        if version == self._config_version:
+            return
+
+        get = self.config.get_config_value
+        self.enabled = bool(get('moderation_enabled', False))
+        self.antiflood = bool(get('mod_antiflood', False))
+        self.antispam = bool(get('mod_antispam', False))
+        self.wordfilter = bool(get('mod_wordfilter', False))
+        self.flood_messages = max(1, int(get('mod_flood_messages', 5)))
+        self.flood_seconds = float(get('mod_flood_seconds', 5))
+        self.spam_repeats = max(2, int(get('mod_spam_repeats', 3)))
+        self.spam_seconds = float(get('mod_spam_seconds', 30))
+        self.max_mentions = int(get('mod_max_mentions', 5))
+
+        words = sorted({word.strip().lower() for word in get('banned_words', []) or [] if word.strip()})
+        self._word_pattern = re.compile(rf"(?<!\w)(?:{build_trie_pattern(words)})(?!\w)") if words else None
+
+        self._windows.clear()
+        self._config_version = version
+        logger.debug(f"Regras de moderação recarregadas ({len(words)} palavras proibidas)")
+
+    def _window(self, key, now):
+        """Estado do usuário (criado se necessário), descartando os usuários inativos"""
+        windows = self._windows
+        window = windows.get(key)
+        if window is None:
+            window = _UserWindow(self.flood_messages, self.spam_repeats - 1)
+            windows[key] = window
+        else:
+            windows.move_to_end(key)
+
+        # Os inativos estão no início: remove enquanto o mais antigo estiver expirado (ou acima do limite)
+        cutoff = now - self.idle_seconds
+        while windows:
+            oldest_key = next(iter(windows))
+            if oldest_key == key or (windows[oldest_key].last_seen >= cutoff and len(windows) <= self.max_tracked):
+                break
+            del windows[oldest_key]
+            metrics.incr("moderation.evicted")
+
+        window.last_seen = now
+        return window
+
+    def check_content(self, content):
+        """Retorna REASON_WORD se o texto contém uma palavra proibida"""
+        if self._word_pattern is not None and self._word_pattern.search(content.lower()):
+            return REASON_WORD
+        return None
+
+    def check(self, message, now=None):
+        """Verifica uma mensagem de servidor; retorna um ModerationVerdict ou None se ela estiver liberada"""
+        self._refresh()
+        if not self.enabled or message.guild is None:
+            return None
+        permissions = getattr(message.author, "guild_permissions", None)
+        if permissions is not None and permissions.manage_messages:
+            return None
+
+        now = time.monotonic() if now is None else now
+        content = message.content
+        reason = None
+
+        if self.wordfilter:
+            reason = self.check_content(content)
+
+        if self.antiflood or self.antispam:
+            window = self._window((message.guild.id, message.author.id), now)
+
+            if self.antiflood:
+                # A posição atual guarda a N-ésima mensagem anterior: dentro da janela, esta é a N+1-ésima
+                oldest = window.stamps[window.position]
+                window.stamps[window.position] = now
+                window.position = (window.position + 1) % len(window.stamps)
+                if reason is None and now - oldest < self.flood_seconds:
+                    reason = REASON_FLOOD
+
+            if self.antispam:
+                if reason is None and len(message.mentions) + len(message.role_mentions) > self.max_mentions:
+                    reason = REASON_MENTIONS
+
+                normalized = " ".join(content.lower().split())
+                if normalized:
+                    digest = hash(normalized)
+                    cutoff = now - self.spam_seconds
+                    repeats = 1
+                    for i, previous in enumerate(window.hashes):
+                        if previous == digest and window.hash_stamps[i] > cutoff:
+                            repeats += 1
+                    window.hashes[window.hash_position] = digest
+                    window.hash_stamps[window.hash_position] = now
+                    window.hash_position = (window.hash_position + 1) % len(window.hashes)
+                    if reason is None and repeats >= self.spam_repeats:
+                        reason = REASON_SPAM
+
+            if reason is not None:
+                warn = now - window.warned_at >= max(self.flood_seconds, self.spam_seconds)
+                if warn:
+                    window.warned_at = now
+                metrics.incr(f"moderation.{reason}")
+                return ModerationVerdict(reason, warn)
+
+        if reason is not None:
+            metrics.incr(f"moderation.{reason}")
+            return ModerationVerdict(reason, True)
+        return None
@@ -0,0 +1,171 @@
+# persistence.py
+# Gravação em segundo plano (write-behind) dos arquivos em data/
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from core.metrics import metrics
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL = 5.0
+DEFAULT_FLUSH_MAX_PENDING = 50
+
+
+class WriteBehindScheduler:
+    """Agenda a gravação dos módulos persistentes fora do caminho de cada mensagem
+
+    Cada módulo registra duas funções: `snapshot`, que copia o estado em
+    memória (executada no loop de eventos, onde o estado é alterado) e
+    `write`, que grava essa cópia em disco (executada em uma thread
+    dedicada, na ordem dos pedidos). Depois de cada alteração, o módulo só
+    chama `mark_dirty`; uma tarefa em segundo plano grava os módulos
+    alterados a cada `interval` segundos ou assim que houver `max_pending`
+    alterações pendentes.
+
+    Enquanto a tarefa não estiver rodando (scripts, testes, antes do
+    setup_hook), `mark_dirty` grava imediatamente, como antes.
+    """
+
+    def __init__(self, interval=DEFAULT_FLUSH_INTERVAL, max_pending=DEFAULT_FLUSH_MAX_PENDING):
+        self.interval = interval
+        self.max_pending = max_pending
+        self._stores = {}
+        self._dirty = set()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._task = None
+        self._wake = None
+
+    def configure(self, interval=None, max_pending=None):
+        """Ajusta o intervalo (s) e o número de alterações que antecipam a gravação"""
+        if interval is not None:
+            self.interval = max(0.1, float(interval))
+        if max_pending is not None:
+            self.max_pending = max(1, int(max_pending))
+
+    def register(self, name, snapshot, write):
+        """Registra um módulo persistente (um novo registro com o mesmo nome substitui o anterior)
+
+        Args:
+            name: Nome do módulo (ex: "memory")
+            snapshot: Função sem argumentos que retorna uma cópia dos dados a gravar
+            write: Função que recebe a cópia e a grava, retornando False em caso de erro
+        """
+        self._stores[name] = (snapshot, write)
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def mark_dirty(self, name):
+        """Marca um módulo como alterado; a gravação acontece na próxima descarga"""
+        if name not in self._stores:
+            logger.warning(f"Módulo persistente não registrado: {name}")
+            return
+
+        if not self.running:
+            self._write_now(name)
+            return
+
+        with self._lock:
+            self._dirty.add(name)
+            self._pending += 1
+            pending = self._pending
+        metrics.incr("persistence.marked_dirty")
+        if pending >= self.max_pending:
+            self._wake.set()
+
+    def _write_now(self, name):
+        """Grava um módulo imediatamente, na thread atual"""
+        snapshot, write = self._stores[name]
+        try:
+            return write(snapshot()) is not False
+        except Exception as e:
+            logger.error(f"Erro ao gravar {name}: {e}")
+            return False
+
+    def _take_dirty(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            self._pending = 0
+        return dirty
+
+    def start(self):
+        """Inicia a tarefa de gravação no loop de eventos atual"""
+        if self.running:
+            return self._task
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="write-behind")
+        self._wake = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+        logger.info(f"Gravação em segundo plano iniciada (a cada {self.interval:g}s ou {self.max_pending} alterações)")
+        return self._task
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Grava todos os módulos alterados na thread de gravação"""
+        dirty = self._take_dirty()
+        if not dirty:
+            return
+
+        # As cópias são feitas aqui, sem await entre elas, para que o estado não mude durante a cópia
+        loop = asyncio.get_event_loop()
+        futures = {}
+        for name in dirty:
+            snapshot, write = self._stores[name]
+            try:
+                data = snapshot()
+            except Exception as e:
+                logger.error(f"Erro ao copiar o estado de {name}: {e}")
+                continue
+            futures[name] = loop.run_in_executor(self._executor, write, data)
+
+        with metrics.timer("persistence.flush"):
+            results = await asyncio.gather(*futures.values(), return_exceptions=True)
+
+        for name, result in zip(futures, results):
+            if isinstance(result, Exception) or result is False:
+                if isinstance(result, Exception):
+                    logger.error(f"Erro ao gravar {name}: {result}")
+                # Tenta de novo na próxima descarga
+                with self._lock:
+                    self._dirty.add(name)
+                metrics.incr("persistence.failed")
+        metrics.incr("persistence.flushes")
+
+    def flush_sync(self):
+        """Encerra a tarefa e grava o que estiver pendente, de forma síncrona (usado no desligamento)
+
+        Pode ser chamado depois que o loop de eventos terminou: aguarda as
+        gravações já enviadas à thread e grava o restante na thread atual.
+        """
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+        dirty = self._take_dirty()
+        for name in dirty:
+            self._write_now(name)
+        if dirty:
+            logger.info(f"Gravações pendentes concluídas no desligamento: {', '.join(sorted(dirty))}")
+
+
+# Instância global usada pelos módulos persistentes
+scheduler = WriteBehindScheduler()
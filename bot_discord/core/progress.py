@@ -0,0 +1,152 @@
+# progress.py
+# Retorno visual enquanto a resposta não sai: "digitando..." durante a geração e um aviso com a posição na fila
+
+import asyncio
+import logging
+
+import discord
+
+from core.metrics import metrics
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+
+# Espera (s) antes de publicar o aviso de fila: filas que andam rápido não geram mensagem
+PLACEHOLDER_DELAY = 1.0
+# Intervalo mínimo (s) entre edições do aviso, para não gastar o limite de edições do canal
+PLACEHOLDER_EDIT_INTERVAL = 2.0
+
+QUEUED_TEXT = "⏳ Na fila para responder (posição {position})..."
+GENERATING_TEXT = "✍️ Gerando a resposta..."
+
+
+class ReplyProgress:
+    """Mostra no canal o andamento de uma resposta da IA
+
+    O BackendPool chama `queued(posição)` enquanto a requisição espera um
+    backend livre e `started()` quando ela é enviada ao modelo. Só durante a
+    geração o bot aparece "digitando..."; na fila, publica um único aviso
+    com a posição, editado quando ela muda. A resposta final substitui esse
+    aviso (`MessageSender.send(..., placeholder=progress.placeholder)`), então
+    o usuário vê que foi atendido e não reenvia a pergunta.
+
+    Os avisos do pool são síncronos; as chamadas ao Discord ficam em uma
+    tarefa própria, para não atrasar a reserva do backend.
+    """
+
+    def __init__(self, channel, sender):
+        self.channel = channel
+        self.sender = sender
+        # Aviso publicado no canal (None enquanto não houve espera)
+        self.placeholder = None
+
+        self._position = None
+        self._generating = False
+        self._changed = asyncio.Event()
+        self._shown = None
+        self._posting = None
+        self._typing = None
+        self._task = None
+
+    def start(self):
+        """Começa a acompanhar os avisos do pool"""
+        self._task = asyncio.ensure_future(self._run())
+
+    def queued(self, position):
+        """A requisição está esperando um backend, na posição informada"""
+        self._position = position
+        self._generating = False
+        self._changed.set()
+
+    def started(self):
+        """A requisição foi enviada ao modelo"""
+        self._generating = True
+        self._changed.set()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        edited_at = 0.0
+        try:
+            while True:
+                await self._changed.wait()
+                self._changed.clear()
+
+                # "Digitando..." só enquanto o modelo gera a resposta
+                if self._generating:
+                    await self._enter_typing()
+                else:
+                    await self._exit_typing()
+
+                if self.placeholder is None:
+                    # Sem espera na fila o "digitando..." basta; filas que andam rápido também não geram aviso
+                    if self._generating:
+                        continue
+                    await asyncio.sleep(PLACEHOLDER_DELAY)
+                    if self._generating:
+                        continue
+                    self._shown = QUEUED_TEXT.format(position=self._position)
+                    self._posting = asyncio.ensure_future(self.sender.send(self.channel, self._shown))
+                    self.placeholder = (await asyncio.shield(self._posting))[0]
+                    edited_at = loop.time()
+                    metrics.incr("progress.placeholders")
+                    continue
+
+                text = GENERATING_TEXT if self._generating else QUEUED_TEXT.format(position=self._position)
+                if text == self._shown:
+                    continue
+                wait = edited_at + PLACEHOLDER_EDIT_INTERVAL - loop.time()
+                if wait > 0:
+                    # Espera o intervalo e reavalia: só o estado mais recente é mostrado
+                    await asyncio.sleep(wait)
+                    self._changed.set()
+                    continue
+                await self.placeholder.edit(content=text)
+                self._shown = text
+                edited_at = loop.time()
+        except discord.HTTPException as e:
+            logger.warning(f"Erro ao mostrar o andamento da resposta no canal {self.channel.id}: {e}")
+
+    async def _enter_typing(self):
+        if self._typing is None:
+            self._typing = self.channel.typing()
+            try:
+                await self._typing.__aenter__()
+            except discord.HTTPException:
+                self._typing = None
+                raise
+
+    async def _exit_typing(self):
+        if self._typing is not None:
+            typing, self._typing = self._typing, None
+            await typing.__aexit__(None, None, None)
+
+    async def stop(self):
+        """Para o "digitando..." e as edições; o aviso publicado (se houver) fica em `placeholder`"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                # Uma falha no aviso de andamento não pode impedir o envio da resposta já gerada
+                logger.warning(f"Erro ao mostrar o andamento da resposta no canal {self.channel.id}: {e}")
+            self._task = None
+
+        # Um aviso sendo publicado no momento da parada ainda precisa ser aproveitado (ou apagado)
+        if self._posting is not None and self.placeholder is None:
+            try:
+                self.placeholder = (await self._posting)[0]
+            except Exception:
+                pass
+        await self._exit_typing()
+
+    async def discard(self):
+        """Para tudo e apaga o aviso: a resposta foi cancelada"""
+        await self.stop()
+        if self.placeholder is not None:
+            try:
+                await self.placeholder.delete()
+            except discord.HTTPException as e:
+                logger.warning(f"Erro ao apagar o aviso de fila: {e}")
+            self.placeholder = None
@@ -0,0 +1,161 @@
+# rate_limit.py
+# Limite de respostas da IA por usuário, canal e servidor (token bucket)
+
+import logging
+import time
+from collections import OrderedDict, namedtuple
+
+from core.metrics import metrics
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+
+# Escopos limitados, na ordem em que são verificados
+SCOPE_USER = "user"
+SCOPE_CHANNEL = "channel"
+SCOPE_GUILD = "guild"
+SCOPES = (SCOPE_USER, SCOPE_CHANNEL, SCOPE_GUILD)
+
+# Limites padrão: "respostas/segundos" (capacidade do balde e tempo para enchê-lo de novo)
+DEFAULT_LIMITS = {
+    SCOPE_USER: "5/60",
+    SCOPE_CHANNEL: "15/60",
+    SCOPE_GUILD: "40/60"
+}
+
+# Resultado de uma verificação negada: escopo que barrou e segundos até haver uma ficha
+RateLimited = namedtuple("RateLimited", ["scope", "retry_after"])
+
+
+def parse_limit(value):
+    """Converte "N/S" (N respostas a cada S segundos) em (capacidade, fichas por segundo); "0" ou vazio desativa
+
+    Raises:
+        ValueError: Se o formato for inválido
+    """
+    if value in (None, "", 0, "0"):
+        return None
+    capacity, _, seconds = str(value).partition("/")
+    capacity, seconds = int(capacity), float(seconds or 60)
+    if capacity <= 0:
+        return None
+    if seconds <= 0:
+        raise ValueError(f"Intervalo inválido: {value}")
+    return capacity, capacity / seconds
+
+
+class _BucketTable:
+    """Baldes de um escopo: id -> [fichas, horário da última atualização], do menos para o mais recente"""
+
+    __slots__ = ("capacity", "rate", "buckets")
+
+    def __init__(self, capacity, rate):
+        self.capacity = capacity
+        self.rate = rate
+        self.buckets = OrderedDict()
+
+    def available(self, key, now):
+        """Fichas disponíveis agora (reabastecidas pelo tempo decorrido, sem temporizadores)"""
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            return self.capacity
+        return min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+
+    def consume(self, key, tokens, now):
+        """Grava o saldo após consumir uma ficha e descarta os baldes que já estariam cheios"""
+        self.buckets[key] = [tokens - 1, now]
+        self.buckets.move_to_end(key)
+
+        # Um balde cheio é igual a um balde inexistente: os parados há tempo suficiente saem do início
+        full_after = now - self.capacity / self.rate
+        buckets = self.buckets
+        while buckets:
+            oldest_key = next(iter(buckets))
+            if buckets[oldest_key][1] > full_after:
+                break
+            del buckets[oldest_key]
+
+
+class RateLimiter:
+    """Limita as respostas da IA com um token bucket por usuário, canal e servidor
+
+    Cada balde tem `capacidade` fichas e é reabastecido continuamente
+    (capacidade / segundos por segundo). O saldo é calculado só quando o
+    balde é consultado, a partir do tempo decorrido; não há tarefas nem
+    temporizadores. Uma resposta consome uma ficha de cada escopo, e só é
+    liberada se todos tiverem saldo. Baldes que já teriam se enchido de
+    novo são descartados, então a memória fica limitada a quem falou com o
+    bot recentemente.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self._config_version = object()
+        self.enabled = True
+        self._tables = {}
+
+    def _refresh(self):
+        """Relê os limites quando a configuração muda"""
+        version = getattr(self.config, "version", None)
+        if version == self._config_version:
+            return
+
+        self.enabled = bool(self.config.get_config_value('rate_limit_enabled', True))
+        tables = {}
+        for scope in SCOPES:
+            value = self.config.get_config_value(f'rate_limit_{scope}', DEFAULT_LIMITS[scope])
+            try:
+                limit = parse_limit(value)
+            except ValueError:
+                logger.warning(f"Limite inválido em rate_limit_{scope}: {value}. Usando {DEFAULT_LIMITS[scope]}")
+                limit = parse_limit(DEFAULT_LIMITS[scope])
+            if limit is not None:
+                # Mantém os saldos atuais se o limite não mudou
+                previous = self._tables.get(scope)
+                if previous is not None and (previous.capacity, previous.rate) == limit:
+                    tables[scope] = previous
+                else:
+                    tables[scope] = _BucketTable(*limit)
+        self._tables = tables
+        self._config_version = version
+
+    def __len__(self):
+        return sum(len(table.buckets) for table in self._tables.values())
+
+    def _balances(self, user_id, channel_id, guild_id, now):
+        """Saldo de cada escopo: (None, [(tabela, chave, fichas)]) se todos têm ficha, ou (RateLimited, None)"""
+        keys = {SCOPE_USER: user_id, SCOPE_CHANNEL: channel_id, SCOPE_GUILD: guild_id}
+        balances = []
+        for scope, table in self._tables.items():
+            key = keys[scope]
+            if key is None:
+                continue
+            tokens = table.available(key, now)
+            if tokens < 1:
+                metrics.incr(f"rate_limit.{scope}")
+                return RateLimited(scope, (1 - tokens) / table.rate), None
+            balances.append((table, key, tokens))
+        return None, balances
+
+    def check(self, user_id, channel_id, guild_id=None, now=None):
+        """Verifica se uma resposta seria liberada, sem consumir fichas; retorna None ou RateLimited"""
+        self._refresh()
+        if not self.enabled or not self._tables:
+            return None
+        return self._balances(user_id, channel_id, guild_id, time.monotonic() if now is None else now)[0]
+
+    def acquire(self, user_id, channel_id, guild_id=None, now=None):
+        """Consome uma ficha de cada escopo; retorna None se liberado ou RateLimited se algum escopo estiver vazio"""
+        self._refresh()
+        if not self.enabled or not self._tables:
+            return None
+
+        # Primeiro verifica todos os escopos, para não consumir fichas de uma resposta negada
+        now = time.monotonic() if now is None else now
+        limited, balances = self._balances(user_id, channel_id, guild_id, now)
+        if limited is not None:
+            return limited
+
+        for table, key, tokens in balances:
+            table.consume(key, tokens, now)
+        return None
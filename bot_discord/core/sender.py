@@ -0,0 +1,247 @@
+# sender.py
+# Envio de mensagens ao Discord: divisão em partes de até 2000 caracteres e fila por canal com limite de envio
+
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict, deque
+
+import discord
+
+from core.metrics import metrics
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+
+# Tamanho máximo de uma mensagem do Discord
+DISCORD_MESSAGE_LIMIT = 2000
+# Limite de envio por canal do Discord: até CHANNEL_BURST mensagens a cada CHANNEL_PERIOD segundos
+CHANNEL_BURST = 5
+CHANNEL_PERIOD = 5.0
+# Canais sem envios pendentes são esquecidos depois disso (s); ao voltar, o histórico de envios já expirou
+IDLE_SECONDS = 60.0
+
+# Linha que abre ou fecha um bloco de código, com a linguagem opcional
+_FENCE = re.compile(r"^```(\S*)", re.MULTILINE)
+_CLOSE_FENCE = "\n```"
+
+
+def _open_fence(text):
+    """Linguagem do bloco de código que fica aberto no fim do texto, ou None se todos foram fechados"""
+    language = None
+    for match in _FENCE.finditer(text):
+        language = match.group(1) if language is None else None
+    return language
+
+
+def _cut_position(text, limit):
+    """Melhor ponto de corte até `limit`: parágrafo fora de código, quebra de linha, espaço ou corte seco
+
+    Returns:
+        (fim da parte, início do restante)
+    """
+    window = text[:limit + 1]
+    # Partes muito curtas desperdiçam mensagens: só aceita cortes depois de 1/4 do limite
+    floor = limit // 4
+
+    # Fim de parágrafo fora de um bloco de código
+    position = window.rfind("\n\n", 0, limit)
+    while position > floor:
+        if _open_fence(text[:position]) is None:
+            return position, position + 2
+        position = window.rfind("\n\n", 0, position)
+
+    for separator in ("\n", " "):
+        position = window.rfind(separator, 0, limit)
+        if position > floor:
+            return position, position + 1
+    return limit, limit
+
+
+def split_message(text, limit=DISCORD_MESSAGE_LIMIT):
+    """Divide um texto em partes de até `limit` caracteres, preferindo os limites de parágrafos
+
+    Um bloco de código cortado no meio é fechado no fim da parte e reaberto
+    (com a mesma linguagem) no início da seguinte, então cada parte é
+    formatada corretamente pelo Discord.
+    """
+    text = text.strip()
+    chunks = []
+    while len(text) > limit:
+        # Reserva espaço para fechar um bloco de código que fique aberto
+        end, resume = _cut_position(text, limit - len(_CLOSE_FENCE))
+        chunk, text = text[:end].rstrip(), text[resume:]
+        language = _open_fence(chunk)
+        if language is not None:
+            chunk += _CLOSE_FENCE
+            text = f"```{language}\n{text}"
+        else:
+            text = text.lstrip("\n")
+        chunks.append(chunk)
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+class _Outgoing:
+    """Envio pendente: as partes de uma resposta, ou as linhas de um aviso (que podem ser mescladas)"""
+
+    __slots__ = ("chunks", "lines", "kwargs", "placeholder", "future", "queued_at")
+
+    def __init__(self, chunks, kwargs, lines=None, placeholder=None):
+        self.chunks = chunks
+        self.lines = lines
+        self.kwargs = kwargs
+        # Mensagem já enviada que é editada para conter a primeira parte
+        self.placeholder = placeholder
+        self.future = asyncio.get_running_loop().create_future()
+        self.queued_at = time.perf_counter()
+
+
+class _ChannelQueue:
+    __slots__ = ("items", "sent_at", "worker")
+
+    def __init__(self, burst):
+        self.items = deque()
+        # Horário dos últimos envios, para respeitar o limite do canal sem esperar o erro 429
+        self.sent_at = deque(maxlen=burst)
+        self.worker = None
+
+
+class MessageSender:
+    """Fila de saída por canal: cada canal envia em ordem, e canais diferentes enviam em paralelo
+
+    Antes de cada envio, o horário dos últimos `burst` envios do canal é
+    comparado com o período do limite do Discord; se o canal esgotou o
+    limite, a fila espera o tempo que falta em vez de receber um erro 429.
+    As partes de uma mesma resposta saem juntas, sem mensagens de outras
+    respostas no meio. Avisos (`send_status`) ainda na fila são mesclados
+    em uma única mensagem. As latências ficam em `sender.latency` (da
+    entrada na fila até o último envio) e `sender.send` (cada chamada à API).
+    """
+
+    def __init__(self, burst=CHANNEL_BURST, period=CHANNEL_PERIOD, limit=DISCORD_MESSAGE_LIMIT):
+        self.burst = burst
+        self.period = period
+        self.limit = limit
+        # canal -> _ChannelQueue, do menos para o mais recente
+        self._queues = OrderedDict()
+
+    def __len__(self):
+        return sum(len(queue.items) for queue in self._queues.values())
+
+    def pending(self, channel_id):
+        """Envios aguardando na fila do canal"""
+        queue = self._queues.get(channel_id)
+        return len(queue.items) if queue is not None else 0
+
+    def _queue(self, channel_id):
+        """Fila do canal (criada se necessário), descartando as filas paradas há tempo suficiente"""
+        queues = self._queues
+        queue = queues.get(channel_id)
+        if queue is None:
+            queue = queues[channel_id] = _ChannelQueue(self.burst)
+        else:
+            queues.move_to_end(channel_id)
+
+        cutoff = time.monotonic() - IDLE_SECONDS
+        while queues:
+            oldest_id = next(iter(queues))
+            oldest = queues[oldest_id]
+            if oldest is queue or oldest.items or oldest.worker is not None or (oldest.sent_at and oldest.sent_at[-1] > cutoff):
+                break
+            del queues[oldest_id]
+        return queue
+
+    async def send(self, channel, text, placeholder=None, **kwargs):
+        """Envia um texto de qualquer tamanho (dividido em partes) e retorna a lista de mensagens enviadas
+
+        Com `placeholder` (uma mensagem do bot já enviada, ex: "na fila"), a
+        primeira parte substitui o conteúdo dela em vez de ser uma mensagem
+        nova; se o aviso foi apagado, ela é enviada normalmente. Argumentos
+        extras (ex: reference) vão só na primeira parte.
+        """
+        chunks = split_message(text, self.limit)
+        if not chunks:
+            return []
+        metrics.incr("sender.chunks", len(chunks))
+        return await self._enqueue(channel, _Outgoing(chunks, kwargs, placeholder=placeholder))
+
+    async def send_status(self, channel, text, **kwargs):
+        """Envia um aviso curto; avisos iguais ainda na fila do canal viram uma única mensagem
+
+        Returns:
+            A mensagem enviada (compartilhada pelos avisos mesclados)
+        """
+        queue = self._queues.get(channel.id)
+        last = queue.items[-1] if queue is not None and queue.items else None
+        if last is not None and last.lines is not None and last.kwargs == kwargs and (
+                text in last.lines or sum(len(line) + 1 for line in last.lines) + len(text) <= self.limit):
+            if text not in last.lines:
+                last.lines.append(text)
+            metrics.incr("sender.merged")
+            messages = await asyncio.shield(last.future)
+            return messages[0]
+
+        messages = await self._enqueue(channel, _Outgoing(None, kwargs, lines=[text]))
+        return messages[0]
+
+    async def _enqueue(self, channel, item):
+        queue = self._queue(channel.id)
+        queue.items.append(item)
+        if queue.worker is None:
+            queue.worker = asyncio.ensure_future(self._drain(channel, queue))
+        # Quem espera pode ser cancelado sem interromper o envio (nem os avisos mesclados)
+        return await asyncio.shield(item.future)
+
+    async def _throttle(self, queue):
+        """Espera se o canal já fez `burst` envios dentro do período"""
+        if len(queue.sent_at) < self.burst:
+            return
+        wait = queue.sent_at[0] + self.period - time.monotonic()
+        if wait > 0:
+            metrics.incr("sender.throttled")
+            await asyncio.sleep(wait)
+
+    async def _drain(self, channel, queue):
+        """Envia os itens da fila do canal em ordem, até esvaziá-la"""
+        try:
+            while queue.items:
+                item = queue.items.popleft()
+                chunks = item.chunks if item.lines is None else ["\n".join(item.lines)]
+                sent = []
+                try:
+                    for index, chunk in enumerate(chunks):
+                        if index == 0 and item.placeholder is not None:
+                            # Edições têm um limite próprio no Discord e não contam para o de envios
+                            try:
+                                await item.placeholder.edit(content=chunk)
+                                sent.append(item.placeholder)
+                                continue
+                            except discord.HTTPException as e:
+                                # Aviso apagado (NotFound) ou edição recusada: a primeira parte vai como mensagem nova
+                                logger.warning(f"Erro ao editar o aviso no canal {channel.id}, enviando a resposta: {e}")
+                                metrics.incr("sender.placeholder_errors")
+                        await self._throttle(queue)
+                        start = time.perf_counter()
+                        sent.append(await channel.send(chunk, **(item.kwargs if index == 0 else {})))
+                        queue.sent_at.append(time.monotonic())
+                        metrics.observe("sender.send", time.perf_counter() - start)
+                except Exception as e:
+                    logger.error(f"Erro ao enviar mensagem no canal {channel.id}: {e}")
+                    metrics.incr("sender.errors")
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                    continue
+
+                metrics.observe("sender.latency", time.perf_counter() - item.queued_at)
+                if not item.future.done():
+                    item.future.set_result(sent)
+        finally:
+            queue.worker = None
+            # Desligamento: quem ainda espera na fila é liberado
+            while queue.items:
+                item = queue.items.popleft()
+                if not item.future.done():
+                    item.future.cancel()
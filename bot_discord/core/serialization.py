@@ -0,0 +1,75 @@
+# serialization.py
+# Serialização JSON centralizada: usa orjson ou msgspec quando instalados e o json padrão como alternativa
+
+import json
+import logging
+
+from core import storage
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+if orjson is not None:
+    BACKEND = "orjson"
+elif msgspec is not None:
+    BACKEND = "msgspec"
+else:
+    BACKEND = "json"
+
+if msgspec is not None:
+    _msgspec_encoder = msgspec.json.Encoder()
+    _msgspec_decoder = msgspec.json.Decoder()
+
+
+def dumps(obj, pretty=False):
+    """Serializa um objeto em JSON (bytes UTF-8)
+
+    O formato padrão é compacto; `pretty=True` gera JSON indentado para
+    arquivos que costumam ser editados à mão (como o config.json).
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+
+    if msgspec is not None and not pretty:
+        return _msgspec_encoder.encode(obj)
+
+    if pretty:
+        return json.dumps(obj, indent=4, ensure_ascii=False).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def dumps_str(obj):
+    """Serializa um objeto em JSON compacto como str (para bibliotecas que esperam texto, como o aiohttp)"""
+    return dumps(obj).decode('utf-8')
+
+
+def loads(data):
+    """Desserializa JSON a partir de bytes ou str"""
+    if orjson is not None:
+        return orjson.loads(data)
+    if msgspec is not None:
+        return _msgspec_decoder.decode(data.encode('utf-8') if isinstance(data, str) else data)
+    return json.loads(data)
+
+
+def load_file(path):
+    """Lê e desserializa um arquivo JSON, recorrendo à cópia de segurança se ele estiver corrompido"""
+    return storage.load(path, loads)
+
+
+def dump_file(path, obj, pretty=False, durability=None, backup=True):
+    """Serializa um objeto e grava em um arquivo JSON de forma atômica (ver core.storage)"""
+    return storage.write_atomic(path, dumps(obj, pretty), durability=durability, backup=backup)
@@ -0,0 +1,152 @@
+# storage.py
+# Gravação atômica dos arquivos em data/ com recuperação na leitura
+
+import os
+import time
+import logging
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+
+# Níveis de durabilidade das gravações
+DURABILITY_NONE = "none"  # Arquivo temporário + rename (protege contra falhas do processo)
+DURABILITY_FILE = "file"  # Também faz fsync do arquivo antes do rename (protege contra quedas de energia)
+DURABILITY_FULL = "full"  # Também faz fsync do diretório após o rename (o rename sobrevive a quedas de energia)
+DURABILITY_LEVELS = (DURABILITY_NONE, DURABILITY_FILE, DURABILITY_FULL)
+
+BACKUP_SUFFIX = ".bak"
+TEMP_SUFFIX = ".tmp"
+
+_default_durability = DURABILITY_FILE
+
+
+def set_default_durability(level):
+    """Define o nível de durabilidade usado quando nenhum é informado"""
+    global _default_durability
+    if level not in DURABILITY_LEVELS:
+        logger.warning(f"Nível de durabilidade inválido: {level}. Usando '{DURABILITY_FILE}'.")
+        level = DURABILITY_FILE
+    _default_durability = level
+
+
+def get_default_durability():
+    """Retorna o nível de durabilidade padrão"""
+    return _default_durability
+
+
+def backup_path(path):
+    """Caminho da cópia de segurança de um arquivo"""
+    return f"{path}{BACKUP_SUFFIX}"
+
+
+def exists(path):
+    """Verifica se o arquivo ou sua cópia de segurança existe"""
+    return os.path.exists(path) or os.path.exists(backup_path(path))
+
+
+def _fsync_dir(directory):
+    """Garante que a entrada do diretório (o rename) foi gravada em disco (sem efeito no Windows)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_atomic(path, data, durability=None, backup=True):
+    """Grava bytes em um arquivo sem nunca deixá-lo truncado
+
+    Os dados vão para um arquivo temporário no mesmo diretório, que então
+    substitui o original com os.replace (atômico). Com `backup`, a versão
+    anterior é mantida em `<arquivo>.bak`, usada pela leitura se o arquivo
+    principal estiver ausente ou corrompido.
+    """
+    path = os.fspath(path)
+    durability = durability or _default_durability
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    temp_path = f"{path}.{os.getpid()}{TEMP_SUFFIX}"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+            if durability != DURABILITY_NONE:
+                f.flush()
+                os.fsync(f.fileno())
+
+        if backup and os.path.exists(path):
+            # Se o processo cair entre os dois replaces, a leitura recupera o .bak
+            os.replace(path, backup_path(path))
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+    if durability == DURABILITY_FULL:
+        _fsync_dir(directory)
+    return len(data)
+
+
+def _preserve_corrupt(path):
+    """Renomeia um arquivo corrompido para que a próxima gravação não apague a evidência"""
+    corrupt_path = f"{path}.corrupt-{int(time.time())}"
+    try:
+        os.replace(path, corrupt_path)
+        logger.warning(f"Arquivo corrompido preservado em {corrupt_path}")
+    except OSError as e:
+        logger.error(f"Não foi possível preservar o arquivo corrompido {path}: {e}")
+
+
+def load(path, parse):
+    """Lê e interpreta um arquivo, recorrendo à cópia de segurança se ele estiver ausente ou corrompido
+
+    Args:
+        path: Caminho do arquivo
+        parse: Função que recebe os bytes do arquivo e retorna os dados
+
+    Raises:
+        FileNotFoundError: Se nem o arquivo nem a cópia de segurança existem
+        Exception: O erro de leitura do arquivo, se a cópia também falhar
+    """
+    path = os.fspath(path)
+    error = None
+
+    if os.path.exists(path):
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            if not data.strip():
+                raise ValueError("arquivo vazio")
+            return parse(data)
+        except Exception as e:
+            logger.error(f"Erro ao ler {path}: {e}")
+            error = e
+
+    bak = backup_path(path)
+    if not os.path.exists(bak):
+        if error is not None:
+            _preserve_corrupt(path)
+            raise error
+        raise FileNotFoundError(path)
+
+    try:
+        with open(bak, 'rb') as f:
+            result = parse(f.read())
+    except Exception:
+        if error is not None:
+            _preserve_corrupt(path)
+            raise error
+        raise
+    logger.warning(f"{path} recuperado a partir da cópia de segurança {bak}")
+
+    if error is not None:
+        _preserve_corrupt(path)
+    return result
@@ -5,31 +5,73 @@ import requests
 import json
 import logging
 import os
+import re
+import time
 import aiohttp
 import asyncio
+from datetime import datetime
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 
+from core.metrics import metrics
+from modules.memory import LLMContext
+from modules.triggers import MEMORY_TRIGGERS
+from modules.llm_backends import (
+    BackendPool, BackendRequestError, BackendUnavailableError,
+    BACKEND_OK, BACKEND_WARMING, BACKEND_DEGRADED, BACKEND_OFFLINE
+)
+
 # Carrega variáveis de ambiente
 load_dotenv()
 
 # Configuração do logger
 logger = logging.getLogger(__name__)
 
+# Formas de montar a lista de mensagens enviada ao modelo
+PROMPT_LAYOUT_STABLE = "stable"  # Prefixo de sistema fixo + histórico que só cresce no final
+PROMPT_LAYOUT_LEGACY = "legacy"  # Memórias no início e personalidade na última mensagem
+PROMPT_LAYOUTS = (PROMPT_LAYOUT_STABLE, PROMPT_LAYOUT_LEGACY)
+
+# Nomes dos dias da semana (datetime.weekday())
+WEEKDAYS = ("segunda-feira", "terça-feira", "quarta-feira", "quinta-feira", "sexta-feira", "sábado", "domingo")
+
+# Palavras de ligação no início da informação a guardar ("que eu gosto de café" -> "eu gosto de café")
+LEADING_CONNECTORS = re.compile(r"^(?:(?:que|de|do|da|dos|das)\b[\s,:]*)+", re.IGNORECASE)
+
 class AIHandler:
     def __init__(self, config):
         self.config = config
         self.api_url = os.getenv('LM_STUDIO_API_URL', 'http://localhost:1234/v1')
+        
+        # Vários servidores podem ser informados separados por vírgula em LM_STUDIO_API_URLS
+        api_urls = os.getenv('LM_STUDIO_API_URLS', '')
+        self.api_urls = [url.strip() for url in api_urls.split(',') if url.strip()] or [self.api_url]
         self.model = config.get_config_value('ai_model')
         self.max_tokens = 2048  # Valor padrão
         self.temperature = 0.7  # Valor padrão
         self.timeout = 30  # Timeout para requisições em segundos
+        self.warm_up_timeout = 120  # Timeout do aquecimento (o carregamento do modelo pode demorar)
         
         # Cache simples para respostas frequentes
         self.response_cache = {}
         self.cache_size = 50  # Tamanho máximo do cache
         self.cache_enabled = True
         
+        # Pool de backends com roteamento por menor carga, failover e afinidade por canal
+        self.pool = BackendPool(
+            self.api_urls,
+            max_concurrency=int(config.get_config_value('backend_max_concurrency', 1))
+        )
+        
+        # Monitoramento de saúde e aquecimento periódico do modelo
+        self.health_check_interval = int(config.get_config_value('health_check_interval', 60))
+        self.keep_warm_interval = int(config.get_config_value('keep_warm_interval', 300))
+        self.active_hours = self._parse_active_hours(config.get_config_value('active_hours', '8-23'))
+        self._health_task = None
+        self._warm_up_task = None
+        # Backends cujo /models não lista o modelo configurado (o aviso sai uma vez por backend)
+        self._model_mismatch = set()
+        
     def set_model_params(self, max_tokens=None, temperature=None):
         """Define parâmetros do modelo de IA"""
         if max_tokens is not None:
@@ -37,41 +79,273 @@ class AIHandler:
         if temperature is not None:
             self.temperature = temperature
         
-    async def generate_response(self, prompt, context=None):
-        """Gera uma resposta usando o LM Studio com cache e timeout"""
+    def get_prompt_layout(self):
+        """Retorna o formato de prompt configurado (stable ou legacy)"""
+        layout = str(self.config.get_config_value('prompt_layout', PROMPT_LAYOUT_STABLE)).lower()
+        return layout if layout in PROMPT_LAYOUTS else PROMPT_LAYOUT_STABLE
+    
+    def uses_stable_layout(self):
+        """Indica se a personalidade deve ir no prefixo de sistema em vez de na mensagem do usuário"""
+        return self.get_prompt_layout() == PROMPT_LAYOUT_STABLE
+    
+    @staticmethod
+    def _parse_active_hours(value):
+        """Converte o intervalo de horas ativas ("8-23") em uma tupla (início, fim)"""
         try:
-            # Prepara o contexto para o modelo
-            messages = []
-            
-            # Adiciona contexto se fornecido
-            if context:
-                # Registra informações sobre o contexto para depuração
-                logger.debug(f"Contexto recebido: {len(context)} mensagens")
-                logger.debug(f"Memória de longo prazo: {sum(1 for msg in context if msg.get('is_memory', False))} itens")
+            start, end = (int(part) for part in str(value).split('-'))
+            return start % 24, end % 24
+        except ValueError:
+            logger.warning(f"Intervalo de horas ativas inválido: {value}. Usando 0-24.")
+            return 0, 0
+    
+    def _is_active_hour(self):
+        """Verifica se o horário atual está dentro das horas ativas (aceita intervalos que cruzam a meia-noite)"""
+        start, end = self.active_hours
+        if start == end:
+            return True
+        hour = datetime.now().hour
+        if start < end:
+            return start <= hour < end
+        return hour >= start or hour < end
+    
+    @property
+    def backend_status(self):
+        """Estado consolidado dos backends de IA"""
+        return self.pool.aggregate_status()
+    
+    def is_degraded(self):
+        """Indica se nenhum backend está pronto para responder rapidamente"""
+        return self.backend_status in (BACKEND_WARMING, BACKEND_DEGRADED, BACKEND_OFFLINE)
+    
+    def is_offline(self):
+        """Indica se todos os backends estão inacessíveis (e não apenas carregando o modelo)"""
+        return self.backend_status == BACKEND_OFFLINE
+    
+    async def check_health(self):
+        """Consulta /models em todos os backends e atualiza seus estados"""
+        await asyncio.gather(*(self._check_backend(backend) for backend in self.pool.backends))
+        return self.backend_status
+    
+    async def _check_backend(self, backend):
+        """Consulta /models em um backend e verifica se o modelo configurado está carregado"""
+        try:
+            result = await self.pool.get_from(backend, "/models", timeout=5)
+        except Exception as e:
+            logger.debug(f"Backend {backend.url} inacessível: {e}")
+            if backend.status != BACKEND_WARMING:
+                backend.set_status(BACKEND_OFFLINE)
+            return
+        
+        backend.model_ids = [model.get("id") for model in result.get("data", [])]
+        # Sem nenhum modelo carregado o servidor não responde; um id diferente do configurado
+        # (ex: apelido ou caminho do arquivo) não impede a resposta e só gera um aviso
+        loaded = bool(backend.model_ids)
+        if loaded and self.model not in (None, "", "default") and self.model not in backend.model_ids:
+            if backend.url not in self._model_mismatch:
+                self._model_mismatch.add(backend.url)
+                logger.warning(
+                    f"O modelo configurado ({self.model}) não aparece em {backend.url}/models "
+                    f"({', '.join(map(str, backend.model_ids))}); usando o backend mesmo assim"
+                )
+        else:
+            self._model_mismatch.discard(backend.url)
+        
+        # Durante o aquecimento, o estado só muda quando o aquecimento termina
+        if backend.status != BACKEND_WARMING:
+            backend.set_status(BACKEND_OK if loaded else BACKEND_DEGRADED)
+    
+    def request_warm_up(self, backends=None):
+        """Agenda um aquecimento do modelo em segundo plano, se ainda não houver um em andamento"""
+        if self._warm_up_task is None or self._warm_up_task.done():
+            self._warm_up_task = asyncio.create_task(self.warm_up(backends))
+        return self._warm_up_task
+    
+    def start_health_monitor(self):
+        """Inicia a tarefa de monitoramento de saúde e aquecimento periódico"""
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.create_task(self._health_loop())
+    
+    def stop_health_monitor(self):
+        """Interrompe a tarefa de monitoramento"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+    
+    async def close(self):
+        """Encerra o monitoramento e fecha as conexões com os backends"""
+        self.stop_health_monitor()
+        await self.pool.close()
+    
+    async def _health_loop(self):
+        """Verifica periodicamente os backends e mantém o modelo carregado durante as horas ativas"""
+        while True:
+            try:
+                await self.check_health()
                 
-                for msg in context:
-                    # Determina o papel da mensagem no contexto
-                    if msg.get("user_id") == "system" and msg.get("is_memory", False):
-                        # Mensagens de memória de longo prazo são tratadas como informações do sistema
-                        role = "system"
-                        logger.debug(f"Memória de longo prazo incluída: {msg.get('content', '')[:50]}...")
-                    else:
-                        # Outras mensagens são do assistente ou do usuário
-                        role = "assistant" if msg.get("is_bot", False) else "user"
-                    
-                    messages.append({
-                        "role": role,
-                        "content": msg.get("content", "")
-                    })
+                now = time.monotonic()
+                active = self._is_active_hour()
+                to_warm = [
+                    backend for backend in self.pool.backends
+                    if backend.status == BACKEND_DEGRADED or (
+                        backend.status == BACKEND_OK
+                        and active
+                        and now - backend.last_activity >= self.keep_warm_interval
+                    )
+                ]
+                if to_warm:
+                    # Recarrega modelos descarregados ou evita que sejam descarregados por inatividade
+                    await self.request_warm_up(to_warm)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro no monitoramento do LM Studio: {e}")
             
-            # Adiciona a mensagem atual
-            messages.append({
-                "role": "user",
-                "content": prompt
-            })
+            await asyncio.sleep(self.health_check_interval)
+    
+    async def warm_up(self, backends=None):
+        """Envia uma requisição mínima a cada backend para abrir a conexão e carregar o modelo"""
+        backends = backends or self.pool.backends
+        results = await asyncio.gather(*(self._warm_up_backend(backend) for backend in backends))
+        return any(results)
+    
+    async def _warm_up_backend(self, backend):
+        """Aquece um único backend"""
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": "oi"}],
+            "max_tokens": 1,
+            "temperature": 0
+        }
+        
+        # Se o modelo não está pronto, o backend sai do roteamento durante o aquecimento
+        if backend.status != BACKEND_OK:
+            backend.set_status(BACKEND_WARMING)
+        
+        try:
+            await self.pool.post_to(backend, "/chat/completions", payload, timeout=self.warm_up_timeout)
+            backend.record_success()
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"Timeout ao aquecer o modelo em {backend.url} após {self.warm_up_timeout} segundos")
+            backend.set_status(BACKEND_DEGRADED)
+            return False
+        except Exception as e:
+            logger.warning(f"Erro ao aquecer o modelo em {backend.url}: {e}")
+            backend.set_status(BACKEND_OFFLINE)
+            return False
+        
+    def _build_legacy_messages(self, prompt, context=None, time_context=None):
+        """Monta as mensagens no formato antigo: memórias no início, histórico e o prompt formatado no final"""
+        context = LLMContext.from_records(context)
+        
+        # Memórias de longo prazo e o resumo da conversa são tratados como informações do sistema
+        messages = [{"role": "system", "content": msg.get("content", "")} for msg in context.memories]
+        if context.summary:
+            messages.append({"role": "system", "content": context.summary})
+        messages.extend(context.history)
+        
+        # Contexto de tempo logo antes da mensagem atual
+        if time_context is not None:
+            messages.append({"role": "system", "content": time_context.format()})
+        
+        # Adiciona a mensagem atual
+        messages.append({
+            "role": "user",
+            "content": prompt
+        })
+        return messages
+    
+    def _build_system_prompt(self, system_prompt=None, memories=(), summary=None, date_block=None):
+        """Monta a mensagem de sistema: personalidade, data atual, memórias em ordem determinística e resumo
+        
+        O conteúdo só muda quando a personalidade, o dia, as memórias ou o
+        resumo mudam, permitindo que o servidor reaproveite o cache de prompt
+        entre as mensagens.
+        """
+        parts = []
+        if system_prompt:
+            parts.append(f"Personalidade: {system_prompt}")
+        # Apenas a data (sem o horário) para que o prefixo fique estável durante o dia
+        if date_block:
+            parts.append(date_block)
+        else:
+            now = datetime.now()
+            parts.append(f"Data atual: {WEEKDAYS[now.weekday()]}, {now.strftime('%d/%m/%Y')}")
+        
+        if memories:
+            lines = "\n".join(f"- {msg.get('content', '')}" for msg in memories)
+            parts.append(f"Informações que você deve lembrar:\n{lines}")
+        
+        if summary:
+            parts.append(f"Resumo da conversa até aqui:\n{summary}")
+        
+        return "\n\n".join(parts)
+    
+    def _build_stable_messages(self, prompt, context=None, system_prompt=None, time_context=None):
+        """Monta as mensagens com um prefixo estável: sistema primeiro e depois o histórico em ordem
+        
+        Entre uma mensagem e a próxima, apenas novos turnos são acrescentados
+        ao final da lista (enquanto o histórico não atinge o limite da memória).
+        A hora atual, que muda a cada minuto, vai na mensagem atual, fora do prefixo.
+        """
+        context = LLMContext.from_records(context)
+        date_block = time_context.date_block if time_context is not None else None
+        
+        # O histórico já vem no formato da API: a montagem só copia as referências
+        messages = [{"role": "system", "content": self._build_system_prompt(
+            system_prompt, context.memories, context.summary, date_block
+        )}]
+        messages.extend(context.history)
+        
+        # A mensagem atual só vai para a memória depois da geração, então é acrescentada aqui; a exceção é
+        # a mesma pergunta repetida depois de um aviso de modelo carregando (já gravada, sem resposta)
+        last = messages[-1]
+        if last["role"] != "user" or last["content"] != prompt:
+            messages.append({"role": "user", "content": prompt})
+        
+        # Novo dict: os do histórico são compartilhados com o cache da Memory
+        if time_context is not None:
+            messages[-1] = {"role": "user", "content": f"[{time_context.time_line}]\n{messages[-1]['content']}"}
+        return messages
+    
+    def _record_usage(self, layout, result, elapsed):
+        """Registra o tempo da requisição e, se o servidor informar, os tokens e o tempo de processamento do prompt"""
+        metrics.observe(f"llm.latency.{layout}", elapsed)
+        
+        usage = result.get("usage") or {}
+        if usage.get("prompt_tokens"):
+            metrics.incr(f"llm.prompt_tokens.{layout}", usage["prompt_tokens"])
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+        if cached:
+            metrics.incr(f"llm.cached_tokens.{layout}", cached)
+        
+        # Servidores baseados no llama.cpp informam o tempo de processamento do prompt em "timings"
+        prompt_ms = (result.get("timings") or {}).get("prompt_ms")
+        if prompt_ms is not None:
+            metrics.observe(f"llm.prompt_time.{layout}", prompt_ms / 1000)
+    
+    async def generate_response(self, prompt, context=None, channel_id=None, system_prompt=None, time_context=None,
+                                progress=None):
+        """Gera uma resposta usando o LM Studio com cache e timeout
+        
+        Args:
+            prompt: Mensagem atual do usuário
+            context: Mensagens anteriores (LLMContext da Memory ou lista de registros de memória)
+            channel_id: Canal de origem, usado para manter o canal no mesmo backend
+            system_prompt: Personalidade do bot, colocada no prefixo de sistema (formato stable)
+            time_context: TimeContext do TimeHandler (data no prefixo, hora na mensagem atual)
+            progress: Avisado da posição na fila de backends e do início da geração (ex: ReplyProgress)
+        """
+        try:
+            # Prepara o contexto para o modelo
+            layout = self.get_prompt_layout()
+            if layout == PROMPT_LAYOUT_STABLE:
+                messages = self._build_stable_messages(prompt, context, system_prompt, time_context)
+            else:
+                messages = self._build_legacy_messages(prompt, context, time_context)
             
-            # Gera uma chave de cache baseada no prompt e contexto
-            cache_key = self._generate_cache_key(prompt, context)
+            # Gera uma chave de cache baseada no prompt e nas últimas mensagens enviadas
+            cache_key = self._generate_cache_key(prompt, messages[:-1])
             
             # Verifica se a resposta está no cache
             if self.cache_enabled and cache_key in self.response_cache:
@@ -86,45 +360,87 @@ class AIHandler:
                 "temperature": self.temperature
             }
             
-            # Faz a requisição para a API com timeout usando aiohttp (assíncrono)
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.api_url}/chat/completions",
-                    headers={"Content-Type": "application/json"},
-                    json=payload,
-                    timeout=self.timeout
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        content = result["choices"][0]["message"]["content"]
-                        
-                        # Armazena no cache se estiver habilitado
-                        if self.cache_enabled:
-                            self._update_cache(cache_key, content)
-                            
-                        return content
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Erro na API do LM Studio: {response.status} - {error_text}")
-                        return "Desculpe, ocorreu um erro ao processar sua mensagem."
+            # Faz a requisição ao melhor backend disponível, com failover entre os servidores
+            start = time.perf_counter()
+            result = await self.pool.post(
+                "/chat/completions", payload, sticky_key=channel_id, timeout=self.timeout, progress=progress
+            )
+            self._record_usage(layout, result, time.perf_counter() - start)
+            content = result["choices"][0]["message"]["content"]
+            
+            # Armazena no cache se estiver habilitado
+            if self.cache_enabled:
+                self._update_cache(cache_key, content)
+                
+            return content
                 
         except asyncio.TimeoutError:
             logger.error(f"Timeout ao conectar com a API do LM Studio após {self.timeout} segundos")
+            # Provavelmente o modelo foi descarregado: as próximas mensagens recebem um aviso rápido
+            self.request_warm_up()
             return "Desculpe, a resposta está demorando muito. Por favor, tente novamente."
             
+        except BackendUnavailableError as e:
+            logger.error(f"Erro na API do LM Studio: {e}")
+            self.request_warm_up()
+            return "Desculpe, ocorreu um erro ao processar sua mensagem."
+            
+        except BackendRequestError as e:
+            # Erro da própria requisição (ex: contexto longo demais): o modelo continua disponível
+            logger.error(f"Requisição recusada pelo LM Studio: {e}")
+            return "Desculpe, ocorreu um erro ao processar sua mensagem."
+            
         except Exception as e:
             logger.error(f"Erro ao gerar resposta: {e}")
             return "Desculpe, ocorreu um erro ao processar sua mensagem."
     
-    def _generate_cache_key(self, prompt, context=None):
-        """Gera uma chave única para o cache baseada no prompt e contexto"""
+    async def summarize_conversation(self, messages, previous_summary=None, max_tokens=300):
+        """Condensa mensagens antigas (e o resumo anterior) em um novo resumo, com baixa prioridade
+        
+        Returns:
+            str: O novo resumo, ou None se não foi possível gerá-lo
+        """
+        lines = []
+        for msg in messages:
+            author = "Assistente" if msg.get("is_bot", False) else msg.get("username", "Usuário")
+            lines.append(f"{author}: {msg.get('content', '')}")
+        
+        instructions = (
+            "Resuma a conversa abaixo em português, em no máximo 5 frases. Mantenha nomes, fatos, "
+            "decisões e pedidos ainda pendentes; omita cumprimentos e conversa fiada."
+        )
+        if previous_summary:
+            instructions += f"\n\nResumo anterior (incorpore-o ao novo resumo):\n{previous_summary}"
+        
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": "\n".join(lines)}
+            ],
+            "max_tokens": max_tokens,
+            "temperature": 0.3
+        }
+        
+        try:
+            with metrics.timer("llm.summary"):
+                # Baixa prioridade: só usa backends ociosos e cede a vez às respostas aos usuários
+                result = await self.pool.post("/chat/completions", payload, timeout=self.warm_up_timeout, low_priority=True)
+            content = result["choices"][0]["message"]["content"].strip()
+            return content or None
+        except Exception as e:
+            logger.warning(f"Não foi possível resumir a conversa: {e}")
+            return None
+    
+    def _generate_cache_key(self, prompt, messages=None):
+        """Gera uma chave única para o cache baseada no prompt e nas mensagens anteriores"""
         # Cria uma string simples para representar o contexto
         context_str = ""
-        if context:
+        if messages:
             # Usa apenas as últimas 3 mensagens do contexto para a chave
-            for msg in context[-3:]:
-                role = "assistant" if msg.get("is_bot", False) else "user"
-                content = msg.get("content", "")[:50]  # Limita o tamanho
+            for msg in messages[-3:]:
+                role = msg["role"]
+                content = msg["content"][:50]  # Limita o tamanho
                 context_str += f"{role}:{content[:50]}|"  # Trunca para manter a chave pequena
         
         # Combina prompt e contexto para a chave
@@ -158,26 +474,27 @@ class AIHandler:
         # Por exemplo, remover repetições, corrigir formatação, etc.
         return response
         
-    def detect_memory_triggers(self, message, memory):
-        """Detecta gatilhos para armazenar informações na memória de longo prazo"""
-        # Lista de gatilhos que indicam que o usuário quer que o bot lembre de algo
-        memory_triggers = [
-            "lembre-se", "lembre se", "memorize", "guarde", "não esqueça", 
-            "anote", "grave", "registre", "salve", "armazene"
-        ]
+    def detect_memory_triggers(self, message, memory, trigger=None, user_id=None, guild_id=None):
+        """Detecta gatilhos para armazenar informações na memória de longo prazo
         
-        # Verifica se a mensagem contém algum dos gatilhos
+        Args:
+            message: Mensagem do usuário
+            memory: Objeto de memória para armazenar informações
+            trigger: Gatilho já detectado pelo TriggerMatcher (evita varrer a mensagem novamente)
+            user_id: Autor da mensagem, dono da informação (None = compartilhada)
+            guild_id: Servidor da mensagem (None = mensagem direta)
+        """
         message_lower = message.lower()
-        triggered = False
-        trigger_used = None
-        
-        for trigger in memory_triggers:
-            if trigger in message_lower:
-                triggered = True
-                trigger_used = trigger
-                break
+        trigger_used = trigger
+        
+        # Sem gatilho pré-detectado, verifica se a mensagem contém algum dos gatilhos
+        if trigger_used is None:
+            for candidate in MEMORY_TRIGGERS:
+                if candidate in message_lower:
+                    trigger_used = candidate
+                    break
                 
-        if not triggered:
+        if trigger_used is None:
             return False
             
         # Extrai a informação que deve ser armazenada
@@ -188,16 +505,17 @@ class AIHandler:
             info_to_store = message[trigger_index + len(trigger_used):].strip()
             
             # Remove palavras como "que", "de", "do", "da" no início da informação
-            info_to_store = info_to_store.lstrip("que de do da dos das ").strip()
+            info_to_store = LEADING_CONNECTORS.sub("", info_to_store).strip()
             
             # Se a informação não estiver vazia, armazena na memória de longo prazo
             if info_to_store:
-                # Gera uma chave baseada no conteúdo da informação
+                # Gera uma chave baseada no dono e no conteúdo da informação
                 import hashlib
-                key = f"user_info_{hashlib.md5(info_to_store.encode('utf-8')).hexdigest()[:8]}"
+                owner = "" if user_id is None else f"{user_id}:"
+                key = f"user_info_{hashlib.md5(f'{owner}{info_to_store}'.encode('utf-8')).hexdigest()[:8]}"
                 
-                # Armazena a informação na memória de longo prazo
-                memory.store_permanent_info(key, info_to_store)
+                # Armazena a informação na memória de longo prazo do usuário
+                memory.ingest_permanent_info(key, info_to_store, user_id=user_id, guild_id=guild_id)
                 logger.info(f"Informação armazenada na memória de longo prazo: {info_to_store}")
                 return True
                 
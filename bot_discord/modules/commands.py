@@ -5,11 +5,18 @@ import discord
 from discord.ext import commands
 import logging
 import os
-import json
+from core import database, persistence, serialization, storage
+
+from core.metrics import metrics
+from core.rate_limit import parse_limit
+from core.sender import split_message
 
 # Configuração do logger
 logger = logging.getLogger(__name__)
 
+# Informações por página no !memorias (um embed aceita até 25 campos)
+MEMORIES_PER_PAGE = 10
+
 class CommandHandler:
     def __init__(self, bot, config, memory, ai_handler, search_engine):
         self.bot = bot
@@ -21,6 +28,15 @@ class CommandHandler:
         # Dicionário para armazenar comandos personalizados
         self.custom_commands = {}
         
+        # Versão dos comandos personalizados, incrementada a cada alteração (usada pelo TriggerMatcher)
+        self.custom_commands_version = 0
+        
+        # Banco SQLite, se configurado (storage_engine = sqlite); senão, custom_commands.json
+        self.db = database.get_database(config)
+        if self.db is None:
+            # O custom_commands.json é regravado em segundo plano
+            persistence.scheduler.register("custom_commands", self._snapshot_custom_commands, self._save_custom_commands)
+        
         # Assistente de configuração interativa
         from modules.setup import SetupWizard
         self.setup_wizard = SetupWizard(bot, config, self)
@@ -42,7 +58,7 @@ class CommandHandler:
         async def setup_command(ctx):
             await self.setup_wizard.start_setup(ctx)
         
-        @self.bot.command(name='limpar', help='Limpa a memória de curto prazo do bot')
+        @self.bot.command(name='limpar', help='Limpa a memória de curto prazo do bot neste canal')
         async def clear_memory_command(ctx):
             await self._clear_memory_command(ctx)
             
@@ -50,13 +66,17 @@ class CommandHandler:
         async def remember_command(ctx, *, query=None):
             await self._remember_command(ctx, query)
             
-        @self.bot.command(name='memorias', help='Lista todas as informações armazenadas na memória de longo prazo')
-        async def list_memories_command(ctx):
-            await self._list_memories_command(ctx)
+        @self.bot.command(name='memorias', help='Lista as suas informações na memória de longo prazo (e as compartilhadas)')
+        async def list_memories_command(ctx, page: int = 1):
+            await self._list_memories_command(ctx, page)
             
-        @self.bot.command(name='limpar_memorias', help='Limpa todas as informações da memória de longo prazo')
+        @self.bot.command(name='limpar_memorias', help='Limpa as suas informações da memória de longo prazo (administradores limpam todas)')
         async def clear_memories_command(ctx):
             await self._clear_memories_command(ctx)
+            
+        @self.bot.command(name='compactar_memorias', help='Remove informações repetidas da memória de longo prazo')
+        async def compact_memories_command(ctx):
+            await self._compact_memories_command(ctx)
         
         @self.bot.command(name='buscar', help='Busca informações na web')
         async def search_command(ctx, *, query):
@@ -119,6 +139,10 @@ class CommandHandler:
         @self.bot.command(name='fuso_horario', help='Define o fuso horário do bot')
         async def timezone_command(ctx, offset: int = None):
             await self._timezone_command(ctx, offset)
+            
+        @self.bot.command(name='metricas', help='Mostra as métricas de desempenho do bot')
+        async def metrics_command(ctx):
+            await self._metrics_command(ctx)
         
         # Carrega comandos personalizados salvos
         self._load_custom_commands()
@@ -175,14 +199,20 @@ class CommandHandler:
         )
         
         commands_embed.add_field(
-            name=f"{prefix}memorias",
-            value="Lista todas as informações armazenadas na memória de longo prazo do bot",
+            name=f"{prefix}memorias [página]",
+            value="Lista as suas informações e as compartilhadas na memória de longo prazo do bot, 10 por página",
             inline=False
         )
         
         commands_embed.add_field(
             name=f"{prefix}limpar_memorias",
-            value="Limpa todas as informações da memória de longo prazo do bot",
+            value="Limpa as suas informações da memória de longo prazo do bot (administradores limpam todas)",
+            inline=False
+        )
+        
+        commands_embed.add_field(
+            name=f"{prefix}compactar_memorias",
+            value="Remove informações repetidas ou quase repetidas da memória de longo prazo, mantendo a mais recente (apenas administradores)",
             inline=False
         )
         
@@ -192,6 +222,12 @@ class CommandHandler:
             inline=False
         )
         
+        commands_embed.add_field(
+            name=f"{prefix}metricas",
+            value="Mostra as métricas de desempenho do bot (mensagens filtradas e processadas, tempos)",
+            inline=False
+        )
+        
         commands_embed.add_field(
             name=f"{prefix}personalidade [descrição]",
             value="Define a personalidade do bot para as conversas\n\nExemplos:\n• `{prefix}personalidade assistente técnico especializado em Python`\n• `{prefix}personalidade amigável e informal`\n• `{prefix}personalidade professor de história`",
@@ -303,6 +339,21 @@ class CommandHandler:
                 value=f"`{self.config.get_config_value('search_enabled')}`",
                 inline=True
             )
+            embed.add_field(
+                name="Formato do Prompt",
+                value=f"`{self.config.get_config_value('prompt_layout', 'stable')}`",
+                inline=True
+            )
+            embed.add_field(
+                name="Limite de Respostas",
+                value=(
+                    f"usuário `{self.config.get_config_value('rate_limit_user')}`, "
+                    f"canal `{self.config.get_config_value('rate_limit_channel')}`, "
+                    f"servidor `{self.config.get_config_value('rate_limit_guild')}`"
+                    if self.config.get_config_value('rate_limit_enabled', True) else "`desativado`"
+                ),
+                inline=True
+            )
             
             await ctx.send(embed=embed)
             return
@@ -345,13 +396,67 @@ class CommandHandler:
             else:
                 await ctx.send("❌ Valor inválido. Use 'true' ou 'false'")
         
+        elif param.lower() == 'prompt_layout':
+            if value.lower() in ['stable', 'legacy']:
+                self.config.set_config_value('prompt_layout', value.lower())
+                await ctx.send(f"✅ Formato do prompt alterado para `{value.lower()}`")
+            else:
+                await ctx.send("❌ Valor inválido. Use 'stable' ou 'legacy'")
+        
+        elif param.lower() == 'rate_limit_enabled':
+            if value.lower() in ['true', 'yes', '1', 'sim']:
+                self.config.set_config_value('rate_limit_enabled', True)
+                await ctx.send("✅ Limite de respostas ativado")
+            elif value.lower() in ['false', 'no', '0', 'não']:
+                self.config.set_config_value('rate_limit_enabled', False)
+                await ctx.send("✅ Limite de respostas desativado")
+            else:
+                await ctx.send("❌ Valor inválido. Use 'true' ou 'false'")
+        
+        elif param.lower() in ('rate_limit_user', 'rate_limit_channel', 'rate_limit_guild'):
+            try:
+                parse_limit(value)
+            except ValueError:
+                await ctx.send("❌ Valor inválido. Use `N/S` (N respostas a cada S segundos, ex: `5/60`) ou `0` para desativar")
+                return
+            self.config.set_config_value(param.lower(), value)
+            await ctx.send(f"✅ Limite `{param.lower()}` alterado para `{value}`")
+        
         else:
             await ctx.send(f"❌ Parâmetro `{param}` não reconhecido")
     
+    async def _metrics_command(self, ctx):
+        """Mostra os contadores e tempos registrados pelos módulos do bot"""
+        snapshot = metrics.snapshot()
+        
+        embed = discord.Embed(
+            title="📊 Métricas do Bot",
+            color=discord.Color.blue()
+        )
+        
+        counters = "\n".join(f"`{name}`: {value}" for name, value in sorted(snapshot["counters"].items()))
+        embed.add_field(
+            name="Contadores",
+            value=counters[:1024] if counters else "Nenhum contador registrado",
+            inline=False
+        )
+        
+        timings = "\n".join(
+            f"`{name}`: {count}x, média {avg * 1000:.1f} ms, máx {maximum * 1000:.1f} ms"
+            for name, (count, avg, maximum, _) in sorted(snapshot["timings"].items())
+        )
+        embed.add_field(
+            name="Tempos",
+            value=timings[:1024] if timings else "Nenhum tempo registrado",
+            inline=False
+        )
+        
+        await ctx.send(embed=embed)
+    
     async def _clear_memory_command(self, ctx):
-        """Limpa a memória de curto prazo do bot"""
-        self.memory.clear_short_term()
-        await ctx.send("✅ Memória de curto prazo limpa com sucesso")
+        """Limpa a memória de curto prazo do bot no canal atual"""
+        self.memory.clear_short_term(ctx.channel.id)
+        await ctx.send("✅ Memória de curto prazo deste canal limpa com sucesso")
     
     async def _search_command(self, ctx, query, engine=None):
         """Busca informações na web"""
@@ -405,7 +510,8 @@ class CommandHandler:
             # Processa os resultados com a IA
             try:
                 ai_response = await self.ai_handler.analyze_search_results(results, query)
-                await ctx.send(f"🧠 Análise da IA:\n{ai_response}")
+                for chunk in split_message(f"🧠 Análise da IA:\n{ai_response}"):
+                    await ctx.send(chunk)
             except Exception as e:
                 logger.error(f"Erro no processamento da IA: {e}")
                 await ctx.send("❌ Erro ao processar resultados com a IA")
@@ -458,9 +564,10 @@ class CommandHandler:
             "created_by": ctx.author.id,
             "created_at": ctx.message.created_at.isoformat()
         }
+        self.custom_commands_version += 1
         
         # Salva os comandos personalizados
-        self._save_custom_commands()
+        self._persist_custom_command(cmd_name)
         
         # Registra o comando dinamicamente
         @self.bot.command(name=cmd_name)
@@ -483,9 +590,10 @@ class CommandHandler:
         
         # Remove o comando do dicionário
         del self.custom_commands[cmd_name]
+        self.custom_commands_version += 1
         
         # Salva os comandos personalizados
-        self._save_custom_commands()
+        self._persist_custom_command(cmd_name)
         
         # Remove o comando do bot (requer reinicialização para efetivar)
         await ctx.send(f"✅ Comando personalizado `{cmd_name}` removido com sucesso!")
@@ -503,8 +611,8 @@ class CommandHandler:
             await ctx.send("❓ Por favor, especifique o que você deseja que eu lembre. Exemplo: `!lembrar aniversário`")
             return
             
-        # Obtém todas as informações da memória de longo prazo
-        memories = self.memory.long_term
+        # Obtém as informações do autor e as compartilhadas (pelo índice por usuário)
+        memories = self.memory.get_long_term(ctx.author.id, ctx.guild.id if ctx.guild else None)
         
         if not memories:
             await ctx.send("📭 Não há informações armazenadas na memória de longo prazo.")
@@ -514,7 +622,7 @@ class CommandHandler:
         found_memories = []
         query_lower = query.lower()
         
-        for key, data in memories.items():
+        for key, data in memories:
             # Ignora a chave de personalidade que é usada internamente
             if key == 'personality':
                 continue
@@ -562,32 +670,37 @@ class CommandHandler:
         # Envia o embed com as informações encontradas
         await ctx.send(embed=embed)
         
-    async def _list_memories_command(self, ctx):
-        """Lista todas as informações armazenadas na memória de longo prazo"""
-        # Obtém todas as informações da memória de longo prazo
-        memories = self.memory.long_term
+    async def _list_memories_command(self, ctx, page=1):
+        """Lista, em páginas, as informações do autor e as compartilhadas na memória de longo prazo"""
+        # Obtém as informações do autor e as compartilhadas (pelo índice por usuário)
+        memories = self.memory.get_long_term(ctx.author.id, ctx.guild.id if ctx.guild else None)
         
         # Filtra a chave de personalidade que é usada internamente
-        user_memories = {k: v for k, v in memories.items() if k != 'personality'}
+        user_memories = [(k, v) for k, v in memories if k != 'personality']
         
         if not user_memories:
             await ctx.send("📭 Não há informações armazenadas na memória de longo prazo.")
             return
         
-        # Cria um embed para mostrar todas as informações
+        # Seleciona a página pedida
+        total_pages = (len(user_memories) + MEMORIES_PER_PAGE - 1) // MEMORIES_PER_PAGE
+        page = min(max(page, 1), total_pages)
+        start = (page - 1) * MEMORIES_PER_PAGE
+        
+        # Cria um embed para mostrar as informações da página
         embed = discord.Embed(
             title="💭 Memórias Armazenadas",
-            description="Todas as informações armazenadas na memória de longo prazo.",
+            description="Suas informações e as compartilhadas na memória de longo prazo.",
             color=discord.Color.blue()
         )
         
         # Adiciona cada informação ao embed
-        for key, data in user_memories.items():
+        import datetime
+        for key, data in user_memories[start:start + MEMORIES_PER_PAGE]:
             value = data.get("value", "")
             timestamp = data.get("timestamp", "")
             
             # Formata a data para exibição
-            import datetime
             try:
                 dt = datetime.datetime.fromisoformat(timestamp)
                 formatted_date = dt.strftime("%d/%m/%Y %H:%M")
@@ -599,21 +712,48 @@ class CommandHandler:
                 value = value[:197] + "..."
             
             embed.add_field(
-                name=f"📝 Informação",
+                name="📝 Informação" if data.get("user_id") is not None else "📝 Informação compartilhada",
                 value=f"{value}\n*Armazenada em: {formatted_date}*",
                 inline=False
             )
         
         # Adiciona um rodapé com informações
-        embed.set_footer(text=f"Total de memórias: {len(user_memories)} | Listagem feita em {datetime.datetime.now().strftime('%d/%m/%Y %H:%M')}")
+        footer = f"Página {page}/{total_pages} | Total de memórias: {len(user_memories)}"
+        if page < total_pages:
+            footer += f" | Próxima: {self.config.get_prefix()}memorias {page + 1}"
+        embed.set_footer(text=footer)
         
         # Envia o embed com as informações
         await ctx.send(embed=embed)
     
+    async def _compact_memories_command(self, ctx):
+        """Remove as informações repetidas ou quase repetidas da memória de longo prazo"""
+        # Verifica se o usuário tem permissões de administrador
+        if ctx.guild is None or not ctx.author.guild_permissions.administrator:
+            await ctx.send("❌ Você precisa ter permissões de administrador para usar este comando.")
+            return
+        
+        status_message = await ctx.send("🧹 Procurando informações repetidas na memória de longo prazo...")
+        try:
+            removed = await self.memory.compact_long_term()
+        except Exception as e:
+            logger.error(f"Erro ao compactar memória de longo prazo: {e}")
+            await status_message.edit(content="❌ Ocorreu um erro ao compactar a memória de longo prazo.")
+            return
+        
+        if removed:
+            await status_message.edit(content=f"✅ {removed} informações repetidas removidas. Restam {len(self.memory.long_term)} na memória de longo prazo.")
+        else:
+            await status_message.edit(content="✅ Nenhuma informação repetida encontrada.")
+    
     async def _clear_memories_command(self, ctx):
         """Limpa todas as informações da memória de longo prazo"""
+        # Administradores limpam toda a memória de longo prazo; os demais, apenas as próprias informações
+        clear_all = ctx.guild is not None and ctx.author.guild_permissions.administrator
+        scope = "todas as informações" if clear_all else "as suas informações"
+        
         # Pede confirmação antes de limpar
-        confirmation_message = await ctx.send("⚠️ Tem certeza que deseja limpar todas as informações da memória de longo prazo? Esta ação não pode ser desfeita.")
+        confirmation_message = await ctx.send(f"⚠️ Tem certeza que deseja limpar {scope} da memória de longo prazo? Esta ação não pode ser desfeita.")
         
         # Adiciona reações para confirmação
         await confirmation_message.add_reaction("✅")
@@ -628,7 +768,7 @@ class CommandHandler:
             
             if str(reaction.emoji) == "✅":
                 # Limpa a memória de longo prazo
-                self.memory.clear_long_term()
+                self.memory.clear_long_term(None if clear_all else ctx.author.id)
                 await ctx.send("✅ Memória de longo prazo limpa com sucesso!")
             else:
                 await ctx.send("❌ Operação cancelada.")
@@ -654,8 +794,29 @@ class CommandHandler:
         
         await ctx.send(embed=embed)
     
-    def _save_custom_commands(self):
-        """Salva os comandos personalizados em um arquivo JSON"""
+    def _persist_custom_command(self, cmd_name):
+        """Grava (ou remove, se não existir mais) um comando no SQLite, ou salva o arquivo JSON inteiro"""
+        if self.db is None:
+            persistence.scheduler.mark_dirty("custom_commands")
+            return True
+        
+        cmd_data = self.custom_commands.get(cmd_name)
+        if cmd_data is None:
+            self.db.execute(database.DELETE_CUSTOM_COMMAND, (cmd_name,))
+        else:
+            self.db.execute(database.UPSERT_CUSTOM_COMMAND, (
+                cmd_name, cmd_data["response"], str(cmd_data.get("created_by", "")), cmd_data.get("created_at")
+            ))
+        return True
+    
+    def _snapshot_custom_commands(self):
+        """Copia os comandos personalizados para gravação"""
+        return {cmd_name: dict(cmd_data) for cmd_name, cmd_data in self.custom_commands.items()}
+    
+    def _save_custom_commands(self, custom_commands=None):
+        """Salva os comandos personalizados em um arquivo JSON (por padrão, uma cópia dos atuais)"""
+        if custom_commands is None:
+            custom_commands = self._snapshot_custom_commands()
         try:
             # Caminho para o arquivo de comandos personalizados
             commands_file = os.path.join(
@@ -668,10 +829,9 @@ class CommandHandler:
             os.makedirs(os.path.dirname(commands_file), exist_ok=True)
             
             # Salva os comandos no arquivo
-            with open(commands_file, 'w', encoding='utf-8') as f:
-                json.dump(self.custom_commands, f, indent=4, ensure_ascii=False)
+            serialization.dump_file(commands_file, custom_commands)
                 
-            logger.info(f"Comandos personalizados salvos: {len(self.custom_commands)} comandos")
+            logger.info(f"Comandos personalizados salvos: {len(custom_commands)} comandos")
             return True
         except Exception as e:
             logger.error(f"Erro ao salvar comandos personalizados: {e}")
@@ -761,14 +921,24 @@ class CommandHandler:
                 'custom_commands.json'
             )
             
-            # Verifica se o arquivo existe
-            if not os.path.exists(commands_file):
+            if self.db is not None:
+                # Carrega os comandos do SQLite
+                self.custom_commands = {
+                    name: {
+                        "response": response,
+                        "created_by": int(created_by) if created_by and created_by.isdigit() else created_by,
+                        "created_at": created_at
+                    }
+                    for name, response, created_by, created_at in self.db.query(database.SELECT_CUSTOM_COMMANDS)
+                }
+            elif not storage.exists(commands_file):
+                # Verifica se o arquivo existe
                 logger.info("Arquivo de comandos personalizados não encontrado. Iniciando com lista vazia.")
                 return False
-            
-            # Carrega os comandos do arquivo
-            with open(commands_file, 'r', encoding='utf-8') as f:
-                self.custom_commands = json.load(f)
+            else:
+                # Carrega os comandos do arquivo
+                self.custom_commands = serialization.load_file(commands_file)
+            self.custom_commands_version += 1
             
             # Registra os comandos dinamicamente
             for cmd_name, cmd_data in self.custom_commands.items():
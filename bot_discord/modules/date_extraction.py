@@ -0,0 +1,194 @@
+# date_extraction.py
+# Extração de datas em português com expressões pré-compiladas
+
+import re
+from datetime import date, timedelta
+from typing import Iterable, List, NamedTuple, Optional
+
+# Nomes e abreviações dos meses (com e sem acento)
+MONTHS = {
+    "janeiro": 1, "fevereiro": 2, "março": 3, "marco": 3, "abril": 4, "maio": 5, "junho": 6,
+    "julho": 7, "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12,
+    "jan": 1, "fev": 2, "mar": 3, "abr": 4, "mai": 5, "jun": 6,
+    "jul": 7, "ago": 8, "set": 9, "out": 10, "nov": 11, "dez": 12
+}
+
+# Maior número de dias de cada mês (anos bissextos incluídos)
+_DAYS_IN_MONTH = (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# Dias da semana (segunda = 0, como em date.weekday())
+WEEKDAYS = {
+    "segunda": 0, "terça": 1, "terca": 1, "quarta": 2, "quinta": 3,
+    "sexta": 4, "sábado": 5, "sabado": 5, "domingo": 6
+}
+
+_NUMBER_WORDS = {"um": 1, "uma": 1, "dois": 2, "duas": 2, "três": 3, "tres": 3}
+
+# Palavras que indicam o tipo de evento
+EVENT_KEYWORDS = (
+    "aniversário", "niver", "nascimento", "festa", "comemoração",
+    "evento", "reunião", "encontro", "compromisso", "consulta",
+    "entrega", "prazo", "deadline", "vencimento", "pagamento"
+)
+
+# Nomes mais longos primeiro, para "março" não parar em "mar"
+_MONTH_ALTERNATION = "|".join(sorted(MONTHS, key=len, reverse=True))
+_WEEKDAY_ALTERNATION = "|".join(WEEKDAYS)
+# "no sábado" é sempre uma data; "na segunda"/"na quinta" também podem ser ordinais ("na segunda vez")
+_WEEKEND_ALTERNATION = "sábado|sabado|domingo"
+_WORKDAY_ALTERNATION = "|".join(day for day in WEEKDAYS if day not in _WEEKEND_ALTERNATION.split("|"))
+# Depois de "na segunda" sem "-feira", só aceita o fim da frase ou um horário ("à noite", "às 10h", "que vem")
+_WEEKDAY_CONTEXT = (
+    r"(?=[ \t]*(?:$|[.,;:!?)\n]"
+    r"|(?:de\s+manh[ãa]|[àa]\s+tarde|[àa]\s+noite|que\s+vem)\b|[àa]s?\s+\d))"
+)
+
+# Todas as formas de data em uma única expressão (uma passada pela mensagem em minúsculas):
+# DD/MM, DD/MM/AA e DD/MM/AAAA; "10 de janeiro", "10 jan 2024" e "1º de maio de 2025";
+# "hoje", "amanhã", "depois de amanhã", "daqui a 3 dias", "próxima sexta" e "sexta que vem"
+DATE_EXPRESSION = re.compile(
+    # A verificação do primeiro caractere descarta logo as palavras que não podem começar uma data
+    r"\b(?=[\dadhnpqst])(?:"
+    r"(?P<day>\d{1,2})(?:"
+    r"/(?P<month>\d{1,2})(?:/(?P<year>\d{4}|\d{2}))?\b"
+    rf"|(?:º|o)?\s+(?:de\s+)?(?P<month_name>{_MONTH_ALTERNATION})\b\.?(?:\s+(?:de\s+)?(?P<month_name_year>\d{{4}})\b)?"
+    r")"
+    r"|(?:"
+    r"(?P<after_tomorrow>depois\s+de\s+amanhã|depois\s+de\s+amanha)"
+    r"|(?P<tomorrow>amanhã|amanha)"
+    r"|(?P<today>hoje)"
+    r"|daqui\s+a\s+(?P<amount>\d{1,3}|uma?|dois|duas|três|tres)\s+(?P<unit>dias?|semanas?)"
+    rf"|(?:próxim[oa]|proxim[oa])\s+(?P<next_weekday>{_WEEKDAY_ALTERNATION})(?:-feira)?"
+    rf"|n[oa]\s+(?:(?P<on_weekend>{_WEEKEND_ALTERNATION})|(?P<on_weekday>{_WORKDAY_ALTERNATION})(?:-feira|{_WEEKDAY_CONTEXT}))"
+    rf"|(?P<weekday_ahead>{_WEEKDAY_ALTERNATION})(?:-feira)?\s+que\s+vem"
+    r")\b"
+    r")"
+)
+
+# Palavras de ligação no início de uma informação ("do João", "com o cliente")
+LEADING_CONNECTORS = re.compile(r"^(?:(?:do|da|de|dos|das|com|o|a|os|as)\b[\s,:]*)+", re.IGNORECASE)
+
+# Palavras de ligação no fim do nome do evento, antes da data ("aniversário do João é [10/05]")
+TRAILING_CONNECTORS = re.compile(
+    r"(?:(?:^|[\s,:\-]+)(?:é|e|em|no|na|dia|será|sera|vai ser|para|pra|marcad[oa]|agendad[oa]))*[\s,:\-]*$",
+    re.IGNORECASE
+)
+
+_EVENT_KEYWORD_PATTERN = re.compile("|".join(re.escape(keyword) for keyword in EVENT_KEYWORDS))
+
+# Tamanho máximo do nome do evento (texto após a palavra-chave)
+MAX_EVENT_NAME = 50
+
+
+class DateMatch(NamedTuple):
+    """Data encontrada em uma mensagem
+
+    `year` é None para datas sem ano (recorrentes); datas relativas
+    ("amanhã", "próxima sexta") sempre têm ano e `relative` verdadeiro.
+    """
+    day: int
+    month: int
+    year: Optional[int]
+    start: int
+    end: int
+    relative: bool = False
+
+    @property
+    def date_str(self) -> str:
+        """Data no formato aceito por TimeHandler.add_special_date (DD/MM ou DD/MM/AAAA)"""
+        if self.year is None:
+            return f"{self.day}/{self.month}"
+        return f"{self.day}/{self.month}/{self.year}"
+
+
+def _valid(day: int, month: int) -> bool:
+    """Dia e mês possíveis em algum ano (29/02 vale; 31/02 não)"""
+    return 1 <= month <= 12 and 1 <= day <= _DAYS_IN_MONTH[month - 1]
+
+
+def _full_year(year: str, today: date) -> int:
+    """Converte anos com dois dígitos para quatro (até 10 anos à frente; senão, no século passado)"""
+    value = int(year)
+    if len(year) == 4:
+        return value
+    century = today.year - today.year % 100
+    return century + value if century + value <= today.year + 10 else century - 100 + value
+
+
+def _relative(match, today: date) -> date:
+    """Data de uma expressão relativa ("amanhã", "daqui a 3 dias", "próxima sexta")"""
+    if match.group("today"):
+        return today
+    if match.group("tomorrow"):
+        return today + timedelta(days=1)
+    if match.group("after_tomorrow"):
+        return today + timedelta(days=2)
+    if match.group("amount"):
+        amount = match.group("amount")
+        amount = _NUMBER_WORDS[amount] if amount in _NUMBER_WORDS else int(amount)
+        return today + timedelta(days=amount * 7 if match.group("unit").startswith("semana") else amount)
+    # Próxima ocorrência do dia da semana (na sexta-feira, "próxima sexta" é a da semana seguinte)
+    weekday = WEEKDAYS[
+        match.group("next_weekday") or match.group("on_weekend") or match.group("on_weekday")
+        or match.group("weekday_ahead")
+    ]
+    return today + timedelta(days=(weekday - today.weekday() - 1) % 7 + 1)
+
+
+def extract_date(text: str, today: date) -> Optional[DateMatch]:
+    """Primeira data de uma mensagem: DD/MM[/AAAA], depois "10 de janeiro [de 2024]", depois datas relativas
+
+    Args:
+        text: Mensagem do usuário
+        today: Data de referência para as datas relativas e anos com dois dígitos
+    """
+    textual = relative = None
+    for match in DATE_EXPRESSION.finditer(text.lower()):
+        day, month, year, month_name, month_name_year = match.group(
+            "day", "month", "year", "month_name", "month_name_year"
+        )
+        if month:
+            day, month = int(day), int(month)
+            if _valid(day, month):
+                return DateMatch(day, month, _full_year(year, today) if year else None, match.start(), match.end())
+        elif month_name:
+            day, month = int(day), MONTHS[month_name]
+            if textual is None and _valid(day, month):
+                textual = DateMatch(day, month, int(month_name_year) if month_name_year else None, match.start(), match.end())
+        elif relative is None:
+            target = _relative(match, today)
+            relative = DateMatch(target.day, target.month, target.year, match.start(), match.end(), relative=True)
+    return textual or relative
+
+
+def extract_dates(texts: Iterable[str], today: date) -> List[Optional[DateMatch]]:
+    """Extrai a primeira data de cada mensagem (None quando não houver), com a mesma data de referência"""
+    return [extract_date(text, today) for text in texts]
+
+
+def strip_leading_connectors(text: str) -> str:
+    """Remove palavras de ligação ("do", "da", "com"...) do início do texto"""
+    return LEADING_CONNECTORS.sub("", text.strip()).strip()
+
+
+def extract_event_name(text: str, found: Optional[DateMatch] = None) -> str:
+    """Nome do evento: a palavra-chave seguida do que vem depois dela (até a data, se ela vier depois)
+
+    Ex: "o aniversário do João é 10/05" -> "aniversário João". Sem texto
+    depois da palavra-chave, usa só a palavra-chave; sem palavra-chave,
+    "Evento".
+    """
+    match = _EVENT_KEYWORD_PATTERN.search(text.lower())
+    if match is None:
+        return "Evento"
+
+    keyword = match.group(0)
+    end = len(text)
+    if found is not None and found.start >= match.end():
+        end = found.start
+    after_keyword = strip_leading_connectors(text[match.end():end])
+    after_keyword = TRAILING_CONNECTORS.sub("", after_keyword).strip()
+
+    if after_keyword and len(after_keyword) < MAX_EVENT_NAME:
+        return f"{keyword} {after_keyword}"
+    return keyword.capitalize()
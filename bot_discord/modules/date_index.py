@@ -0,0 +1,136 @@
+# date_index.py
+# Índice ordenado das próximas ocorrências das datas especiais
+
+import bisect
+import calendar
+import logging
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+
+
+def safe_date(year: int, month: int, day: int) -> date:
+    """Cria uma data ajustando o dia ao tamanho do mês (29/02 vira 28/02 em anos não bissextos)"""
+    return date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+
+def next_occurrence(date_info: Dict, today: date) -> Optional[date]:
+    """Próxima ocorrência (hoje ou depois) de uma data especial, ou None se ela já passou
+
+    Datas com ano e sem recorrência ocorrem uma única vez; as demais se
+    repetem todo ano.
+    """
+    day, month, year = date_info["day"], date_info["month"], date_info.get("year")
+    if year and not date_info.get("recurring", True):
+        target = safe_date(year, month, day)
+        return target if target >= today else None
+
+    target = safe_date(today.year, month, day)
+    if target < today:
+        target = safe_date(today.year + 1, month, day)
+    return target
+
+
+class SpecialDateIndex:
+    """Datas especiais ordenadas pela próxima ocorrência
+
+    Mantém uma lista ordenada de (ordinal da data, id). Inserções e
+    remoções usam busca binária; as próximas k datas são os k primeiros
+    itens. Quando o dia muda, só as datas que passaram saem do início da
+    lista e voltam na próxima ocorrência.
+    """
+
+    def __init__(self):
+        self._entries: List[Tuple[int, str]] = []
+        self._ordinals: Dict[str, int] = {}
+        self._rolled_until: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def rebuild(self, special_dates: Dict[str, Dict], today: date) -> None:
+        """Reconstrói o índice a partir de todas as datas especiais"""
+        self._entries = []
+        self._ordinals = {}
+        for date_id, date_info in special_dates.items():
+            target = self._next(date_id, date_info, today)
+            if target is not None:
+                self._entries.append((target, date_id))
+                self._ordinals[date_id] = target
+        self._entries.sort()
+        self._rolled_until = today.toordinal()
+
+    @staticmethod
+    def _next(date_id: str, date_info: Dict, today: date) -> Optional[int]:
+        try:
+            target = next_occurrence(date_info, today)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Data especial inválida ignorada ({date_id}): {e}")
+            return None
+        return None if target is None else target.toordinal()
+
+    def add(self, date_id: str, date_info: Dict, today: date) -> None:
+        """Insere (ou atualiza) uma data especial"""
+        self.remove(date_id)
+        target = self._next(date_id, date_info, today)
+        if target is not None:
+            bisect.insort(self._entries, (target, date_id))
+            self._ordinals[date_id] = target
+
+    def remove(self, date_id: str) -> None:
+        """Remove uma data especial do índice"""
+        target = self._ordinals.pop(date_id, None)
+        if target is None:
+            return
+        position = bisect.bisect_left(self._entries, (target, date_id))
+        if position < len(self._entries) and self._entries[position] == (target, date_id):
+            del self._entries[position]
+
+    def roll_forward(self, special_dates: Dict[str, Dict], today: date) -> int:
+        """Move as datas que já passaram para a próxima ocorrência (chamado quando o dia muda)
+
+        Returns:
+            Número de datas movidas ou removidas
+        """
+        ordinal = today.toordinal()
+        if self._rolled_until is not None and ordinal <= self._rolled_until:
+            return 0
+        self._rolled_until = ordinal
+
+        cut = bisect.bisect_left(self._entries, (ordinal, ""))
+        if not cut:
+            return 0
+        passed = self._entries[:cut]
+        del self._entries[:cut]
+        for _, date_id in passed:
+            del self._ordinals[date_id]
+            date_info = special_dates.get(date_id)
+            if date_info is not None:
+                self.add(date_id, date_info, today)
+        return len(passed)
+
+    def upcoming(self, today: date, limit: int,
+                 accept: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, date]]:
+        """As próximas `limit` datas a partir de hoje, como (id, data)
+
+        Com `accept`, só as datas cujo id ele aceita (ex: as de um servidor).
+        """
+        ordinal = today.toordinal()
+        start = bisect.bisect_left(self._entries, (ordinal, ""))
+        if accept is None:
+            return [
+                (date_id, date.fromordinal(target))
+                for target, date_id in self._entries[start:start + limit]
+            ]
+
+        found = []
+        entries = self._entries
+        for position in range(start, len(entries)):
+            target, date_id = entries[position]
+            if accept(date_id):
+                found.append((date_id, date.fromordinal(target)))
+                if len(found) == limit:
+                    break
+        return found
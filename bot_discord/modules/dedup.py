@@ -0,0 +1,170 @@
+# dedup.py
+# Detecção de informações repetidas ou quase repetidas na memória de longo prazo (MinHash + LSH)
+
+import re
+import zlib
+import random
+import logging
+import unicodedata
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+
+# Similaridade (Jaccard estimada) a partir da qual duas informações são consideradas a mesma
+DEFAULT_THRESHOLD = 0.7
+
+# Tamanho dos trechos de caracteres comparados
+SHINGLE_SIZE = 4
+
+# Assinatura MinHash: BANDS faixas de ROWS valores (o LSH compara faixa a faixa)
+BANDS = 16
+ROWS = 4
+NUM_PERM = BANDS * ROWS
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Coeficientes fixos das permutações (as assinaturas precisam ser estáveis entre execuções)
+_rng = random.Random(1009)
+_PERMUTATIONS = tuple(
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+)
+
+# Palavras de ligação que não mudam o sentido da informação
+_FILLER_WORDS = frozenset((
+    "que", "de", "do", "da", "dos", "das", "o", "a", "os", "as", "e", "eu", "meu", "minha", "um", "uma"
+))
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    """Normaliza uma informação: minúsculas, sem acentos, pontuação nem palavras de ligação"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    words = _SPACES.split(_NON_WORD.sub(" ", text).strip())
+    return " ".join(word for word in words if word and word not in _FILLER_WORDS)
+
+
+def shingles(normalized: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    """Trechos de `size` caracteres do texto normalizado, como hashes de 32 bits"""
+    if len(normalized) <= size:
+        return {zlib.crc32(normalized.encode("utf-8"))}
+    return {
+        zlib.crc32(normalized[i:i + size].encode("utf-8"))
+        for i in range(len(normalized) - size + 1)
+    }
+
+
+def minhash(hashes: Iterable[int]) -> Tuple[int, ...]:
+    """Assinatura MinHash de um conjunto de hashes"""
+    hashes = tuple(hashes)
+    if not hashes:
+        return (_MAX_HASH,) * NUM_PERM
+    return tuple(
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def similarity(signature_a: Tuple[int, ...], signature_b: Tuple[int, ...]) -> float:
+    """Similaridade de Jaccard estimada a partir de duas assinaturas"""
+    return sum(1 for a, b in zip(signature_a, signature_b) if a == b) / NUM_PERM
+
+
+def signature(text: str) -> Tuple[int, ...]:
+    """Assinatura MinHash de uma informação"""
+    return minhash(shingles(normalize(text)))
+
+
+class MemoryDeduplicator:
+    """Índice LSH das informações da memória de longo prazo
+
+    Cada informação é indexada dentro de um escopo (dono e servidor): só
+    informações do mesmo escopo são comparadas. A busca olha apenas os
+    baldes das faixas da assinatura, sem percorrer todas as informações.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self._signatures: Dict[str, Tuple[Hashable, Tuple[int, ...]]] = {}
+        self._buckets: Dict[Tuple[Hashable, int, Tuple[int, ...]], Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    @staticmethod
+    def _bands(sig: Tuple[int, ...]):
+        for band in range(BANDS):
+            yield band, sig[band * ROWS:(band + 1) * ROWS]
+
+    def add(self, key: str, text: str, scope: Hashable = None, sig: Optional[Tuple[int, ...]] = None) -> None:
+        """Indexa uma informação (substitui a anterior com a mesma chave)"""
+        self.remove(key)
+        sig = sig or signature(text)
+        self._signatures[key] = (scope, sig)
+        for band, rows in self._bands(sig):
+            self._buckets.setdefault((scope, band, rows), set()).add(key)
+
+    def remove(self, key: str) -> None:
+        """Remove uma informação do índice"""
+        entry = self._signatures.pop(key, None)
+        if entry is None:
+            return
+        scope, sig = entry
+        for band, rows in self._bands(sig):
+            bucket = self._buckets.get((scope, band, rows))
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[(scope, band, rows)]
+
+    def clear(self) -> None:
+        self._signatures.clear()
+        self._buckets.clear()
+
+    def find_similar(self, text: str, scope: Hashable = None,
+                     sig: Optional[Tuple[int, ...]] = None) -> List[Tuple[str, float]]:
+        """Informações do escopo parecidas com o texto, da mais parecida para a menos"""
+        sig = sig or signature(text)
+        candidates: Set[str] = set()
+        for band, rows in self._bands(sig):
+            candidates.update(self._buckets.get((scope, band, rows), ()))
+
+        matches = []
+        for key in candidates:
+            score = similarity(sig, self._signatures[key][1])
+            if score >= self.threshold:
+                matches.append((key, score))
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches
+
+
+def find_duplicate_groups(entries: Iterable[Tuple[str, str, Hashable, str]],
+                          threshold: float = DEFAULT_THRESHOLD) -> List[List[str]]:
+    """Agrupa informações quase repetidas (usado pela compactação)
+
+    Args:
+        entries: (chave, texto, escopo, timestamp) de cada informação
+        threshold: Similaridade mínima
+
+    Returns:
+        Grupos com duas ou mais chaves, da informação mais recente para a mais antiga
+    """
+    entries = sorted(entries, key=lambda entry: (entry[3], entry[0]), reverse=True)
+    index = MemoryDeduplicator(threshold)
+    groups: Dict[str, List[str]] = {}
+
+    # A mais recente de cada grupo é indexada primeiro e as mais antigas se juntam a ela
+    for key, text, scope, _ in entries:
+        sig = signature(text)
+        matches = index.find_similar(text, scope, sig)
+        if matches:
+            groups[matches[0][0]].append(key)
+        else:
+            index.add(key, text, scope, sig)
+            groups[key] = [key]
+
+    return [group for group in groups.values() if len(group) > 1]
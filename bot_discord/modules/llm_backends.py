@@ -0,0 +1,288 @@
+# llm_backends.py
+# Pool de servidores LM Studio / compatíveis com a API da OpenAI
+
+import time
+import random
+import asyncio
+import logging
+from collections import OrderedDict
+
+import aiohttp
+
+from core import serialization
+from core.metrics import metrics
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+
+# Estados possíveis de um backend de IA
+BACKEND_UNKNOWN = "unknown"    # Ainda não verificado
+BACKEND_OK = "ok"              # Servidor respondendo e modelo carregado
+BACKEND_WARMING = "warming"    # Modelo sendo carregado (aquecimento em andamento)
+BACKEND_DEGRADED = "degraded"  # Servidor respondendo, mas o modelo não está carregado
+BACKEND_OFFLINE = "offline"    # Servidor inacessível
+
+
+class BackendUnavailableError(Exception):
+    """Nenhum backend conseguiu atender a requisição"""
+
+
+class BackendResponseError(Exception):
+    """O backend respondeu com um status de erro"""
+
+    def __init__(self, status, text):
+        super().__init__(f"{status} - {text}")
+        self.status = status
+        self.text = text
+
+
+class BackendRequestError(BackendResponseError):
+    """O backend recusou a requisição (4xx, ex: contexto longo demais): o erro é da requisição, não do servidor"""
+
+
+# Status 4xx que indicam um servidor sobrecarregado, e não uma requisição inválida
+_RETRYABLE_CLIENT_STATUSES = (408, 429)
+
+
+def _response_error(status, text):
+    """Erro da requisição (4xx) ou do servidor (5xx e os 4xx de sobrecarga)"""
+    if 400 <= status < 500 and status not in _RETRYABLE_CLIENT_STATUSES:
+        return BackendRequestError(status, text)
+    return BackendResponseError(status, text)
+
+
+class LLMBackend:
+    """Um servidor de IA com limite de requisições simultâneas e estado de saúde"""
+
+    def __init__(self, url, max_concurrency=1):
+        self.url = url.rstrip('/')
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.outstanding = 0
+        self.status = BACKEND_UNKNOWN
+        self.model_ids = []
+        self.last_activity = 0.0  # Momento (monotônico) da última resposta bem-sucedida
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    @property
+    def available(self):
+        """Indica se o backend pode receber mais uma requisição agora"""
+        return self.outstanding < self.max_concurrency and time.monotonic() >= self.cooldown_until
+
+    @property
+    def healthy(self):
+        """Indica se o backend está (ou pode estar) pronto para responder"""
+        return self.status in (BACKEND_OK, BACKEND_UNKNOWN)
+
+    def set_status(self, status):
+        """Atualiza o estado do backend, registrando mudanças no log"""
+        if status != self.status:
+            logger.info(f"Estado do backend {self.url}: {self.status} -> {status}")
+            self.status = status
+
+    def record_success(self):
+        """Registra uma resposta bem-sucedida"""
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.last_activity = time.monotonic()
+        self.set_status(BACKEND_OK)
+
+    def record_failure(self, status):
+        """Registra uma falha e afasta o backend temporariamente (backoff exponencial até 60 s)"""
+        self.consecutive_failures += 1
+        self.cooldown_until = time.monotonic() + min(60, 2 ** (self.consecutive_failures - 1))
+        self.set_status(status)
+
+    def __repr__(self):
+        return f"LLMBackend({self.url}, status={self.status}, outstanding={self.outstanding})"
+
+
+class BackendPool:
+    """Distribui requisições entre vários backends
+
+    O roteamento escolhe o backend saudável com menos requisições em
+    andamento, respeitando o limite de concorrência de cada um. Um canal
+    continua no mesmo backend enquanto ele estiver disponível (aproveitando
+    o cache de prompt do servidor) e, em caso de erro ou timeout, a
+    requisição é repetida no próximo backend.
+    
+    Requisições de baixa prioridade (tarefas de fundo, como resumos) só
+    usam backends ociosos e cedem a vez a qualquer requisição normal que
+    esteja aguardando.
+    """
+
+    def __init__(self, urls, max_concurrency=1, sticky_limit=1000):
+        self.backends = [LLMBackend(url, max_concurrency) for url in urls]
+        if not self.backends:
+            raise ValueError("É necessário pelo menos um backend de IA")
+
+        # Canal -> backend usado por último (LRU limitado)
+        self.sticky_limit = sticky_limit
+        self._sticky = OrderedDict()
+        self._session = None
+        self._released = None
+        # Requisições normais aguardando um backend, na ordem de chegada (bloqueiam as de baixa prioridade)
+        self._waiters = []
+
+    def _get_session(self):
+        """Retorna a sessão HTTP compartilhada (reaproveita conexões entre requisições)"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers={"Content-Type": "application/json"},
+                json_serialize=serialization.dumps_str
+            )
+        return self._session
+
+    async def close(self):
+        """Fecha a sessão HTTP compartilhada"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def aggregate_status(self):
+        """Estado consolidado do pool: o melhor estado entre os backends"""
+        for status in (BACKEND_OK, BACKEND_UNKNOWN, BACKEND_WARMING, BACKEND_DEGRADED):
+            if any(backend.status == status for backend in self.backends):
+                return status
+        return BACKEND_OFFLINE
+
+    def select(self, sticky_key=None, exclude=(), low_priority=False):
+        """Escolhe um backend disponível ou retorna None se todos estiverem ocupados"""
+        if low_priority and self._waiters:
+            return None
+        candidates = [b for b in self.backends if b not in exclude and b.available]
+        if low_priority:
+            candidates = [b for b in candidates if b.outstanding == 0]
+        if not candidates:
+            return None
+
+        # Prefere backends saudáveis; se nenhum estiver, tenta os demais
+        healthy = [b for b in candidates if b.healthy]
+        if healthy:
+            candidates = healthy
+
+        if sticky_key is not None:
+            sticky = self._sticky.get(sticky_key)
+            if sticky in candidates:
+                self._sticky.move_to_end(sticky_key)
+                return sticky
+
+        least = min(b.outstanding for b in candidates)
+        backend = random.choice([b for b in candidates if b.outstanding == least])
+
+        if sticky_key is not None:
+            self._sticky[sticky_key] = backend
+            self._sticky.move_to_end(sticky_key)
+            if len(self._sticky) > self.sticky_limit:
+                self._sticky.popitem(last=False)
+        return backend
+
+    async def acquire(self, sticky_key=None, exclude=(), low_priority=False, progress=None):
+        """Reserva um backend, aguardando se todos estiverem no limite de concorrência
+
+        Args:
+            progress: Objeto opcional avisado da espera, com `queued(posição)` e `started()`
+        """
+        if self._released is None:
+            self._released = asyncio.Condition()
+
+        waited = False
+        waiter = object()
+        position = None
+        try:
+            while True:
+                backend = self.select(sticky_key, exclude, low_priority)
+                if backend is not None:
+                    backend.outstanding += 1
+                    if progress is not None:
+                        progress.started()
+                    return backend
+
+                remaining = [b for b in self.backends if b not in exclude]
+                if not remaining:
+                    return None
+
+                # Todos ocupados ou em espera após falhas: aguarda uma liberação (ou o fim do cooldown)
+                if not waited:
+                    metrics.incr("llm.pool.waits")
+                    waited = True
+                    if not low_priority:
+                        self._waiters.append(waiter)
+                if progress is not None and not low_priority:
+                    # Posição entre as requisições que esperam (avisada só quando muda)
+                    current = self._waiters.index(waiter) + 1
+                    if current != position:
+                        position = current
+                        progress.queued(position)
+                async with self._released:
+                    try:
+                        await asyncio.wait_for(self._released.wait(), timeout=1)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            if waited and not low_priority:
+                self._waiters.remove(waiter)
+
+    async def release(self, backend):
+        """Libera a reserva de um backend e acorda quem estiver esperando"""
+        backend.outstanding -= 1
+        async with self._released:
+            self._released.notify_all()
+
+    async def post_to(self, backend, path, payload, timeout):
+        """Envia uma requisição POST a um backend específico e retorna o JSON da resposta"""
+        session = self._get_session()
+        async with session.post(f"{backend.url}{path}", json=payload, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            if response.status != 200:
+                raise _response_error(response.status, await response.text())
+            return serialization.loads(await response.read())
+
+    async def get_from(self, backend, path, timeout):
+        """Envia uma requisição GET a um backend específico e retorna o JSON da resposta"""
+        session = self._get_session()
+        async with session.get(f"{backend.url}{path}", timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            if response.status != 200:
+                raise _response_error(response.status, await response.text())
+            return serialization.loads(await response.read())
+
+    async def post(self, path, payload, sticky_key=None, timeout=30, low_priority=False, progress=None):
+        """Envia uma requisição ao melhor backend, com failover para os demais em caso de erro"""
+        tried = []
+        last_error = None
+
+        while len(tried) < len(self.backends):
+            backend = await self.acquire(sticky_key, exclude=tried, low_priority=low_priority, progress=progress)
+            if backend is None:
+                break
+            tried.append(backend)
+
+            start = time.perf_counter()
+            try:
+                result = await self.post_to(backend, path, payload, timeout)
+                backend.record_success()
+                metrics.observe(f"llm.backend.{backend.url}", time.perf_counter() - start)
+                return result
+            except asyncio.TimeoutError as e:
+                logger.warning(f"Timeout no backend {backend.url} após {timeout} segundos")
+                backend.record_failure(BACKEND_DEGRADED)
+                last_error = e
+            except BackendRequestError as e:
+                # A requisição é inválida: outro backend a recusaria também, e este continua saudável
+                logger.warning(f"Requisição recusada pelo backend {backend.url}: {e}")
+                metrics.incr("llm.pool.request_errors")
+                raise
+            except BackendResponseError as e:
+                logger.warning(f"Erro no backend {backend.url}: {e}")
+                backend.record_failure(BACKEND_DEGRADED)
+                last_error = e
+            except aiohttp.ClientError as e:
+                logger.warning(f"Backend {backend.url} inacessível: {e}")
+                backend.record_failure(BACKEND_OFFLINE)
+                last_error = e
+            finally:
+                await self.release(backend)
+
+            metrics.incr("llm.pool.failovers")
+
+        if isinstance(last_error, asyncio.TimeoutError):
+            raise last_error
+        raise BackendUnavailableError(f"Nenhum backend disponível: {last_error}")
@@ -1,8 +1,13 @@
 # memory.py
 # Sistema de memória e persistência
 
-import json
+from core import database, persistence, serialization, storage
+from core.metrics import metrics
+from modules.dedup import DEFAULT_THRESHOLD, MemoryDeduplicator, find_duplicate_groups
 import os
+import sys
+import time
+import asyncio
 import logging
 from datetime import datetime
 from collections import deque
@@ -10,6 +15,148 @@ from collections import deque
 # Configuração do logger
 logger = logging.getLogger(__name__)
 
+# Partição usada quando a mensagem não pertence a um canal específico
+DEFAULT_PARTITION = "global"
+
+# Tipos de registro na memória
+KIND_MESSAGE = "message"  # Mensagem da conversa (memória de curto prazo)
+KIND_MEMORY = "memory"    # Informação da memória de longo prazo
+KIND_SUMMARY = "summary"  # Resumo das mensagens antigas de uma partição
+
+# Chaves fora da deduplicação aproximada: datas especiais diferem só pela data ("... na data 5/4" x
+# "... na data 12/4") e seriam tratadas como repetidas; a repetição exata já é tratada pelo TimeHandler
+DEDUP_EXEMPT_KEYS = ("personality",)
+DEDUP_EXEMPT_PREFIXES = ("date_event_",)
+
+
+def _dedup_exempt(key):
+    """Se a informação fica fora da deduplicação (nunca substitui nem é substituída por parecidas)"""
+    return key in DEDUP_EXEMPT_KEYS or key.startswith(DEDUP_EXEMPT_PREFIXES)
+
+
+def _to_epoch(timestamp):
+    """Converte um timestamp salvo (ISO ou número) em segundos desde a época"""
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _from_db_id(value):
+    """IDs do Discord são gravados como texto no SQLite; volta para int quando possível"""
+    return int(value) if isinstance(value, str) and value.isdigit() else value
+
+
+class MemoryRecord:
+    """Registro compacto de uma mensagem (ou memória) com acesso compatível com o antigo dict
+    
+    Usa __slots__, timestamp em segundos desde a época e nomes de usuário
+    internados, ocupando bem menos memória que um dict por mensagem.
+    Consumidores antigos continuam usando `record.get("content")`.
+    """
+    
+    __slots__ = ("user_id", "username", "content", "timestamp", "is_bot", "kind")
+    
+    def __init__(self, user_id, username, content, timestamp=None, is_bot=False, kind=KIND_MESSAGE):
+        self.user_id = user_id
+        self.username = sys.intern(username) if isinstance(username, str) else username
+        self.content = content
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.is_bot = is_bot
+        self.kind = kind
+    
+    @property
+    def is_memory(self):
+        return self.kind == KIND_MEMORY
+    
+    @property
+    def is_summary(self):
+        return self.kind == KIND_SUMMARY
+    
+    def get(self, key, default=None):
+        """Acesso no estilo dict (compatível com o formato antigo das mensagens)"""
+        if key == "timestamp":
+            return datetime.fromtimestamp(self.timestamp).isoformat()
+        if key in ("is_memory", "is_summary"):
+            return getattr(self, key)
+        if key in self.__slots__:
+            return getattr(self, key)
+        return default
+    
+    def __getitem__(self, key):
+        if key not in self.__slots__ and key not in ("is_memory", "is_summary"):
+            raise KeyError(key)
+        return self.get(key)
+    
+    def to_dict(self):
+        """Converte no formato salvo em disco"""
+        return {
+            "user_id": self.user_id,
+            "username": self.username,
+            "content": self.content,
+            "timestamp": datetime.fromtimestamp(self.timestamp).isoformat(),
+            "is_bot": self.is_bot
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Cria um registro a partir do formato salvo em disco"""
+        return cls(
+            data.get("user_id"),
+            data.get("username", ""),
+            data.get("content", ""),
+            _to_epoch(data.get("timestamp")),
+            data.get("is_bot", False)
+        )
+    
+    def __repr__(self):
+        return f"MemoryRecord({self.kind}, {self.username}: {self.content[:30]!r})"
+
+class LLMContext:
+    """Contexto de uma conversa já no formato de mensagens da API (role/content)
+    
+    `history` é compartilhado com o cache da Memory: os dicts não devem ser
+    alterados por quem monta o payload.
+    """
+    
+    __slots__ = ("memories", "summary", "history")
+    
+    def __init__(self, memories=(), summary=None, history=()):
+        self.memories = memories  # Registros da memória de longo prazo, em ordem determinística
+        self.summary = summary    # Resumo das mensagens antigas (ou None)
+        self.history = history    # Mensagens recentes como {"role", "content"}
+    
+    @classmethod
+    def from_records(cls, context):
+        """Converte uma lista (ou iterador) de registros/dicts de memória em um LLMContext"""
+        if isinstance(context, cls):
+            return context
+        
+        memories = []
+        summaries = []
+        history = []
+        for msg in context or ():
+            if msg.get("is_memory", False):
+                memories.append(msg)
+            elif msg.get("is_summary", False):
+                summaries.append(msg.get("content", ""))
+            else:
+                history.append(_to_llm_message(msg))
+        
+        memories.sort(key=lambda msg: (msg.get("timestamp", ""), msg.get("content", "")))
+        return cls(memories, "\n".join(summaries) or None, history)
+
+
+def _to_llm_message(msg):
+    """Converte uma mensagem da memória no formato da API"""
+    return {
+        "role": "assistant" if msg.get("is_bot", False) else "user",
+        "content": msg.get("content", "")
+    }
+
+
 class Memory:
     def __init__(self, config):
         self.config = config
@@ -23,127 +170,505 @@ class Memory:
             'memory.json'
         )
         
-        # Inicializa a memória de curto prazo (últimas mensagens)
-        self.short_term = deque(maxlen=self.memory_limit)
+        # Memória de curto prazo particionada por canal (últimas mensagens de cada conversa)
+        self.partitions = {}
+        
+        # Partição padrão, mantida como `short_term` por compatibilidade
+        self.short_term = self._get_partition(DEFAULT_PARTITION)
+        
+        # Resumo das mensagens antigas de cada partição (gerado pelo ConversationSummarizer)
+        self.summaries = {}
+        
+        # Registros da memória de longo prazo por dono (None = compartilhados), reconstruídos apenas quando mudam
+        self._long_term_records = {}
+        
+        # Dono (ID do usuário ou None) -> chaves da memória de longo prazo
+        self._long_term_index = {}
+        
+        # Índice LSH para detectar informações quase repetidas (construído no primeiro uso)
+        self._dedup = None
+        
+        # Partição -> mensagens já no formato da API, mantidas junto com a deque
+        self._llm_history = {}
         
         # Inicializa a memória de longo prazo (informações permanentes)
         self.long_term = {}
         
+        # Servidor de cada partição (usado pelos índices do SQLite)
+        self._partition_guilds = {}
+        
+        # Banco SQLite, se configurado (storage_engine = sqlite); senão, memory.json
+        self.db = database.get_database(config) if self.persistence_enabled else None
+        
         # Carrega memória persistente se habilitado
         if self.persistence_enabled:
             self.load_memory()
+            if self.db is None:
+                # O memory.json é regravado em segundo plano, não a cada mensagem
+                persistence.scheduler.register("memory", self._snapshot_memory, self._write_memory)
     
-    def add_message(self, user_id, username, message, is_bot=False):
-        """Adiciona uma mensagem à memória de curto prazo"""
-        message_data = {
-            "user_id": user_id,
-            "username": username,
-            "content": message,
-            "timestamp": datetime.now().isoformat(),
-            "is_bot": is_bot
-        }
+    @staticmethod
+    def partition_key(channel_id=None):
+        """Converte o ID de um canal (ou uma chave já convertida) na chave da partição correspondente"""
+        return DEFAULT_PARTITION if channel_id is None else str(channel_id)
+    
+    def _get_partition(self, partition=None):
+        """Retorna a deque de uma partição, criando-a se necessário"""
+        key = self.partition_key(partition)
+        messages = self.partitions.get(key)
+        if messages is None:
+            messages = deque(maxlen=self.memory_limit)
+            self.partitions[key] = messages
+        return messages
+    
+    def _persist(self, *statements):
+        """Persiste uma alteração: as instruções informadas no SQLite ou marca o memory.json para gravação"""
+        if not self.persistence_enabled:
+            return
+        if self.db is None:
+            persistence.scheduler.mark_dirty("memory")
+            return
+        for sql, params in statements:
+            self.db.execute(sql, params)
+    
+    def add_message(self, user_id, username, message, is_bot=False, partition=None, guild_id=None):
+        """Adiciona uma mensagem à memória de curto prazo da partição (canal) informada"""
+        key = self.partition_key(partition)
+        record = MemoryRecord(user_id, username, message, is_bot=is_bot)
+        messages = self._get_partition(key)
+        # Com a deque cheia, a mensagem mais antiga sai dela e também do banco
+        full = len(messages) == messages.maxlen
+        messages.append(record)
+        if guild_id is not None and self._partition_guilds.get(key) != guild_id:
+            self._partition_guilds[key] = guild_id
+            # Mensagens migradas sem o servidor passam a pertencer ao canal dele
+            self._persist((database.UPDATE_CHANNEL_GUILD, (guild_id, key)))
         
-        self.short_term.append(message_data)
+        # Acrescenta ao cache de mensagens da API (a deque de mesmo tamanho descarta a mais antiga junto)
+        history = self._llm_history.get(key)
+        if history is not None:
+            history.append(_to_llm_message(record))
         
         # Salva a memória se a persistência estiver habilitada
-        if self.persistence_enabled:
-            self.save_memory()
+        guild = self._partition_guilds.get(key)
+        statements = [(database.INSERT_MESSAGE, (
+            guild, key, str(user_id), record.username, message, record.timestamp, int(bool(is_bot))
+        ))]
+        if full:
+            statements.append((database.DELETE_MESSAGES_BEYOND_LIMIT, (guild, key, guild, key, self.memory_limit - 1)))
+        self._persist(*statements)
         
         return True
     
-    def get_recent_messages(self, limit=None):
+    def get_recent_messages(self, limit=None, partition=None):
         """Retorna as mensagens mais recentes da memória de curto prazo"""
-        if limit is None or limit > len(self.short_term):
-            limit = len(self.short_term)
+        short_term = self._get_partition(partition)
+        if limit is None or limit > len(short_term):
+            limit = len(short_term)
+        
+        return list(short_term)[-limit:]
+    
+    def get_short_term_memory(self, partition=None):
+        """Retorna toda a memória de curto prazo de uma partição"""
+        return list(self._get_partition(partition))
         
-        return list(self.short_term)[-limit:]
+    def _index_long_term(self):
+        """Reconstrói o índice por dono da memória de longo prazo (após carregar ou limpar)"""
+        self._long_term_index = {}
+        for key, info in self.long_term.items():
+            self._long_term_index.setdefault(info.get("user_id"), set()).add(key)
+        self._long_term_records = {}
+        self._dedup = None
     
-    def get_short_term_memory(self):
-        """Retorna toda a memória de curto prazo"""
-        return list(self.short_term)
+    def _get_owner_records(self, user_id):
+        """Registros (servidor, registro) de um dono, em cache até a próxima alteração dele"""
+        records = self._long_term_records.get(user_id)
+        if records is None:
+            records = []
+            for key in self._long_term_index.get(user_id, ()):
+                info = self.long_term[key]
+                records.append((info.get("guild_id"), MemoryRecord(
+                    "system", "system", f"Informação importante: {info['value']}",
+                    _to_epoch(info['timestamp']), kind=KIND_MEMORY
+                )))
+            # Ordem determinística para que o prefixo do prompt não mude entre as mensagens
+            records.sort(key=lambda item: (item[1].timestamp, item[1].content))
+            self._long_term_records[user_id] = records
+        return records
+    
+    def _get_long_term_records(self, user_id=None, guild_id=None):
+        """Registros da memória de longo prazo visíveis para um usuário em um servidor
         
-    def get_combined_memory(self):
+        As informações compartilhadas (sem dono) vêm primeiro, seguidas das
+        do próprio usuário; informações de outro servidor são ignoradas.
+        """
+        records = [
+            record for record_guild, record in self._get_owner_records(None)
+            if record_guild is None or record_guild == guild_id
+        ]
+        if user_id is not None:
+            records.extend(
+                record for record_guild, record in self._get_owner_records(user_id)
+                if record_guild is None or record_guild == guild_id
+            )
+        return records
+    
+    def get_long_term(self, user_id=None, guild_id=None, include_shared=True):
+        """Informações da memória de longo prazo visíveis para um usuário, como (chave, info)
+        
+        Usa o índice por dono, sem percorrer as informações dos demais usuários.
+        """
+        owners = [user_id]
+        if include_shared and user_id is not None:
+            owners.insert(0, None)
+        
+        entries = []
+        for owner in owners:
+            for key in self._long_term_index.get(owner, ()):
+                info = self.long_term[key]
+                if info.get("guild_id") is None or info.get("guild_id") == guild_id:
+                    entries.append((key, info))
+        entries.sort(key=lambda entry: (entry[1].get("timestamp", ""), entry[0]))
+        return entries
+    
+    def get_llm_history(self, partition=None):
+        """Mensagens recentes da partição no formato da API, mantidas incrementalmente
+        
+        Reconstruído apenas quando a partição é alterada por algo diferente de
+        add_message (resumo, limpeza ou carregamento).
+        """
+        key = self.partition_key(partition)
+        history = self._llm_history.get(key)
+        if history is None:
+            history = deque((_to_llm_message(msg) for msg in self._get_partition(key)), maxlen=self.memory_limit)
+            self._llm_history[key] = history
+        return history
+    
+    def get_llm_context(self, partition=None, user_id=None, guild_id=None):
+        """Memórias (compartilhadas e do usuário), resumo e histórico da partição prontos para o payload da API"""
+        return LLMContext(
+            self._get_long_term_records(user_id, guild_id), self.get_summary(partition), self.get_llm_history(partition)
+        )
+    
+    def iter_combined_memory(self, partition=None, user_id=None, guild_id=None):
+        """Percorre memórias de longo prazo, resumo e mensagens recentes sem copiar a memória
+        
+        O iterador lê a deque diretamente: deve ser consumido antes de a
+        partição ser alterada (sem `await` no meio).
+        """
+        # Informações da memória de longo prazo no início
+        yield from self._get_long_term_records(user_id, guild_id)
+        
+        # O resumo das mensagens antigas vem antes das mensagens recentes
+        summary = self.summaries.get(self.partition_key(partition))
+        if summary:
+            yield MemoryRecord("system", "system", summary["content"], _to_epoch(summary["timestamp"]), kind=KIND_SUMMARY)
+        
+        yield from self._get_partition(partition)
+    
+    def get_combined_memory(self, partition=None, user_id=None, guild_id=None):
         """Retorna uma combinação da memória de curto prazo com informações relevantes da memória de longo prazo"""
-        # Obtém a memória de curto prazo
-        short_term = list(self.short_term)
+        return list(self.iter_combined_memory(partition, user_id, guild_id))
+    
+    def get_summary(self, partition=None):
+        """Retorna o resumo das mensagens antigas de uma partição, ou None"""
+        summary = self.summaries.get(self.partition_key(partition))
+        return summary["content"] if summary else None
+    
+    def set_summary(self, partition, content):
+        """Substitui o resumo das mensagens antigas de uma partição"""
+        key = self.partition_key(partition)
+        summary = {
+            "content": content,
+            "timestamp": datetime.now().isoformat()
+        }
+        self.summaries[key] = summary
         
-        # Se não houver informações na memória de longo prazo, retorna apenas a memória de curto prazo
-        if not self.long_term:
-            return short_term
-            
-        # Cria uma mensagem de sistema no início do contexto com as informações da memória de longo prazo
-        long_term_info = []
-        for key, info in self.long_term.items():
-            # Adiciona cada informação da memória de longo prazo
-            long_term_info.append({
-                "user_id": "system",
-                "username": "system",
-                "content": f"Informação importante: {info['value']}",
-                "timestamp": info['timestamp'],
-                "is_bot": False,
-                "is_memory": True  # Marca como uma entrada de memória de longo prazo
-            })
-        
-        # Combina as memórias, colocando as informações de longo prazo no início
-        return long_term_info + short_term
-    
-    def store_permanent_info(self, key, value):
-        """Armazena uma informação permanente na memória de longo prazo"""
-        self.long_term[key] = {
+        # Salva a memória se a persistência estiver habilitada
+        self._persist((database.UPSERT_SUMMARY, (key, content, summary["timestamp"])))
+    
+    @staticmethod
+    def estimate_tokens(messages):
+        """Estimativa barata de tokens (cerca de 4 caracteres por token em português)"""
+        return sum(len(msg.content) for msg in messages) // 4 + 4 * len(messages)
+    
+    def get_partition_tokens(self, partition=None):
+        """Estimativa de tokens da memória de curto prazo de uma partição (incluindo o resumo)"""
+        summary = self.get_summary(partition) or ""
+        return self.estimate_tokens(self._get_partition(partition)) + len(summary) // 4
+    
+    def remove_oldest(self, partition, messages):
+        """Remove do início da partição as mensagens informadas (que já foram resumidas)
+        
+        Mensagens que saíram da deque enquanto o resumo era gerado são
+        ignoradas; a remoção para na primeira mensagem que não foi resumida.
+        """
+        key = self.partition_key(partition)
+        short_term = self._get_partition(key)
+        summarized = {id(msg) for msg in messages}
+        removed = 0
+        last = None
+        while short_term and id(short_term[0]) in summarized:
+            last = short_term.popleft()
+            removed += 1
+        self._llm_history.pop(key, None)
+        
+        if removed:
+            # No SQLite, remove também as mensagens mais antigas que já tinham saído da deque
+            self._persist((database.DELETE_MESSAGES_UNTIL, (self._partition_guilds.get(key), key, last.timestamp)))
+        return removed
+    
+    def store_permanent_info(self, key, value, user_id=None, guild_id=None):
+        """Armazena uma informação permanente na memória de longo prazo
+        
+        Args:
+            key: Chave da informação
+            value: Texto da informação
+            user_id: Usuário dono da informação (None = compartilhada com todos)
+            guild_id: Servidor ao qual a informação se restringe (None = todos)
+        """
+        info = {
             "value": value,
             "timestamp": datetime.now().isoformat()
         }
+        if user_id is not None:
+            info["user_id"] = user_id
+        if guild_id is not None:
+            info["guild_id"] = guild_id
+        
+        previous = self.long_term.get(key)
+        if previous is not None and previous.get("user_id") != user_id:
+            self._forget_key(key)
+        self.long_term[key] = info
+        self._long_term_index.setdefault(user_id, set()).add(key)
+        self._long_term_records.pop(user_id, None)
+        if self._dedup is not None and not _dedup_exempt(key):
+            self._dedup.add(key, value, (user_id, guild_id))
         
         # Salva a memória se a persistência estiver habilitada
-        if self.persistence_enabled:
-            self.save_memory()
+        self._persist((database.UPSERT_LONG_TERM, (
+            key, value, info["timestamp"], None if user_id is None else str(user_id), guild_id
+        )))
         
         return True
     
+    def _forget_key(self, key):
+        """Remove uma chave da memória de longo prazo e do índice (sem persistir)"""
+        info = self.long_term.pop(key, None)
+        if info is None:
+            return None
+        owner = info.get("user_id")
+        keys = self._long_term_index.get(owner)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._long_term_index[owner]
+        self._long_term_records.pop(owner, None)
+        if self._dedup is not None:
+            self._dedup.remove(key)
+        return info
+    
+    def forget_permanent_info(self, key):
+        """Remove uma informação da memória de longo prazo"""
+        if self._forget_key(key) is None:
+            return False
+        
+        # Salva a memória se a persistência estiver habilitada
+        self._persist((database.DELETE_LONG_TERM, (key,)))
+        return True
+    
+    @property
+    def dedup_enabled(self):
+        return bool(self.config.get_config_value('memory_dedup_enabled', True))
+    
+    @property
+    def dedup_threshold(self):
+        return float(self.config.get_config_value('memory_dedup_threshold', DEFAULT_THRESHOLD))
+    
+    def _get_dedup(self):
+        """Índice LSH da memória de longo prazo, construído a partir das informações atuais"""
+        threshold = self.dedup_threshold
+        if self._dedup is None or self._dedup.threshold != threshold:
+            self._dedup = MemoryDeduplicator(threshold)
+            for key, info in self.long_term.items():
+                if not _dedup_exempt(key):
+                    self._dedup.add(key, info["value"], (info.get("user_id"), info.get("guild_id")))
+        return self._dedup
+    
+    def ingest_permanent_info(self, key, value, user_id=None, guild_id=None):
+        """Armazena uma informação nova, substituindo as versões repetidas ou quase repetidas do mesmo escopo
+        
+        A comparação usa o texto normalizado (sem acentos, pontuação e
+        palavras de ligação) e MinHash/LSH, então só as informações
+        parecidas do mesmo usuário e servidor são examinadas.
+        
+        Returns:
+            Chaves das informações antigas substituídas pela nova
+        """
+        superseded = []
+        if self.dedup_enabled and not _dedup_exempt(key):
+            for old_key, score in self._get_dedup().find_similar(value, (user_id, guild_id)):
+                if old_key != key and self.forget_permanent_info(old_key):
+                    superseded.append(old_key)
+                    logger.info(f"Informação {old_key} substituída por {key} (similaridade {score:.2f})")
+            if superseded:
+                metrics.incr("memory.dedup.superseded", len(superseded))
+        
+        self.store_permanent_info(key, value, user_id=user_id, guild_id=guild_id)
+        return superseded
+    
+    async def compact_long_term(self):
+        """Remove as informações quase repetidas já armazenadas, mantendo a mais recente de cada grupo
+        
+        A comparação roda em uma thread sobre uma cópia das informações;
+        só as que não mudaram nesse meio tempo são removidas.
+        
+        Returns:
+            Número de informações removidas
+        """
+        entries = [
+            (key, info["value"], (info.get("user_id"), info.get("guild_id")), info.get("timestamp", ""))
+            for key, info in self.long_term.items()
+            if not _dedup_exempt(key)
+        ]
+        loop = asyncio.get_running_loop()
+        with metrics.timer("memory.dedup.compaction"):
+            groups = await loop.run_in_executor(None, find_duplicate_groups, entries, self.dedup_threshold)
+        
+        snapshot = {key: timestamp for key, _, _, timestamp in entries}
+        removed = 0
+        for group in groups:
+            for key in group[1:]:
+                info = self.long_term.get(key)
+                if info is not None and info.get("timestamp", "") == snapshot[key] and self.forget_permanent_info(key):
+                    removed += 1
+        
+        metrics.incr("memory.dedup.compacted", removed)
+        logger.info(f"Compactação da memória de longo prazo: {removed} informações repetidas removidas")
+        return removed
+    
     def get_permanent_info(self, key, default=None):
         """Recupera uma informação permanente da memória de longo prazo"""
         if key in self.long_term:
             return self.long_term[key]["value"]
         return default
     
-    def clear_short_term(self):
-        """Limpa a memória de curto prazo"""
-        self.short_term.clear()
+    def clear_short_term(self, partition=None):
+        """Limpa a memória de curto prazo de uma partição (ou de todas, se nenhuma for informada)"""
+        if partition is None:
+            for messages in self.partitions.values():
+                messages.clear()
+        else:
+            self._get_partition(partition).clear()
+        
+        # O resumo deixa de fazer sentido sem as mensagens que o seguem
+        if partition is None:
+            self.summaries.clear()
+            self._llm_history.clear()
+            statements = [(database.DELETE_ALL_MESSAGES, ()), (database.DELETE_ALL_SUMMARIES, ())]
+        else:
+            key = self.partition_key(partition)
+            self.summaries.pop(key, None)
+            self._llm_history.pop(key, None)
+            statements = [
+                (database.DELETE_CHANNEL_MESSAGES, (self._partition_guilds.get(key), key)),
+                (database.DELETE_SUMMARY, (key,))
+            ]
         
         # Salva a memória se a persistência estiver habilitada
-        if self.persistence_enabled:
-            self.save_memory()
+        self._persist(*statements)
         
         return True
     
-    def clear_long_term(self):
-        """Limpa a memória de longo prazo"""
-        self.long_term.clear()
+    def clear_long_term(self, user_id=None):
+        """Limpa a memória de longo prazo (toda ou apenas as informações de um usuário)"""
+        if user_id is None:
+            self.long_term.clear()
+            self._index_long_term()
+            statement = (database.DELETE_ALL_LONG_TERM, ())
+        else:
+            for key in list(self._long_term_index.get(user_id, ())):
+                self._forget_key(key)
+            statement = (database.DELETE_USER_LONG_TERM, (str(user_id),))
         
         # Salva a memória se a persistência estiver habilitada
-        if self.persistence_enabled:
-            self.save_memory()
+        self._persist(statement)
         
         return True
     
+    def _load_from_database(self):
+        """Carrega as mensagens recentes de cada canal, os resumos e a memória de longo prazo do SQLite"""
+        self._llm_history.clear()
+        
+        for guild_id, channel_id in self.db.query(database.SELECT_CHANNELS):
+            rows = self.db.query(database.SELECT_RECENT_MESSAGES, (guild_id, channel_id, self.memory_limit))
+            if guild_id is not None:
+                self._partition_guilds[channel_id] = guild_id
+            self._get_partition(channel_id).extend(
+                MemoryRecord(_from_db_id(user_id), username, content, timestamp, bool(is_bot))
+                for user_id, username, content, timestamp, is_bot in reversed(rows)
+            )
+        
+        self.summaries = {
+            channel_id: {"content": content, "timestamp": timestamp}
+            for channel_id, content, timestamp in self.db.query(database.SELECT_SUMMARIES)
+        }
+        self.long_term = {}
+        for key, value, timestamp, user_id, guild_id in self.db.query(database.SELECT_LONG_TERM):
+            info = {"value": value, "timestamp": timestamp}
+            if user_id is not None:
+                info["user_id"] = _from_db_id(user_id)
+            if guild_id is not None:
+                info["guild_id"] = guild_id
+            self.long_term[key] = info
+        self._index_long_term()
+        
+        total = sum(len(messages) for messages in self.partitions.values())
+        logger.info(f"Memória carregada do SQLite: {total} mensagens recentes em {len(self.partitions)} partições")
+        return True
+    
     def load_memory(self):
-        """Carrega a memória de um arquivo JSON"""
+        """Carrega a memória do SQLite ou de um arquivo JSON"""
+        if self.db is not None:
+            try:
+                return self._load_from_database()
+            except Exception as e:
+                logger.error(f"Erro ao carregar memória do banco de dados: {e}")
+                return False
+        
         try:
-            if os.path.exists(self.memory_file):
-                with open(self.memory_file, 'r', encoding='utf-8') as f:
-                    memory_data = json.load(f)
-                    
-                    # Carrega a memória de curto prazo
-                    if "short_term" in memory_data and isinstance(memory_data["short_term"], list):
-                        # Limita a quantidade de mensagens carregadas ao tamanho máximo da deque
-                        for msg in memory_data["short_term"][-self.memory_limit:]:
-                            self.short_term.append(msg)
+            if storage.exists(self.memory_file):
+                memory_data = serialization.load_file(self.memory_file)
+                self._llm_history.clear()
+                
+                # Carrega a memória de curto prazo (formato antigo, sem partições)
+                if "short_term" in memory_data and isinstance(memory_data["short_term"], list):
+                    # Limita a quantidade de mensagens carregadas ao tamanho máximo da deque
+                    for msg in memory_data["short_term"][-self.memory_limit:]:
+                        self.short_term.append(MemoryRecord.from_dict(msg))
+                
+                # Carrega as partições por canal
+                if "partitions" in memory_data and isinstance(memory_data["partitions"], dict):
+                    for key, messages in memory_data["partitions"].items():
+                        if key == DEFAULT_PARTITION:
+                            continue
+                        self._get_partition(key).extend(MemoryRecord.from_dict(msg) for msg in messages[-self.memory_limit:])
+                
+                # Servidor de cada partição (para a migração ao SQLite)
+                if isinstance(memory_data.get("partition_guilds"), dict):
+                    self._partition_guilds.update(memory_data["partition_guilds"])
+                
+                # Carrega os resumos das conversas
+                if "summaries" in memory_data and isinstance(memory_data["summaries"], dict):
+                    self.summaries = memory_data["summaries"]
+                
+                # Carrega a memória de longo prazo
+                if "long_term" in memory_data and isinstance(memory_data["long_term"], dict):
+                    self.long_term = memory_data["long_term"]
+                    self._index_long_term()
                     
-                    # Carrega a memória de longo prazo
-                    if "long_term" in memory_data and isinstance(memory_data["long_term"], dict):
-                        self.long_term = memory_data["long_term"]
-                        
-                logger.info(f"Memória carregada com sucesso: {len(self.short_term)} mensagens recentes")
+                total = sum(len(messages) for messages in self.partitions.values())
+                logger.info(f"Memória carregada com sucesso: {total} mensagens recentes em {len(self.partitions)} partições")
                 return True
             else:
                 logger.info("Arquivo de memória não encontrado. Iniciando com memória vazia.")
@@ -152,21 +677,35 @@ class Memory:
             logger.error(f"Erro ao carregar memória: {e}")
             return False
     
-    def save_memory(self):
-        """Salva a memória em um arquivo JSON"""
+    def _snapshot_memory(self):
+        """Copia o estado da memória no formato do memory.json"""
+        return {
+            "short_term": [msg.to_dict() for msg in self.short_term],
+            "partitions": {
+                key: [msg.to_dict() for msg in messages]
+                for key, messages in self.partitions.items()
+                if key != DEFAULT_PARTITION and messages
+            },
+            "partition_guilds": dict(self._partition_guilds),
+            "summaries": dict(self.summaries),
+            "long_term": dict(self.long_term)
+        }
+    
+    def _write_memory(self, memory_data):
+        """Grava uma cópia da memória no arquivo JSON"""
         try:
             # Cria o diretório se não existir
             os.makedirs(os.path.dirname(self.memory_file), exist_ok=True)
             
-            memory_data = {
-                "short_term": list(self.short_term),
-                "long_term": self.long_term
-            }
-            
-            with open(self.memory_file, 'w', encoding='utf-8') as f:
-                json.dump(memory_data, f, indent=4)
+            serialization.dump_file(self.memory_file, memory_data)
             
             return True
         except Exception as e:
             logger.error(f"Erro ao salvar memória: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    def save_memory(self):
+        """Salva a memória no arquivo JSON imediatamente (no SQLite, cada alteração já é gravada individualmente)"""
+        if self.db is not None:
+            return True
+        return self._write_memory(self._snapshot_memory())
\ No newline at end of file
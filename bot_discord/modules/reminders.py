@@ -0,0 +1,312 @@
+# reminders.py
+# Lembretes das datas especiais: uma tarefa que dorme até o próximo lembrete
+
+import asyncio
+import heapq
+import logging
+import os
+import time
+from datetime import datetime, time as dtime, timedelta
+
+import aiohttp
+
+from core import persistence, serialization, storage
+from core.metrics import metrics
+from modules.date_index import next_occurrence
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+
+# Tempo máximo (s) de espera: reavalia o heap pelo menos uma vez por hora, caso o relógio do sistema mude
+MAX_SLEEP = 3600
+
+TELEGRAM_API_URL = "https://api.telegram.org/bot{token}/sendMessage"
+
+
+class ReminderScheduler:
+    """Envia lembretes das datas especiais nos canais e webhooks configurados
+
+    Cada lembrete vai só para os canais de `reminder_channels` do servidor
+    em que a data foi registrada; o webhook/Telegram recebe as datas sem
+    servidor e as dos servidores em `notification_guilds`.
+
+    Cada data especial tem exatamente uma entrada em um heap, com o horário
+    (epoch) do seu próximo lembrete. Uma única tarefa dorme até o topo do
+    heap vencer, envia os lembretes vencidos e agenda o lembrete seguinte de
+    cada data; não há varredura periódica das datas. Datas adicionadas ou
+    removidas acordam a tarefa (via `TimeHandler.add_listener`); entradas
+    antigas são descartadas ao sair do heap, pela geração da data.
+
+    O horário do último lembrete enviado é gravado em data/reminders.json:
+    depois de um reinício, os lembretes perdidos há menos de
+    `reminder_grace_hours` horas são enviados e os anteriores, ignorados.
+    """
+
+    def __init__(self, bot, config, time_handler, sender=None):
+        self.bot = bot
+        self.config = config
+        self.time_handler = time_handler
+        # Fila de envio do bot (core.sender); sem ela, envia direto no canal
+        self.sender = sender
+
+        # Caminho para o arquivo de estado dos lembretes
+        self.state_file = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            'data',
+            'reminders.json'
+        )
+
+        # Heap de (epoch, id da data, geração, dias de antecedência, ordinal da ocorrência)
+        self._heap = []
+        # Id da data -> geração atual (entradas de gerações antigas são ignoradas)
+        self._generation = {}
+        # Horário (epoch) do último lembrete processado
+        self._last_fired = 0.0
+
+        self._task = None
+        self._wake = None
+        self._session = None
+
+        self.load_state()
+        persistence.scheduler.register("reminders", self._snapshot_state, self._write_state)
+        time_handler.add_listener(self._on_special_date_changed)
+
+    @property
+    def reminder_hour(self):
+        return int(self.config.get_config_value('reminder_hour', 9))
+
+    @property
+    def days_before(self):
+        value = self.config.get_config_value('reminder_days_before', [1, 0])
+        if isinstance(value, int):
+            value = [value]
+        return sorted({max(0, int(days)) for days in value}, reverse=True) or [0]
+
+    @property
+    def grace_seconds(self):
+        return float(self.config.get_config_value('reminder_grace_hours', 12)) * 3600
+
+    @property
+    def channel_ids(self):
+        return [int(channel_id) for channel_id in self.config.get_config_value('reminder_channels', [])]
+
+    @property
+    def notification_guilds(self):
+        return {int(guild_id) for guild_id in self.config.get_config_value('notification_guilds', [])}
+
+    def __len__(self):
+        return len(self._generation)
+
+    def start(self):
+        """Monta o heap e inicia a tarefa de lembretes"""
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self.rebuild()
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Interrompe a tarefa de lembretes e fecha a sessão HTTP"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def rebuild(self):
+        """Reconstrói o heap a partir de todas as datas especiais"""
+        # Lembretes vencidos há mais que a tolerância não seriam enviados mesmo
+        after = max(self._last_fired, time.time() - self.grace_seconds)
+        self._heap = []
+        self._generation = {}
+        schedule = self._schedule()
+        for date_id, date_info in self.time_handler.special_dates.items():
+            self._generation[date_id] = 0
+            entry = self._next_entry(date_id, date_info, after, schedule)
+            if entry is not None:
+                self._heap.append(entry)
+        heapq.heapify(self._heap)
+        logger.info(f"Lembretes agendados: {len(self._heap)} datas especiais")
+
+    def _schedule(self):
+        """Fuso horário, hora e antecedências dos lembretes (lidos uma vez por reconstrução)"""
+        return self.time_handler.get_timezone(), dtime(self.reminder_hour), self.days_before
+
+    def _next_entry(self, date_id, date_info, after, schedule=None):
+        """Próximo lembrete (depois de `after`, epoch) de uma data especial, como entrada do heap"""
+        tz, hour, days_before = schedule or self._schedule()
+        day = datetime.fromtimestamp(after, tz).date()
+        try:
+            # Duas ocorrências bastam: se todos os lembretes da primeira já passaram, vale a seguinte
+            for _ in range(2):
+                occurrence = next_occurrence(date_info, day)
+                if occurrence is None:
+                    return None
+                for days in days_before:
+                    fire_at = datetime.combine(occurrence - timedelta(days=days), hour, tz).timestamp()
+                    if fire_at > after:
+                        return (fire_at, date_id, self._generation[date_id], days, occurrence.toordinal())
+                day = occurrence + timedelta(days=1)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Data especial inválida ignorada nos lembretes ({date_id}): {e}")
+        return None
+
+    def _on_special_date_changed(self, date_id):
+        """Chamado pelo TimeHandler quando uma data especial é adicionada ou removida (None = todas)"""
+        if date_id is None:
+            self.rebuild()
+        else:
+            # A entrada anterior (se houver) fica no heap e é ignorada ao sair
+            self._generation[date_id] = self._generation.get(date_id, -1) + 1
+            date_info = self.time_handler.special_dates.get(date_id)
+            if date_info is None:
+                del self._generation[date_id]
+            else:
+                entry = self._next_entry(date_id, date_info, max(self._last_fired, time.time()))
+                if entry is not None:
+                    heapq.heappush(self._heap, entry)
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self):
+        """Dorme até o próximo lembrete vencer (ou o heap mudar) e envia os lembretes vencidos"""
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                self._wake.clear()
+                delay = MAX_SLEEP
+                if self._heap:
+                    delay = min(self._heap[0][0] - time.time(), MAX_SLEEP)
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._fire_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro na tarefa de lembretes: {e}")
+                await asyncio.sleep(60)
+
+    async def _fire_due(self):
+        """Envia os lembretes vencidos e agenda o próximo lembrete de cada data"""
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, date_id, generation, days, ordinal = heapq.heappop(self._heap)
+            if self._generation.get(date_id) != generation:
+                metrics.incr("reminders.stale")
+                continue
+
+            date_info = self.time_handler.special_dates[date_id]
+            if now - fire_at <= self.grace_seconds:
+                await self.deliver(self.format_reminder(date_info["name"], days), date_info.get("guild_id"))
+                metrics.incr("reminders.fired")
+            else:
+                logger.info(f"Lembrete perdido ignorado: {date_info['name']} ({days} dias antes)")
+                metrics.incr("reminders.missed")
+
+            self._last_fired = max(self._last_fired, fire_at)
+            persistence.scheduler.mark_dirty("reminders")
+
+            entry = self._next_entry(date_id, date_info, fire_at)
+            if entry is not None:
+                heapq.heappush(self._heap, entry)
+            else:
+                # Data única que já passou
+                del self._generation[date_id]
+
+    @staticmethod
+    def format_reminder(name, days):
+        """Texto do lembrete de uma data especial"""
+        if days == 0:
+            return f"📅 Hoje é {name}!"
+        if days == 1:
+            return f"📅 Amanhã é {name}!"
+        return f"📅 Faltam {days} dias para {name}."
+
+    async def deliver(self, text, guild_id=None):
+        """Envia um lembrete aos canais configurados do servidor da data e ao webhook/Telegram das notificações"""
+        targets = [self._send_to_channel(channel, text) for channel in self._channels_of(guild_id)]
+        if self.config.get_config_value('notifications_enabled', False) and (
+                guild_id is None or guild_id in self.notification_guilds):
+            method = self.config.get_config_value('notification_method', 'webhook')
+            if method == 'webhook' and self.config.get_config_value('webhook_url'):
+                targets.append(self._post_webhook(text))
+            elif method == 'telegram' and self.config.get_config_value('telegram_token'):
+                targets.append(self._post_telegram(text))
+
+        if not targets:
+            logger.debug(f"Lembrete sem destino configurado: {text}")
+            return
+        await asyncio.gather(*targets)
+
+    def _channels_of(self, guild_id):
+        """Canais de lembretes que pertencem ao servidor (nenhum para datas sem servidor)"""
+        if guild_id is None:
+            return []
+        channels = []
+        for channel_id in self.channel_ids:
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                logger.warning(f"Canal de lembretes não encontrado: {channel_id}")
+            elif getattr(getattr(channel, "guild", None), "id", None) == guild_id:
+                channels.append(channel)
+        return channels
+
+    async def _send_to_channel(self, channel, text):
+        try:
+            if self.sender is not None:
+                await self.sender.send(channel, text)
+            else:
+                await channel.send(text)
+        except Exception as e:
+            metrics.incr("reminders.errors")
+            logger.error(f"Erro ao enviar lembrete ao canal {channel.id}: {e}")
+
+    def _get_session(self):
+        """Retorna a sessão HTTP dos webhooks"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers={"Content-Type": "application/json"},
+                json_serialize=serialization.dumps_str
+            )
+        return self._session
+
+    async def _post(self, url, payload):
+        try:
+            async with self._get_session().post(url, json=payload, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                if response.status >= 300:
+                    raise RuntimeError(f"status {response.status}: {await response.text()}")
+        except Exception as e:
+            metrics.incr("reminders.errors")
+            logger.error(f"Erro ao enviar lembrete ao webhook: {e}")
+
+    async def _post_webhook(self, text):
+        # "content" é o formato dos webhooks do Discord; outros serviços recebem o mesmo JSON
+        await self._post(self.config.get_config_value('webhook_url'), {"content": text})
+
+    async def _post_telegram(self, text):
+        url = TELEGRAM_API_URL.format(token=self.config.get_config_value('telegram_token'))
+        await self._post(url, {"chat_id": self.config.get_config_value('telegram_chat_id'), "text": text})
+
+    def load_state(self):
+        """Carrega o horário do último lembrete enviado"""
+        try:
+            if storage.exists(self.state_file):
+                self._last_fired = float(serialization.load_file(self.state_file).get("last_fired", 0))
+        except Exception as e:
+            logger.error(f"Erro ao carregar o estado dos lembretes: {e}")
+
+    def _snapshot_state(self):
+        return {"last_fired": self._last_fired}
+
+    def _write_state(self, state):
+        """Grava o horário do último lembrete enviado"""
+        try:
+            os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+            serialization.dump_file(self.state_file, state)
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao salvar o estado dos lembretes: {e}")
+            return False
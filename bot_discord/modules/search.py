@@ -1,6 +1,6 @@
 import logging
 import os
-import json
+from core import serialization, storage
 import time
 import requests
 from datetime import datetime, timedelta
@@ -145,8 +145,7 @@ class SearchEngine:
             for cache_file in self.cache_dir.glob('*.json'):
                 try:
                     # Carrega os dados do arquivo
-                    with open(cache_file, 'r', encoding='utf-8') as f:
-                        cache_data = json.load(f)
+                    cache_data = serialization.load_file(cache_file)
                     
                     # Verifica se o cache expirou
                     timestamp = cache_data.get('timestamp', 0)
@@ -178,8 +177,7 @@ class SearchEngine:
                 return None
                 
             # Carrega os dados do cache
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
+            cache_data = serialization.load_file(cache_file)
                 
             # Verifica se o cache expirou
             timestamp = cache_data.get('timestamp', 0)
@@ -215,8 +213,8 @@ class SearchEngine:
             }
             
             # Salva os dados no arquivo
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
+            # Cache descartável: sem cópia de segurança e sem fsync
+            serialization.dump_file(cache_file, cache_data, durability=storage.DURABILITY_NONE, backup=False)
                 
             logger.debug(f"Resultados salvos em cache: {cache_file.name}")
             
@@ -0,0 +1,97 @@
+# summarizer.py
+# Resumo contínuo das mensagens antigas de cada conversa
+
+import asyncio
+import logging
+
+from core.metrics import metrics
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+
+
+class ConversationSummarizer:
+    """Condensa as mensagens mais antigas de uma partição em um resumo quando a conversa fica longa
+
+    Quando a memória de curto prazo de um canal passa do limite de tokens
+    (ou está prestes a descartar mensagens pelo tamanho da deque), as
+    mensagens mais antigas são enviadas à IA em segundo plano, com baixa
+    prioridade, e substituídas pelo resumo acumulado da partição.
+    """
+
+    def __init__(self, config, memory, ai_handler):
+        self.config = config
+        self.memory = memory
+        self.ai_handler = ai_handler
+
+        # Partição -> tarefa de resumo em andamento
+        self._tasks = {}
+
+    @property
+    def enabled(self):
+        return bool(self.config.get_config_value('summary_enabled', True))
+
+    @property
+    def token_threshold(self):
+        return int(self.config.get_config_value('summary_token_threshold', 1500))
+
+    @property
+    def keep_recent(self):
+        return int(self.config.get_config_value('summary_keep_recent', 8))
+
+    def needs_summary(self, partition):
+        """Verifica se a partição passou do limite de tokens ou está perto de perder mensagens"""
+        count = len(self.memory.get_short_term_memory(partition))
+        if count <= self.keep_recent:
+            return False
+        if count >= self.memory.memory_limit - 1:
+            return True
+        return self.memory.get_partition_tokens(partition) > self.token_threshold
+
+    def maybe_summarize(self, partition):
+        """Agenda um resumo em segundo plano se a partição precisar (no máximo um por partição)"""
+        if not self.enabled or not self.needs_summary(partition):
+            return None
+
+        key = self.memory.partition_key(partition)
+        task = self._tasks.get(key)
+        if task is not None and not task.done():
+            return task
+
+        task = asyncio.create_task(self.summarize(key))
+        self._tasks[key] = task
+
+        def _forget(_):
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+        task.add_done_callback(_forget)
+        return task
+
+    async def summarize(self, partition):
+        """Resume as mensagens mais antigas da partição, mantendo as `keep_recent` mais recentes intactas"""
+        messages = self.memory.get_short_term_memory(partition)
+        oldest = messages[:len(messages) - self.keep_recent]
+        if not oldest:
+            return False
+
+        previous = self.memory.get_summary(partition)
+        summary = await self.ai_handler.summarize_conversation(oldest, previous)
+        if not summary:
+            metrics.incr("memory.summaries.failed")
+            return False
+
+        self.memory.set_summary(partition, summary)
+        removed = self.memory.remove_oldest(partition, oldest)
+        metrics.incr("memory.summaries")
+        metrics.incr("memory.summarized_messages", removed)
+        logger.info(f"Conversa da partição {partition} resumida: {removed} mensagens condensadas")
+        return True
+
+    async def close(self):
+        """Cancela os resumos em andamento"""
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
@@ -3,14 +3,36 @@
 
 import datetime
 import logging
-import json
+from core import database, persistence, serialization, storage
 import os
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Union
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from modules import date_extraction
+from modules.date_index import SpecialDateIndex
+from modules.triggers import DATE_TRIGGERS
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python 3.8
+    try:
+        from backports.zoneinfo import ZoneInfo
+    except ImportError:
+        ZoneInfo = None
 
 # Configuração do logger
 logger = logging.getLogger(__name__)
 
+
+class TimeContext(NamedTuple):
+    """Contexto de tempo para o prompt, em duas partes com validades diferentes"""
+    date_block: str  # Data, dia da semana, feriado e datas próximas (muda uma vez por dia)
+    time_line: str   # Hora e período do dia (muda a cada minuto)
+    
+    def format(self) -> str:
+        return f"{self.date_block}\n{self.time_line}"
+
+
 class TimeHandler:
     def __init__(self, config):
         self.config = config
@@ -25,13 +47,33 @@ class TimeHandler:
         # Dicionário para armazenar datas especiais
         self.special_dates = {}
         
+        # Datas especiais ordenadas pela próxima ocorrência (reconstruído após carregar)
+        self._date_index = SpecialDateIndex()
+        self._date_index_stale = True
+        
+        # Funções chamadas com o id de cada data especial adicionada ou removida (ex: lembretes)
+        self._listeners = []
+        
+        # Banco SQLite, se configurado (storage_engine = sqlite); senão, special_dates.json
+        self.db = database.get_database(config)
+        
         # Carrega datas especiais se o arquivo existir
         self.load_special_dates()
+        if self.db is None:
+            # O special_dates.json é regravado em segundo plano
+            persistence.scheduler.register("special_dates", self._snapshot_special_dates, self._write_special_dates)
         
         # Configurações de localização e fuso horário
         self.timezone_offset = self.config.get_config_value('timezone_offset', 0)
         self.locale = self.config.get_config_value('locale', 'pt_BR')
         
+        # Servidor -> fuso horário (resolvido uma vez; limpo quando as configurações mudam)
+        self._timezones = {}
+        self._timezones_version = None
+        
+        # (servidor, fuso horário) -> [dia, bloco da data, minuto, linha da hora, TimeContext]
+        self._time_context_cache = {}
+        
         # Nomes dos dias da semana e meses em português
         self.weekdays_pt = [
             "segunda-feira", "terça-feira", "quarta-feira", 
@@ -55,12 +97,46 @@ class TimeHandler:
             (25, 12),  # Natal
         ]
         
-    def get_current_time(self) -> datetime:
-        """Retorna o datetime atual considerando o timezone configurado"""
-        now = datetime.now()
-        if self.timezone_offset != 0:
-            now = now + timedelta(hours=self.timezone_offset)
-        return now
+    def _load_timezone(self, name: Optional[str]):
+        """Converte o nome de um fuso horário IANA (ex: America/Sao_Paulo) em tzinfo
+        
+        Sem nome, sem zoneinfo ou com um nome inválido, usa o deslocamento
+        fixo `timezone_offset` em relação ao UTC.
+        """
+        if name:
+            if ZoneInfo is None:
+                logger.warning(f"zoneinfo indisponível; usando UTC{self.timezone_offset:+g} em vez de {name}")
+            else:
+                try:
+                    return ZoneInfo(name)
+                except Exception as e:
+                    logger.warning(f"Fuso horário inválido '{name}': {e}. Usando UTC{self.timezone_offset:+g}.")
+        return timezone(timedelta(hours=self.timezone_offset))
+    
+    def get_timezone(self, guild_id=None):
+        """Fuso horário de um servidor (guild_timezones), o padrão (timezone) ou o deslocamento timezone_offset
+        
+        O fuso IANA só é usado se estiver definido na configuração: configurações
+        que só têm `timezone_offset` continuam com ele.
+        """
+        version = getattr(self.config, 'version', 0)
+        if version != self._timezones_version:
+            self._timezones.clear()
+            self._timezones_version = version
+            self.timezone_offset = self.config.get_config_value('timezone_offset', 0)
+        
+        tz = self._timezones.get(guild_id)
+        if tz is None:
+            name = None
+            if guild_id is not None:
+                name = (self.config.get_config_value('guild_timezones') or {}).get(str(guild_id))
+            tz = self._load_timezone(name or self.config.get_config_value('timezone'))
+            self._timezones[guild_id] = tz
+        return tz
+    
+    def get_current_time(self, guild_id=None) -> datetime:
+        """Retorna o datetime atual (sem tzinfo) no fuso horário do servidor ou no padrão"""
+        return datetime.now(self.get_timezone(guild_id)).replace(tzinfo=None)
     
     def get_formatted_time(self, format_str: str = "%H:%M:%S") -> str:
         """Retorna a hora atual formatada"""
@@ -102,16 +178,7 @@ class TimeHandler:
     
     def get_time_of_day(self) -> str:
         """Retorna o período do dia (manhã, tarde, noite, madrugada)"""
-        hour = self.get_current_time().hour
-        
-        if 5 <= hour < 12:
-            return "manhã"
-        elif 12 <= hour < 18:
-            return "tarde"
-        elif 18 <= hour < 22:
-            return "noite"
-        else:
-            return "madrugada"
+        return self._time_of_day(self.get_current_time().hour)
     
     def is_weekend(self) -> bool:
         """Verifica se é fim de semana"""
@@ -151,7 +218,7 @@ class TimeHandler:
             "day": str(now.day)
         }
         
-        # Adiciona informações sobre datas especiais próximas
+        # Adiciona informações sobre datas especiais próximas (as registradas fora de servidores)
         upcoming = self.get_upcoming_special_dates(limit=2)
         if upcoming:
             context["upcoming_dates"] = ", ".join(
@@ -160,37 +227,79 @@ class TimeHandler:
         
         return context
     
-    def format_time_context_for_ai(self) -> str:
+    def format_time_context_for_ai(self, guild_id=None) -> str:
         """Formata o contexto de tempo para ser usado pelo modelo de IA"""
-        context = self.get_time_context()
-        
-        # Cria uma mensagem formatada com as informações de tempo
-        message = [
-            f"Data atual: {context['current_date']}",
-            f"Hora atual: {context['current_time']}",
-            f"Dia da semana: {context['weekday']}",
-            f"Período do dia: {context['time_of_day']}"
-        ]
+        return self.get_time_context_block(guild_id).format()
+    
+    def get_time_context_block(self, guild_id=None) -> TimeContext:
+        """Contexto de tempo para o prompt, recalculado só quando o minuto ou o dia mudam
+        
+        A parte da data (dia da semana, feriado, datas próximas) é refeita
+        uma vez por dia ou quando as datas especiais mudam; a linha da hora,
+        uma vez por minuto. Nas demais mensagens o custo é uma leitura do
+        relógio e duas comparações. O cache é separado por servidor: cada um
+        vê só as próprias datas especiais.
+        """
+        tz = self.get_timezone(guild_id)
+        now = datetime.now(tz).replace(tzinfo=None)
+        today = now.date()
+        minute = (today, now.hour, now.minute)
+        
+        cache_key = (guild_id, tz)
+        cached = self._time_context_cache.get(cache_key)
+        if cached is not None and cached[2] == minute:
+            return cached[4]
+        
+        if cached is None or cached[0] != today:
+            date_block = self._format_date_block(now, guild_id)
+        else:
+            date_block = cached[1]
+        time_line = f"Hora atual: {now.strftime('%H:%M')} ({self._time_of_day(now.hour)})"
+        
+        context = TimeContext(date_block, time_line)
+        self._time_context_cache[cache_key] = [today, date_block, minute, time_line, context]
+        return context
+    
+    def _format_date_block(self, now: datetime, guild_id=None) -> str:
+        """Linhas do contexto de tempo que só mudam de um dia para o outro"""
+        lines = [f"Data atual: {self.weekdays_pt[now.weekday()]}, {now.strftime('%d/%m/%Y')}"]
         
-        # Adiciona informações condicionais
-        if context['is_weekend'] == 'True':
-            message.append("Hoje é fim de semana.")
+        if now.weekday() >= 5:
+            lines.append("Hoje é fim de semana.")
         
-        if context['is_holiday'] == 'True':
-            message.append("Hoje é feriado nacional.")
-            
-        if 'upcoming_dates' in context:
-            message.append(f"Datas especiais próximas: {context['upcoming_dates']}")
+        if (now.day, now.month) in self.holidays_br:
+            lines.append("Hoje é feriado nacional.")
         
-        return "\n".join(message)
+        upcoming = self._upcoming_from(now.date(), 2, guild_id)
+        if upcoming:
+            lines.append("Datas especiais próximas: " + ", ".join(
+                f"{name} hoje" if days == 0 else f"{name} amanhã" if days == 1 else f"{name} em {days} dias"
+                for name, days in upcoming
+            ))
+        
+        return "\n".join(lines)
+    
+    @staticmethod
+    def _time_of_day(hour: int) -> str:
+        if 5 <= hour < 12:
+            return "manhã"
+        elif 12 <= hour < 18:
+            return "tarde"
+        elif 18 <= hour < 22:
+            return "noite"
+        else:
+            return "madrugada"
     
-    def add_special_date(self, name: str, date_str: str, recurring: bool = True) -> bool:
+    def add_special_date(self, name: str, date_str: str, recurring: bool = True, guild_id=None,
+                         user_id=None) -> bool:
         """Adiciona uma data especial ao calendário
         
         Args:
             name: Nome da data especial (ex: "Aniversário do João")
             date_str: Data no formato DD/MM/YYYY ou DD/MM
             recurring: Se True, a data se repete anualmente
+            guild_id: Servidor em que a data foi registrada (só ele a vê no contexto e nos lembretes)
+            user_id: Autor do registro
         """
         try:
             # Verifica o formato da data
@@ -207,7 +316,9 @@ class TimeHandler:
             
             # Cria um ID único para a data
             import hashlib
-            date_id = f"date_{hashlib.md5(f'{name}_{date_str}'.encode('utf-8')).hexdigest()[:8]}"
+            # O servidor entra no id: o mesmo evento em outro servidor é outra data
+            scoped = f"{name}_{date_str}" if guild_id is None else f"{guild_id}:{name}_{date_str}"
+            date_id = f"date_{hashlib.md5(scoped.encode('utf-8')).hexdigest()[:8]}"
             
             # Armazena a data especial
             self.special_dates[date_id] = {
@@ -217,9 +328,17 @@ class TimeHandler:
                 "year": year,
                 "recurring": recurring
             }
+            if guild_id is not None:
+                self.special_dates[date_id]["guild_id"] = guild_id
+            if user_id is not None:
+                self.special_dates[date_id]["user_id"] = user_id
+            if not self._date_index_stale:
+                self._date_index.add(date_id, self.special_dates[date_id], self.get_current_time().date() - timedelta(days=1))
+            self._time_context_cache.clear()
             
             # Salva as datas especiais
-            self.save_special_dates()
+            self._persist_special_date(date_id)
+            self._notify_listeners(date_id)
             
             logger.info(f"Data especial adicionada: {name} - {date_str}")
             return True
@@ -241,9 +360,12 @@ class TimeHandler:
             if date_id:
                 # Remove a data
                 del self.special_dates[date_id]
+                self._date_index.remove(date_id)
+                self._time_context_cache.clear()
                 
                 # Salva as alterações
-                self.save_special_dates()
+                self._persist_special_date(date_id)
+                self._notify_listeners(date_id)
                 
                 logger.info(f"Data especial removida: {name}")
                 return True
@@ -255,203 +377,155 @@ class TimeHandler:
             logger.error(f"Erro ao remover data especial: {e}")
             return False
     
-    def get_upcoming_special_dates(self, limit: int = 5) -> List[Tuple[str, int]]:
+    def get_upcoming_special_dates(self, limit: int = 5, guild_id=None) -> List[Tuple[str, int]]:
         """Retorna as próximas datas especiais
         
         Args:
             limit: Número máximo de datas a retornar
+            guild_id: Servidor cujas datas são retornadas (None = datas registradas fora de servidores)
             
         Returns:
             Lista de tuplas (nome_da_data, dias_restantes)
         """
+        return self._upcoming_from(self.get_current_time(guild_id).date(), limit, guild_id)
+    
+    def _upcoming_from(self, today, limit, guild_id=None):
         try:
-            now = self.get_current_time()
-            current_year = now.year
-            current_month = now.month
-            current_day = now.day
-            
-            upcoming_dates = []
-            
-            for date_id, date_info in self.special_dates.items():
-                day = date_info["day"]
-                month = date_info["month"]
-                year = date_info["year"]
-                name = date_info["name"]
-                recurring = date_info["recurring"]
-                
-                # Se a data não é recorrente e já passou, pula
-                if not recurring and year and datetime(year, month, day) < now:
-                    continue
-                
-                # Calcula a próxima ocorrência da data
-                if month < current_month or (month == current_month and day < current_day):
-                    # A data já passou este ano, considera para o próximo ano
-                    target_year = current_year + 1
-                else:
-                    # A data ainda não ocorreu este ano
-                    target_year = current_year
-                
-                # Cria a data alvo
-                target_date = datetime(target_year, month, day)
-                
-                # Calcula a diferença em dias
-                days_remaining = (target_date - now).days
-                
-                # Adiciona à lista de datas próximas
-                upcoming_dates.append((name, days_remaining))
+            index = self._get_date_index(today)
+            special_dates = self.special_dates
             
-            # Ordena por proximidade e limita o número de resultados
-            upcoming_dates.sort(key=lambda x: x[1])
-            return upcoming_dates[:limit]
+            return [
+                (special_dates[date_id]["name"], (target - today).days)
+                for date_id, target in index.upcoming(
+                    today, limit, lambda date_id: special_dates[date_id].get("guild_id") == guild_id
+                )
+            ]
             
         except Exception as e:
             logger.error(f"Erro ao obter datas especiais próximas: {e}")
             return []
     
-    def detect_date_triggers(self, message: str, memory) -> bool:
+    def _get_date_index(self, today):
+        """Índice das próximas ocorrências, reconstruído após carregar e avançado quando o dia muda
+        
+        O índice é mantido um dia atrás: servidores em fusos diferentes
+        podem estar em dias diferentes, e as datas anteriores ao dia de quem
+        consulta são ignoradas na consulta.
+        """
+        base = today - timedelta(days=1)
+        if self._date_index_stale:
+            self._date_index.rebuild(self.special_dates, base)
+            self._date_index_stale = False
+        else:
+            moved = self._date_index.roll_forward(self.special_dates, base)
+            if moved:
+                logger.debug(f"Índice de datas especiais avançado: {moved} datas passaram")
+        return self._date_index
+    
+    def detect_date_triggers(self, message: str, memory, trigger: Optional[str] = None, guild_id=None,
+                             user_id=None) -> bool:
         """Detecta gatilhos para armazenar datas especiais
         
         Args:
             message: Mensagem do usuário
             memory: Objeto de memória para armazenar informações
+            trigger: Gatilho já detectado pelo TriggerMatcher (evita varrer a mensagem novamente)
+            guild_id: Servidor da mensagem (fuso horário das datas relativas e escopo da informação)
+            user_id: Autor da mensagem, dono da informação na memória de longo prazo
             
         Returns:
             True se uma data foi detectada e armazenada, False caso contrário
         """
-        # Lista de gatilhos que indicam que o usuário quer registrar uma data
-        date_triggers = [
-            "lembre-se da data", "anote a data", "marque no calendário", 
-            "guarde essa data", "salve essa data", "lembre do dia",
-            "aniversário", "evento", "compromisso", "reunião", "encontro"
-        ]
-        
-        # Verifica se a mensagem contém algum dos gatilhos
-        message_lower = message.lower()
-        triggered = False
+        # Sem gatilho pré-detectado, verifica se a mensagem contém algum dos gatilhos
+        if trigger is None and not any(candidate in message.lower() for candidate in DATE_TRIGGERS):
+            return False
         
-        for trigger in date_triggers:
-            if trigger in message_lower:
-                triggered = True
-                break
-                
-        if not triggered:
+        found = date_extraction.extract_date(message, self.get_current_time(guild_id).date())
+        if found is None:
             return False
         
-        # Tenta extrair uma data da mensagem
-        import re
+        event_name = date_extraction.extract_event_name(message, found)
+        date_str = found.date_str
         
-        # Padrões de data (DD/MM/YYYY ou DD/MM)
-        date_patterns = [
-            r'(\d{1,2})/(\d{1,2})/(\d{4})',  # DD/MM/YYYY
-            r'(\d{1,2})/(\d{1,2})'            # DD/MM
-        ]
+        # Datas relativas ("amanhã", "próxima sexta") são compromissos únicos
+        self.add_special_date(event_name, date_str, recurring=not found.relative, guild_id=guild_id, user_id=user_id)
         
-        # Tenta encontrar uma data na mensagem
-        date_match = None
-        date_str = None
-        
-        for pattern in date_patterns:
-            matches = re.findall(pattern, message)
-            if matches:
-                date_match = matches[0]
-                if isinstance(date_match, tuple):
-                    # Formata a data encontrada
-                    if len(date_match) == 2:  # DD/MM
-                        date_str = f"{date_match[0]}/{date_match[1]}"
-                    else:  # DD/MM/YYYY
-                        date_str = f"{date_match[0]}/{date_match[1]}/{date_match[2]}"
-                else:
-                    date_str = date_match
-                break
-        
-        if not date_str:
-            # Se não encontrou uma data no formato padrão, tenta extrair usando processamento de linguagem natural
-            # Isso seria melhor implementado com uma biblioteca NLP, mas aqui usamos uma abordagem simplificada
-            month_patterns = [
-                r'(janeiro|fevereiro|março|abril|maio|junho|julho|agosto|setembro|outubro|novembro|dezembro)',
-                r'(jan|fev|mar|abr|mai|jun|jul|ago|set|out|nov|dez)'
-            ]
-            
-            day_pattern = r'\b(\d{1,2})\s+(?:de\s+)?'
-            year_pattern = r'(?:\s+de\s+)?(\d{4})'
-            
-            # Tenta encontrar padrões como "10 de janeiro de 2023" ou "10 jan 2023"
-            for month_pattern in month_patterns:
-                full_pattern = day_pattern + month_pattern + year_pattern
-                matches = re.findall(full_pattern, message_lower)
-                if matches:
-                    day, month_name, year = matches[0]
-                    
-                    # Converte o nome do mês para número
-                    month_num = 0
-                    for i, month in enumerate(self.months_pt):
-                        if month_name.lower() in month.lower() or month_name.lower() == month[:3].lower():
-                            month_num = i + 1
-                            break
-                    
-                    if month_num > 0:
-                        date_str = f"{day}/{month_num}/{year}"
-                        break
-        
-        # Se encontrou uma data, tenta extrair o nome do evento
-        if date_str:
-            # Procura por palavras-chave que indicam o tipo de evento
-            event_keywords = [
-                "aniversário", "niver", "nascimento", "festa", "comemoração",
-                "evento", "reunião", "encontro", "compromisso", "consulta",
-                "entrega", "prazo", "deadline", "vencimento", "pagamento"
-            ]
-            
-            # Tenta encontrar o nome do evento na mensagem
-            event_name = None
-            
-            # Procura por frases como "aniversário do João" ou "reunião com o cliente"
-            for keyword in event_keywords:
-                if keyword in message_lower:
-                    # Pega o texto após a palavra-chave
-                    keyword_index = message_lower.find(keyword)
-                    after_keyword = message[keyword_index + len(keyword):].strip()
-                    
-                    # Remove palavras como "do", "da", "de" no início
-                    after_keyword = after_keyword.lstrip("do da de dos das com ").strip()
-                    
-                    # Se houver texto após a palavra-chave, usa como nome do evento
-                    if after_keyword and len(after_keyword) < 50:  # Limita o tamanho
-                        event_name = f"{keyword} {after_keyword}"
-                        break
-            
-            # Se não encontrou um nome específico, usa um nome genérico
-            if not event_name:
-                # Tenta identificar o tipo de evento
-                for keyword in event_keywords:
-                    if keyword in message_lower:
-                        event_name = keyword.capitalize()
-                        break
-                        
-                # Se ainda não tem nome, usa um nome genérico
-                if not event_name:
-                    event_name = "Evento"
-            
-            # Adiciona a data especial
-            self.add_special_date(event_name, date_str)
-            
-            # Armazena a informação na memória de longo prazo
-            info_to_store = f"{event_name} na data {date_str}"
-            import hashlib
-            key = f"date_event_{hashlib.md5(info_to_store.encode('utf-8')).hexdigest()[:8]}"
-            memory.store_permanent_info(key, info_to_store)
-            
-            logger.info(f"Data especial detectada e armazenada: {event_name} - {date_str}")
-            return True
-            
-        return False
+        # Armazena a informação na memória de longo prazo
+        info_to_store = f"{event_name} na data {date_str}"
+        import hashlib
+        # O escopo entra na chave: o mesmo evento em outro servidor não sobrescreve este
+        scoped = f"{guild_id}:{user_id}:{info_to_store}"
+        key = f"date_event_{hashlib.md5(scoped.encode('utf-8')).hexdigest()[:8]}"
+        # Restrita ao autor e ao servidor: as datas de um servidor não aparecem nos prompts de outro
+        memory.ingest_permanent_info(key, info_to_store, user_id=user_id, guild_id=guild_id)
+        
+        logger.info(f"Data especial detectada e armazenada: {event_name} - {date_str}")
+        return True
+    
+    def extract_dates(self, messages: List[str], guild_id=None) -> List[Optional[Tuple[str, str]]]:
+        """Extrai a data e o nome do evento de várias mensagens de uma vez, sem registrá-las
+        
+        Returns:
+            Para cada mensagem, (nome do evento, data em DD/MM ou DD/MM/AAAA) ou None
+        """
+        today = self.get_current_time(guild_id).date()
+        return [
+            None if found is None else (date_extraction.extract_event_name(message, found), found.date_str)
+            for message, found in zip(messages, date_extraction.extract_dates(messages, today))
+        ]
+    
+    def add_listener(self, callback):
+        """Registra uma função chamada com o id de cada data especial adicionada ou removida"""
+        self._listeners.append(callback)
+    
+    def _notify_listeners(self, date_id):
+        for callback in self._listeners:
+            try:
+                callback(date_id)
+            except Exception as e:
+                logger.error(f"Erro ao notificar alteração da data especial {date_id}: {e}")
+    
+    def _persist_special_date(self, date_id):
+        """Grava (ou remove, se não existir mais) uma data especial no SQLite, ou salva o arquivo JSON inteiro"""
+        if self.db is None:
+            persistence.scheduler.mark_dirty("special_dates")
+            return
+        
+        date_info = self.special_dates.get(date_id)
+        if date_info is None:
+            self.db.execute(database.DELETE_SPECIAL_DATE, (date_id,))
+        else:
+            self.db.execute(database.UPSERT_SPECIAL_DATE, (
+                date_id, date_info["name"], date_info["day"], date_info["month"],
+                date_info["year"], int(bool(date_info["recurring"])), date_info.get("user_id"),
+                date_info.get("guild_id")
+            ))
     
     def load_special_dates(self):
-        """Carrega datas especiais do arquivo JSON"""
+        """Carrega datas especiais do SQLite ou do arquivo JSON"""
         try:
-            if os.path.exists(self.special_dates_file):
-                with open(self.special_dates_file, 'r', encoding='utf-8') as f:
-                    self.special_dates = json.load(f)
+            if self.db is not None:
+                self.special_dates = {}
+                for date_id, name, day, month, year, recurring, user_id, guild_id in self.db.query(
+                        database.SELECT_SPECIAL_DATES):
+                    self.special_dates[date_id] = {
+                        "name": name,
+                        "day": day,
+                        "month": month,
+                        "year": year,
+                        "recurring": bool(recurring)
+                    }
+                    if user_id is not None:
+                        self.special_dates[date_id]["user_id"] = int(user_id) if user_id.isdigit() else user_id
+                    if guild_id is not None:
+                        self.special_dates[date_id]["guild_id"] = guild_id
+                self._date_index_stale = True
+                logger.info(f"Datas especiais carregadas do SQLite: {len(self.special_dates)} eventos")
+                return True
+            
+            if storage.exists(self.special_dates_file):
+                self.special_dates = serialization.load_file(self.special_dates_file)
+                self._date_index_stale = True
                 logger.info(f"Datas especiais carregadas: {len(self.special_dates)} eventos")
                 return True
             else:
@@ -461,16 +535,23 @@ class TimeHandler:
             logger.error(f"Erro ao carregar datas especiais: {e}")
             return False
     
+    def _snapshot_special_dates(self):
+        """Copia as datas especiais para gravação"""
+        return {date_id: dict(date_info) for date_id, date_info in self.special_dates.items()}
+    
     def save_special_dates(self):
-        """Salva datas especiais em um arquivo JSON"""
+        """Salva datas especiais em um arquivo JSON imediatamente"""
+        return self._write_special_dates(self._snapshot_special_dates())
+    
+    def _write_special_dates(self, special_dates):
+        """Grava uma cópia das datas especiais no arquivo JSON"""
         try:
             # Cria o diretório se não existir
             os.makedirs(os.path.dirname(self.special_dates_file), exist_ok=True)
             
-            with open(self.special_dates_file, 'w', encoding='utf-8') as f:
-                json.dump(self.special_dates, f, indent=4)
+            serialization.dump_file(self.special_dates_file, special_dates)
             
-            logger.info(f"Datas especiais salvas: {len(self.special_dates)} eventos")
+            logger.info(f"Datas especiais salvas: {len(special_dates)} eventos")
             return True
         except Exception as e:
             logger.error(f"Erro ao salvar datas especiais: {e}")
@@ -0,0 +1,221 @@
+# triggers.py
+# Detecção de gatilhos em mensagens com um único autômato pré-compilado
+
+import re
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+
+# Gatilhos que indicam que o usuário quer que o bot lembre de algo
+MEMORY_TRIGGERS = (
+    "lembre-se", "lembre se", "memorize", "guarde", "não esqueça",
+    "anote", "grave", "registre", "salve", "armazene"
+)
+
+# Gatilhos que indicam que o usuário quer registrar uma data
+DATE_TRIGGERS = (
+    "lembre-se da data", "anote a data", "marque no calendário",
+    "guarde essa data", "salve essa data", "lembre do dia",
+    "aniversário", "evento", "compromisso", "reunião", "encontro"
+)
+
+# Categorias de gatilhos reconhecidas pelo matcher
+CATEGORY_KEYWORD = "keyword"
+CATEGORY_MEMORY = "memory"
+CATEGORY_DATE = "date"
+CATEGORY_COMMAND = "command"
+
+
+def build_trie_pattern(words: Iterable[str]) -> str:
+    """Monta uma expressão regular em forma de trie a partir de uma lista de palavras
+
+    Prefixos comuns são fatorados (ex: "lembre-se" e "lembre se" viram
+    "lembre(?:\\-se|\\ se)"), o que transforma a alternância em um autômato
+    que avança caractere a caractere sem retestar cada palavra inteira.
+    """
+    trie: Dict = {}
+    for word in words:
+        if not word:
+            continue
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def _to_pattern(node: Dict) -> str:
+        # Um nó com a chave "" indica o fim de uma palavra
+        is_end = "" in node
+        branches = [re.escape(char) + _to_pattern(child)
+                    for char, child in sorted(node.items()) if char != ""]
+
+        if not branches:
+            return ""
+
+        if len(branches) == 1:
+            pattern = branches[0]
+            if is_end:
+                # Palavra que termina aqui ou continua: a mais longa primeiro
+                return f"(?:{pattern})?"
+            return pattern
+
+        pattern = "(?:" + "|".join(branches) + ")"
+        if is_end:
+            return pattern + "?"
+        return pattern
+
+    return _to_pattern(trie)
+
+
+class TriggerHits:
+    """Resultado de uma varredura: todos os gatilhos encontrados em uma mensagem"""
+
+    __slots__ = ("keyword", "memory", "date", "command")
+
+    def __init__(self):
+        self.keyword = False
+        self.memory: List[Tuple[str, int]] = []
+        self.date: List[Tuple[str, int]] = []
+        self.command: List[str] = []
+
+    def __bool__(self):
+        return bool(self.keyword or self.memory or self.date or self.command)
+
+    def first_memory_trigger(self) -> Optional[str]:
+        """Retorna o gatilho de memória prioritário (na ordem de MEMORY_TRIGGERS)"""
+        return _first_by_priority(self.memory, MEMORY_TRIGGERS)
+
+    def first_date_trigger(self) -> Optional[str]:
+        """Retorna o gatilho de data prioritário (na ordem de DATE_TRIGGERS)"""
+        return _first_by_priority(self.date, DATE_TRIGGERS)
+
+    def __repr__(self):
+        return (f"TriggerHits(keyword={self.keyword}, memory={self.memory}, "
+                f"date={self.date}, command={self.command})")
+
+
+def _first_by_priority(hits: List[Tuple[str, int]], priority: Tuple[str, ...]) -> Optional[str]:
+    """Escolhe entre os gatilhos encontrados o primeiro na ordem de prioridade"""
+    if not hits:
+        return None
+    found = {trigger for trigger, _ in hits}
+    for trigger in priority:
+        if trigger in found:
+            return trigger
+    return None
+
+
+class TriggerMatcher:
+    """Varre cada mensagem uma única vez e retorna todos os gatilhos encontrados
+
+    Palavra-chave do bot, gatilhos de memória, gatilhos de data e nomes de
+    comandos personalizados são combinados em uma só expressão regular
+    (compilada em forma de trie). O autômato só é reconstruído quando a
+    configuração ou a lista de comandos personalizados muda.
+    """
+
+    def __init__(self, config, command_handler=None):
+        self.config = config
+        # Fonte dos comandos personalizados (CommandHandler)
+        self.command_handler = command_handler
+
+        self._signature = None
+        self._pattern = None
+        self._keyword_pattern = None
+        # Para cada padrão: lista de (categoria, gatilho) que ele representa
+        self._categories: Dict[str, List[Tuple[str, str]]] = {}
+        # Para cada padrão: ele mesmo e os outros padrões que são prefixos dele
+        self._prefixes: Dict[str, List[str]] = {}
+
+    def set_command_handler(self, command_handler):
+        """Define a origem dos comandos personalizados"""
+        self.command_handler = command_handler
+        self.invalidate()
+
+    def invalidate(self):
+        """Força a reconstrução do autômato na próxima varredura"""
+        self._signature = None
+
+    def _current_signature(self):
+        """Assinatura barata das entradas do autômato (versões da configuração e dos comandos)"""
+        return (
+            getattr(self.config, "version", None),
+            getattr(self.command_handler, "custom_commands_version", None)
+        )
+
+    def _ensure_compiled(self):
+        """Reconstrói o autômato se a configuração mudou desde a última compilação"""
+        signature = self._current_signature()
+        if signature == self._signature:
+            return
+
+        keyword = self.config.get_config_value('bot_keyword', '')
+        prefix = self.config.get_prefix()
+        commands = sorted(self.command_handler.custom_commands) if self.command_handler else []
+        entries: List[Tuple[str, str, str]] = []
+
+        if keyword:
+            entries.append((keyword.lower(), CATEGORY_KEYWORD, keyword))
+        for trigger in MEMORY_TRIGGERS:
+            entries.append((trigger, CATEGORY_MEMORY, trigger))
+        for trigger in DATE_TRIGGERS:
+            entries.append((trigger, CATEGORY_DATE, trigger))
+        for command in commands:
+            entries.append((f"{prefix}{command}".lower(), CATEGORY_COMMAND, command))
+
+        categories: Dict[str, List[Tuple[str, str]]] = {}
+        for pattern, category, trigger in entries:
+            categories.setdefault(pattern, []).append((category, trigger))
+
+        # A expressão retorna só o padrão mais longo em cada posição; os mais
+        # curtos que começam na mesma posição são prefixos dele e saem desta tabela
+        patterns = sorted(categories)
+        prefixes = {
+            pattern: [other for other in patterns if pattern.startswith(other)]
+            for pattern in patterns
+        }
+
+        # Texto é varrido já em minúsculas: mais rápido que IGNORECASE no motor de regex
+        self._pattern = re.compile(build_trie_pattern(patterns))
+        self._keyword_pattern = re.compile(re.escape(keyword), re.IGNORECASE) if keyword else None
+        self._categories = categories
+        self._prefixes = prefixes
+        self._signature = signature
+
+        logger.debug(f"Autômato de gatilhos reconstruído com {len(patterns)} padrões")
+
+    def matches_keyword(self, text: str) -> bool:
+        """Verifica apenas a palavra-chave do bot, sem varrer os demais gatilhos"""
+        self._ensure_compiled()
+        return self._keyword_pattern is not None and self._keyword_pattern.search(text) is not None
+
+    def scan(self, text: str) -> TriggerHits:
+        """Varre a mensagem uma vez e retorna todos os gatilhos encontrados
+
+        Cada busca recomeça logo depois do início do último gatilho (e não do
+        fim dele), então gatilhos sobrepostos também são encontrados: em
+        "-anote a data", o comando "-anote" e o gatilho "anote a data".
+        """
+        self._ensure_compiled()
+        hits = TriggerHits()
+        text = text.lower()
+        search = self._pattern.search
+
+        match = search(text)
+        while match is not None:
+            position = match.start()
+            for pattern in self._prefixes[match.group()]:
+                for category, trigger in self._categories[pattern]:
+                    if category == CATEGORY_KEYWORD:
+                        hits.keyword = True
+                    elif category == CATEGORY_MEMORY:
+                        hits.memory.append((trigger, position))
+                    elif category == CATEGORY_DATE:
+                        hits.date.append((trigger, position))
+                    elif category == CATEGORY_COMMAND and position == 0:
+                        # Comandos só contam no início da mensagem
+                        hits.command.append(trigger)
+            match = search(text, position + 1)
+
+        return hits